@@ -0,0 +1,36 @@
+"""add realm listing indexes
+
+Revision ID: 0002_realm_listing_indexes
+Revises: 0001_create_realm_table
+Create Date: 2025-06-02
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002_realm_listing_indexes"
+down_revision = "0001_create_realm_table"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    # Keyset pagination walks realms in id order; each filter column is
+    # paired with id so the planner can stop after one page.
+    op.create_index("ix_realms_customer_type_id", "realms", ["customer_type", "id"], schema=SCHEMA_NAME)
+    op.create_index("ix_realms_enabled_id", "realms", ["enabled", "id"], schema=SCHEMA_NAME)
+    # LIKE 'prefix%' only uses a btree index under the C collation or with
+    # text_pattern_ops.
+    op.create_index(
+        "ix_realms_realm_prefix",
+        "realms",
+        ["realm"],
+        schema=SCHEMA_NAME,
+        postgresql_ops={"realm": "text_pattern_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_realms_realm_prefix", table_name="realms", schema=SCHEMA_NAME)
+    op.drop_index("ix_realms_enabled_id", table_name="realms", schema=SCHEMA_NAME)
+    op.drop_index("ix_realms_customer_type_id", table_name="realms", schema=SCHEMA_NAME)
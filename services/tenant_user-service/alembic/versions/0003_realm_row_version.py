@@ -0,0 +1,33 @@
+"""add realm row version and updated_at
+
+Revision ID: 0003_realm_row_version
+Revises: 0002_realm_listing_indexes
+Create Date: 2025-06-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0003_realm_row_version"
+down_revision = "0002_realm_listing_indexes"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.add_column(
+        "realms",
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+        schema=SCHEMA_NAME,
+    )
+    op.add_column(
+        "realms",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        schema=SCHEMA_NAME,
+    )
+
+
+def downgrade():
+    op.drop_column("realms", "updated_at", schema=SCHEMA_NAME)
+    op.drop_column("realms", "version", schema=SCHEMA_NAME)
@@ -0,0 +1,44 @@
+"""create realm outbox table
+
+Revision ID: 0004_realm_outbox
+Revises: 0003_realm_row_version
+Create Date: 2025-06-30
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004_realm_outbox"
+down_revision = "0003_realm_row_version"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.create_table(
+        "realm_outbox",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("realm", sa.String, nullable=False),
+        sa.Column("operation", sa.String, nullable=False),
+        sa.Column("payload", sa.JSON),
+        sa.Column("status", sa.String, nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("processed_at", sa.DateTime(timezone=True)),
+        schema=SCHEMA_NAME
+    )
+    # The dispatcher polls for due pending rows and checks per-realm ordering.
+    op.create_index(
+        "ix_realm_outbox_status_next_attempt",
+        "realm_outbox",
+        ["status", "next_attempt_at", "id"],
+        schema=SCHEMA_NAME,
+    )
+    op.create_index("ix_realm_outbox_realm_id", "realm_outbox", ["realm", "id"], schema=SCHEMA_NAME)
+
+
+def downgrade():
+    op.drop_table("realm_outbox", schema=SCHEMA_NAME)
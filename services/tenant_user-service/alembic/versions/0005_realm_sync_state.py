@@ -0,0 +1,32 @@
+"""create realm sync state table
+
+Revision ID: 0005_realm_sync_state
+Revises: 0004_realm_outbox
+Create Date: 2025-07-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005_realm_sync_state"
+down_revision = "0004_realm_outbox"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.create_table(
+        "realm_sync_state",
+        sa.Column("realm", sa.String, primary_key=True),
+        sa.Column("db_version", sa.Integer, nullable=False),
+        sa.Column("db_hash", sa.String(64), nullable=False),
+        sa.Column("kc_hash", sa.String(64)),
+        sa.Column("in_sync", sa.Boolean, nullable=False, server_default=sa.sql.expression.false()),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        schema=SCHEMA_NAME
+    )
+
+
+def downgrade():
+    op.drop_table("realm_sync_state", schema=SCHEMA_NAME)
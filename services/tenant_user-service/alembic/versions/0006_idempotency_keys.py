@@ -0,0 +1,38 @@
+"""create idempotency keys table
+
+Revision ID: 0006_idempotency_keys
+Revises: 0005_realm_sync_state
+Create Date: 2025-07-21
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006_idempotency_keys"
+down_revision = "0005_realm_sync_state"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("request_hash", sa.String(64), nullable=False),
+        sa.Column("status", sa.String, nullable=False, server_default="in_progress"),
+        sa.Column("response_status", sa.Integer),
+        sa.Column("response_body", sa.JSON),
+        sa.Column("response_headers", sa.JSON),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        schema=SCHEMA_NAME
+    )
+    op.create_index(
+        "ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"], schema=SCHEMA_NAME
+    )
+
+
+def downgrade():
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys", schema=SCHEMA_NAME)
+    op.drop_table("idempotency_keys", schema=SCHEMA_NAME)
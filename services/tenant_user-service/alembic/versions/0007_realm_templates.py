@@ -0,0 +1,30 @@
+"""create realm templates table
+
+Revision ID: 0007_realm_templates
+Revises: 0006_idempotency_keys
+Create Date: 2025-07-28
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007_realm_templates"
+down_revision = "0006_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.create_table(
+        "realm_templates",
+        sa.Column("customer_type", sa.String, primary_key=True),
+        sa.Column("settings", sa.JSON, nullable=False),
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        schema=SCHEMA_NAME
+    )
+
+
+def downgrade():
+    op.drop_table("realm_templates", schema=SCHEMA_NAME)
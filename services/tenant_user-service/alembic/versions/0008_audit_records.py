@@ -0,0 +1,61 @@
+"""create partitioned audit records table
+
+Revision ID: 0008_audit_records
+Revises: 0007_realm_templates
+Create Date: 2025-08-04
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008_audit_records"
+down_revision = "0007_realm_templates"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def _month(year: int, month: int) -> date:
+    return date(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+def upgrade():
+    # Range-partitioned by month so old months can be detached and archived
+    # without touching the live table. The primary key must include the
+    # partition key.
+    op.execute(f"""
+        CREATE TABLE {SCHEMA_NAME}.audit_records (
+            seq BIGINT NOT NULL,
+            occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            realm VARCHAR NOT NULL,
+            action VARCHAR NOT NULL,
+            actor VARCHAR,
+            request_id VARCHAR,
+            before JSON,
+            after JSON,
+            prev_hash VARCHAR(64) NOT NULL,
+            hash VARCHAR(64) NOT NULL,
+            PRIMARY KEY (seq, occurred_at)
+        ) PARTITION BY RANGE (occurred_at)
+    """)
+    op.create_index("ix_audit_records_realm_seq", "audit_records", ["realm", "seq"], schema=SCHEMA_NAME)
+    # The writer creates each month's partition before writing into it; the
+    # default partition only catches clock skew around month boundaries.
+    op.execute(f"CREATE TABLE {SCHEMA_NAME}.audit_records_default PARTITION OF {SCHEMA_NAME}.audit_records DEFAULT")
+    today = datetime.now(timezone.utc).date()
+    for offset in range(2):
+        start = _month(today.year, today.month + offset)
+        end = _month(today.year, today.month + offset + 1)
+        op.execute(
+            f"CREATE TABLE {SCHEMA_NAME}.audit_records_{start:%Y_%m} PARTITION OF {SCHEMA_NAME}.audit_records "
+            # UTC bounds, as the writer routes rows by their UTC date.
+            f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+        )
+    # Audit records are append-only for the service's role.
+    op.execute(f"REVOKE UPDATE, DELETE, TRUNCATE ON {SCHEMA_NAME}.audit_records FROM CURRENT_USER")
+
+
+def downgrade():
+    # Dropping the parent drops every partition.
+    op.drop_table("audit_records", schema=SCHEMA_NAME)
@@ -0,0 +1,48 @@
+"""create user import jobs table
+
+Revision ID: 0009_user_import_jobs
+Revises: 0008_audit_records
+Create Date: 2025-08-11
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009_user_import_jobs"
+down_revision = "0008_audit_records"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.create_table(
+        "user_import_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("realm", sa.String, nullable=False),
+        sa.Column("format", sa.String, nullable=False),
+        sa.Column("source_path", sa.String, nullable=False),
+        sa.Column("status", sa.String, nullable=False, server_default="queued"),
+        sa.Column("actor", sa.String),
+        sa.Column("checkpoint", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("imported", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("skipped", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("duplicates", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("invalid", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("failed", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("errors", sa.JSON),
+        sa.Column("last_error", sa.String),
+        sa.Column("started_from", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+        schema=SCHEMA_NAME
+    )
+    op.create_index(
+        "ix_user_import_jobs_realm_created_at", "user_import_jobs", ["realm", "created_at"], schema=SCHEMA_NAME
+    )
+
+
+def downgrade():
+    op.drop_table("user_import_jobs", schema=SCHEMA_NAME)
@@ -0,0 +1,41 @@
+"""create realm rotation state table
+
+Revision ID: 0010_realm_rotation_state
+Revises: 0009_user_import_jobs
+Create Date: 2025-08-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010_realm_rotation_state"
+down_revision = "0009_user_import_jobs"
+branch_labels = None
+depends_on = None
+
+SCHEMA_NAME = "tenant"
+
+def upgrade():
+    op.create_table(
+        "realm_rotation_state",
+        sa.Column("realm", sa.String, primary_key=True),
+        sa.Column("generation", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("next_rotation_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("retire_at", sa.DateTime(timezone=True)),
+        sa.Column("retiring", sa.JSON),
+        sa.Column("last_rotated_at", sa.DateTime(timezone=True)),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        schema=SCHEMA_NAME
+    )
+    op.create_index(
+        "ix_realm_rotation_state_next_rotation_at", "realm_rotation_state", ["next_rotation_at"], schema=SCHEMA_NAME
+    )
+    op.create_index(
+        "ix_realm_rotation_state_retire_at", "realm_rotation_state", ["retire_at"], schema=SCHEMA_NAME
+    )
+
+
+def downgrade():
+    op.drop_table("realm_rotation_state", schema=SCHEMA_NAME)
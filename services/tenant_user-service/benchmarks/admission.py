@@ -0,0 +1,242 @@
+"""Latency of well-behaved tenants while a noisy tenant floods the realm API.
+
+Serves the FastAPI ``app`` with uvicorn in a subprocess. ``--tenants``
+calm tenants each read their realm ``--requests`` times,
+``--calm-concurrency`` at a time, while one noisy tenant (in another
+process) keeps ``--noisy-concurrency`` reads in flight until they finish,
+retrying a 429 after ``--noisy-retry-delay`` whatever ``Retry-After``
+says. Every request holds a pooled database connection for
+``--db-latency`` seconds (a Postgres round trip). Scenarios: the calm
+tenants alone, with the noisy one and no admission control, and with the
+noisy one under ``AdmissionMiddleware``.
+
+    PYTHONPATH=src python benchmarks/admission.py --tenants 4 --noisy-concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+import harness
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=4, help="well-behaved tenants")
+    parser.add_argument("--requests", type=int, default=300, help="requests per well-behaved tenant")
+    parser.add_argument("--calm-concurrency", type=int, default=2, help="in flight per well-behaved tenant")
+    parser.add_argument("--noisy-concurrency", type=int, default=64)
+    parser.add_argument("--noisy-retry-delay", type=float, default=0.05,
+                        help="seconds before the noisy tenant retries a 429")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds each request holds a connection")
+    parser.add_argument("--pool-size", type=int, default=10, help="DB_POOL_SIZE (no overflow)")
+    parser.add_argument("--pool-timeout", type=float, default=5, help="DB_POOL_TIMEOUT")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="ADMISSION_MAX_CONCURRENCY")
+    parser.add_argument("--queue-size", type=int, default=8, help="ADMISSION_QUEUE_SIZE")
+    parser.add_argument("--read-rate", type=float, default=200, help="ADMISSION_READ_RATE and _BURST")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="result file (default: results/admission-<rev>.json)")
+    # Internal: run as the server process.
+    parser.add_argument("--serve", metavar="DATABASE", help=argparse.SUPPRESS)
+    parser.add_argument("--admission", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def _tenant(tenant: str) -> Dict[str, str]:
+    # Authorization is off, so the server charges requests by this header
+    # instead of by a verified token (see ``_header_key``).
+    return {"X-Tenant": tenant}
+
+
+def _header_key(scope: Dict[str, Any]) -> str:
+    return "tenant:" + dict(scope["headers"]).get(b"x-tenant", b"").decode()
+
+
+def _client(url: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    return httpx.AsyncClient(base_url=url, limits=limits, timeout=30)
+
+
+# Server ---------------------------------------------------------------
+
+def serve(args: argparse.Namespace) -> None:
+    import uvicorn
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from tenant_user_service import dependencies
+    from tenant_user_service.admission import AdmissionControl, AdmissionMiddleware, Limit
+    from tenant_user_service.main import app
+    from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import SCHEMA_NAME
+
+    engine = create_engine(
+        f"sqlite:///{args.serve}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        execution_options={"schema_translate_map": {SCHEMA_NAME: None}},
+        pool_size=args.pool_size,
+        max_overflow=0,
+        pool_timeout=args.pool_timeout,
+    )
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    def get_db():
+        with session_factory() as db:
+            db.connection()
+            time.sleep(args.db_latency)
+            yield db
+
+    app.dependency_overrides[dependencies.get_db] = get_db
+    app.dependency_overrides[dependencies.get_realm_cache] = lambda: None
+    app.dependency_overrides[dependencies.get_authorizer] = lambda: None
+    asgi: Any = app
+    if args.admission:
+        read = Limit(args.read_rate, args.read_rate)
+        control = AdmissionControl(
+            {"read": read, "mutation": read},
+            max_concurrency=args.max_concurrency,
+            queue_size=args.queue_size,
+            key=_header_key,
+        )
+        asgi = AdmissionMiddleware(app, control=control)
+    # No lifespan: the background workers would go looking for Postgres. Pool
+    # timeouts in the unprotected scenario are counted by the clients.
+    uvicorn.run(asgi, host="127.0.0.1", port=args.port, lifespan="off", log_level="critical", access_log=False)
+
+
+def _start_server(args: argparse.Namespace, database: str, admission: bool) -> subprocess.Popen:
+    command = [sys.executable, __file__, *sys.argv[1:], "--serve", database]
+    server = subprocess.Popen(command + (["--admission"] if admission else []))
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/healthz").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline or server.poll() is not None:
+            server.kill()
+            raise RuntimeError("benchmark server did not start")
+        time.sleep(0.1)
+
+
+# Clients --------------------------------------------------------------
+
+def _flood(url: str, args: argparse.Namespace, stop: Any, results: Any) -> None:
+    """The noisy tenant; a process of its own, so its CPU does not slow the calm clients."""
+
+    async def run() -> None:
+        counts = {"requests": 0, "rejected": 0, "errors": 0}
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            while not stop.is_set():
+                try:
+                    response = await client.get("/realms/noisy", headers=_tenant("noisy"))
+                except httpx.HTTPError:
+                    counts["errors"] += 1
+                    continue
+                if response.status_code == 429:
+                    counts["rejected"] += 1
+                    await asyncio.sleep(args.noisy_retry_delay)
+                else:
+                    counts["requests" if response.status_code == 200 else "errors"] += 1
+
+        async with _client(url) as client:
+            await asyncio.gather(*(worker(client) for _ in range(args.noisy_concurrency)))
+        results.put(counts)
+
+    asyncio.run(run())
+
+
+async def _calm(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    async with _client(url) as client:
+        def calls(tenant: str) -> List[Callable[[], Any]]:
+            async def call() -> bool:
+                response = await client.get(f"/realms/{tenant}", headers=_tenant(tenant))
+                return response.status_code == 200
+            return [call] * args.requests
+
+        results = await asyncio.gather(*(
+            harness.run_concurrently(calls(f"calm{i}"), args.calm_concurrency) for i in range(args.tenants)
+        ))
+    # Percentiles are those of the worst-off calm tenant.
+    requests = sum(r["requests"] for r in results)
+    duration = max(r["duration_s"] for r in results)
+    return {
+        "requests": requests,
+        "errors": sum(r["errors"] for r in results),
+        "duration_s": duration,
+        "throughput_rps": round(requests / duration, 2),
+        **{key: max(r[key] for r in results) for key in ("p50_ms", "p95_ms", "p99_ms")},
+    }
+
+
+def run_scenario(args: argparse.Namespace, database: str, noisy: bool, admission: bool) -> Dict[str, Any]:
+    url = f"http://127.0.0.1:{args.port}"
+    server = _start_server(args, database, admission)
+    stop, results = multiprocessing.Event(), multiprocessing.Queue()
+    flood = multiprocessing.Process(target=_flood, args=(url, args, stop, results))
+    try:
+        if noisy:
+            flood.start()
+            time.sleep(1.0)  # let it saturate the service first
+        result = asyncio.run(_calm(url, args))
+        if noisy:
+            stop.set()
+            counts = results.get(timeout=60)
+            flood.join()
+            result.update({f"noisy_{key}": value for key, value in counts.items()})
+        return result
+    finally:
+        if flood.is_alive():
+            flood.terminate()
+        server.terminate()
+        server.wait()
+
+
+def main(args: argparse.Namespace) -> None:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import (
+        SCHEMA_NAME, Base, Realm,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = f"{tmp}/bench.db"
+        engine = create_engine(f"sqlite:///{database}", execution_options={"schema_translate_map": {SCHEMA_NAME: None}})
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            names = ["noisy"] + [f"calm{i}" for i in range(args.tenants)]
+            db.add_all(Realm(realm=name, customer_type="Small") for name in names)
+            db.commit()
+        engine.dispose()
+
+        scenarios = {
+            "calm_only": run_scenario(args, database, noisy=False, admission=False),
+            "noisy_unprotected": run_scenario(args, database, noisy=True, admission=False),
+            "noisy_admission": run_scenario(args, database, noisy=True, admission=True),
+        }
+
+    columns = ("requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "noisy_requests", "noisy_rejected")
+    print(f"{'scenario':<20}" + "".join(f"{c:>16}" for c in columns))
+    for name, result in scenarios.items():
+        print(f"{name:<20}" + "".join(f"{result.get(c, '-'):>16}" for c in columns))
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "serve", "admission")}
+    print(f"wrote {harness.write_results('admission', scenarios, params, args.output)}")
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    if arguments.serve:
+        serve(arguments)
+    else:
+        main(arguments)
@@ -0,0 +1,83 @@
+"""Decision throughput of the local authorization engine, per core.
+
+Every scenario runs in one thread, so ``decisions_per_s`` is what one core
+sustains. Tokens are signed by the fake Keycloak and verified against its
+JWKS endpoint.
+
+    PYTHONPATH=src python benchmarks/authz_decisions.py --iterations 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+
+import harness
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.engine import (
+    AuthorizationEngine,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.policies import (
+    DEFAULT_POLICY, CompiledPolicy,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.tokens import (
+    JWKSCache, TokenVerifier, jwks_url,
+)
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+ROLES = ("admin", "tenant-admin", "tenant-viewer")
+ACTIONS = ("realm:read", "realm:update", "realm:delete")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    parser.add_argument("--principals", type=int, default=100, help="distinct callers (and tenant realms)")
+    parser.add_argument("--signature-iterations", type=int, default=500, help="uncached signature checks")
+    parser.add_argument("--output", help="result file (default: results/authz_decisions-<rev>.json)")
+    args = parser.parse_args()
+
+    with FakeKeycloak() as keycloak:
+        tokens = [
+            keycloak.issue_token(f"user-{i}", roles=[ROLES[i % len(ROLES)], "offline_access"], tenant=f"t{i}")
+            for i in range(args.principals)
+        ]
+        issuer = keycloak.issuer()
+        verifier = TokenVerifier({issuer: JWKSCache(jwks_url(issuer))})
+        engine = AuthorizationEngine(verifier, CompiledPolicy.from_document(DEFAULT_POLICY))
+        principals = [verifier.verify(token) for token in tokens]  # fetches the JWKS once
+
+    # Each request: one caller, one action, on their own realm or a neighbour's.
+    requests = [
+        (tokens[i], principals[i], action, f"t{(i + offset) % args.principals}")
+        for i in range(args.principals)
+        for action in ACTIONS
+        for offset in (0, 1)
+    ]
+    cycle = itertools.cycle(requests)
+
+    def authorize() -> None:
+        token, _, action, realm = next(cycle)
+        engine.decide(engine.authenticate(token), action, realm)
+
+    n = args.iterations
+    scenarios = {
+        "verify_signature": harness.time_calls(lambda: verifier._decode(next(cycle)[0]), args.signature_iterations),
+        "verify_cached": harness.time_calls(lambda: verifier.verify(next(cycle)[0]), n),
+        "evaluate_compiled": harness.time_calls(lambda: engine.policy.evaluate(*next(cycle)[1:]), n),
+        "decide_cached": harness.time_calls(lambda: engine.decide(*next(cycle)[1:]), n),
+        "authorize": harness.time_calls(authorize, n),
+    }
+    for result in scenarios.values():
+        result["decisions_per_s"] = round(result["requests"] / result["duration_s"])
+        result["us_per_call"] = round(result["duration_s"] / result["requests"] * 1e6, 2)
+
+    print(f"{'scenario':<20}{'decisions/s':>14}{'us/call':>10}{'p99_ms':>10}")
+    for name, result in scenarios.items():
+        print(f"{name:<20}{result['decisions_per_s']:>14}{result['us_per_call']:>10}{result['p99_ms']:>10}")
+    print(f"\ndecision cache: {engine.stats.as_dict()}")
+    params = {"iterations": n, "principals": args.principals, "signature_iterations": args.signature_iterations}
+    print(f"wrote {harness.write_results('authz_decisions', scenarios, params, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python benchmarks/compare.py results/realm_api-abc123.json results/realm_api-def456.json
+
+Exits with status 1 when any scenario's p95 latency grew, or its throughput
+dropped, by more than ``--threshold`` percent.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Optional
+
+# (metric, True when a higher value is better)
+_METRICS = (
+    ("p50_ms", False), ("p95_ms", False), ("p99_ms", False),
+    ("throughput_rps", True), ("throughput_ops", True),
+)
+_GATED = ("p95_ms", "throughput_rps", "throughput_ops")
+
+
+def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"{baseline['revision']} -> {candidate['revision']} ({candidate['benchmark']})")
+
+    regressions = []
+    for name, after in candidate["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for metric, higher_is_better in _METRICS:
+            change = _change(before.get(metric), after.get(metric))
+            if change is None:
+                continue
+            cells.append(f"{metric} {before[metric]} -> {after[metric]} ({change:+.1f}%)")
+            worse = -change if higher_is_better else change
+            if metric in _GATED and worse > args.threshold:
+                regressions.append(f"{name}.{metric}")
+        print(f"  {name:<20}" + "  ".join(cells))
+
+    if regressions:
+        print(f"\nregressed beyond {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
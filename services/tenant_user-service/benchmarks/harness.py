@@ -0,0 +1,126 @@
+"""Shared helpers for the benchmark scripts: timing, percentiles and result files."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``samples`` (``None`` when empty)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: List[float], errors: int, duration: float, **extra: Any) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for one scenario."""
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 3) if value is not None else None
+
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(count / duration, 2) if duration else None,
+        "mean_ms": ms(sum(latencies) / count) if count else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        **extra,
+    }
+
+
+async def run_concurrently(
+    calls: Iterable[Callable[[], Awaitable[bool]]], concurrency: int
+) -> Dict[str, Any]:
+    """Run ``calls`` with at most ``concurrency`` in flight; each returns success."""
+    queue: "asyncio.Queue[Callable[[], Awaitable[bool]]]" = asyncio.Queue()
+    for call in calls:
+        queue.put_nowait(call)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            call = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                ok = await call()
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency=concurrency)
+
+
+def time_calls(call: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    """Time ``iterations`` sequential calls of ``call`` (for micro-benchmarks)."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(
+    benchmark: str,
+    scenarios: Dict[str, Dict[str, Any]],
+    params: Dict[str, Any],
+    output: Optional[str] = None,
+) -> Path:
+    """Write a result file and return its path.
+
+    Defaults to ``results/<benchmark>-<git revision>.json`` so runs from
+    different commits can be compared with ``compare.py``.
+    """
+    revision = git_revision()
+    path = Path(output) if output else RESULTS_DIR / f"{benchmark}-{revision}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "benchmark": benchmark,
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "scenarios": scenarios,
+    }
+    path.write_text(json.dumps(document, indent=2) + "\n")
+    return path
+
+
+def print_table(scenarios: Dict[str, Dict[str, Any]]) -> None:
+    columns = ("requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+    print(f"{'scenario':<24}" + "".join(f"{c:>16}" for c in columns))
+    for name, result in scenarios.items():
+        cells = "".join(f"{'-' if result.get(c) is None else result[c]:>16}" for c in columns)
+        print(f"{name:<24}{cells}")
@@ -0,0 +1,52 @@
+"""Cold-start cost of the service: import time of ``tenant_user_service.main``.
+
+Imports the app ``--runs`` times, each in a fresh interpreter under
+``python -X importtime``, and prints the most expensive packages of the
+last run. Heavy clients (Keycloak, httpx, DB drivers) must not show up: they
+are imported on first use or by STARTUP_WARMUP hooks.
+
+    PYTHONPATH=src python benchmarks/import_time.py --runs 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+
+import harness
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", default="tenant_user_service.main")
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the report")
+    parser.add_argument("--output", help="result file (default: results/import_time-<rev>.json)")
+    return parser.parse_args()
+
+
+def main(args: argparse.Namespace) -> None:
+    from tenant_user_service.testing import importtime
+
+    scenarios = {}
+    for mode in ("sync", "async"):
+        env = {"REALM_API_MODE": mode, "PYTHONPATH": os.environ.get("PYTHONPATH", "src")}
+        totals, records = [], []
+        for _ in range(args.runs):
+            records = importtime.profile_imports(args.module, env=env)
+            totals.append(importtime.total_ms(records) / 1000)
+        scenarios[f"import_{mode}"] = harness.summarize(
+            totals, 0, sum(totals),
+            modules=len(records),
+            deferred_imported=importtime.deferred_imports(records),
+        )
+        print(f"\n{mode} mode, last run:\n{importtime.report(records, args.top)}")
+
+    print()
+    harness.print_table(scenarios)
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    print(f"wrote {harness.write_results('import_time', scenarios, params, args.output)}")
+
+
+if __name__ == "__main__":
+    main(_parse_args())
@@ -0,0 +1,54 @@
+"""Micro-benchmark for the realm <-> Keycloak payload mapper.
+
+    PYTHONPATH=src python benchmarks/payload_mapping.py --iterations 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import harness
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    mapping, models, schemas,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--output", help="result file (default: results/payload_mapping-<rev>.json)")
+    args = parser.parse_args()
+
+    realm = schemas.RealmCreate(
+        customer_type="Large", realm="acme", display_name="Acme", login_theme="keycloak",
+        ssl_required="external", supported_locales=["en", "de"], default_locale="en",
+        smtp_server={"host": "mail", "port": "25"}, access_token_lifespan=300,
+        refresh_token_max_reuse=0, events_enabled=True, events_listeners=["jboss-logging"],
+    )
+    model = models.Realm(**realm.dict())
+    row = realm.dict()
+    representation = mapping.to_keycloak(realm)
+    changes = {"display_name": "Acme Corp", "login_theme": "keycloak", "enabled": True}
+
+    n = args.iterations
+    scenarios = {
+        "to_keycloak_schema": harness.time_calls(lambda: mapping.to_keycloak(realm), n),
+        "to_keycloak_model": harness.time_calls(lambda: mapping.to_keycloak(model), n),
+        "row_to_keycloak": harness.time_calls(lambda: mapping.row_to_keycloak(row), n),
+        "diff_update": harness.time_calls(
+            lambda: mapping.changes_to_keycloak(mapping.diff(model, changes)), n
+        ),
+        "from_keycloak": harness.time_calls(lambda: mapping.from_keycloak(representation), n),
+    }
+    # Per-call latencies are sub-microsecond, so report nanoseconds per call.
+    for result in scenarios.values():
+        result["ns_per_call"] = round(result["duration_s"] / result["requests"] * 1e9, 1)
+
+    print(f"{'conversion':<24}{'ns/call':>12}{'p99_ms':>12}")
+    for name, result in scenarios.items():
+        print(f"{name:<24}{result['ns_per_call']:>12}{result['p99_ms']:>12}")
+    print(f"\nwrote {harness.write_results('payload_mapping', scenarios, {'iterations': n}, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Effect of connection pool size on latency and throughput.
+
+Runs ``--concurrency`` worker threads, each checking out a connection and
+running a query that holds it for ``--query-ms``, once per pool size. Small
+pools queue workers on checkout (see ``checkout_p95_ms``); past the point
+where the database saturates, larger pools only add connections.
+
+    PYTHONPATH=src python benchmarks/pool_sizing.py --pool-sizes 1,2,4,8,16,32 --concurrency 32
+
+By default the database is a temporary SQLite file with a ``sleep_ms``
+function; pass ``--database-url`` to measure a real Postgres (``pg_sleep``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from sqlalchemy import event, text
+
+import harness
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", default="1,2,4,8,16,32", help="comma-separated DB_POOL_SIZE values")
+    parser.add_argument("--concurrency", type=int, default=32, help="worker threads")
+    parser.add_argument("--requests", type=int, default=400, help="queries per pool size")
+    parser.add_argument("--query-ms", type=float, default=5.0, help="time each query holds its connection")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--output", help="result file (default: results/pool_sizing-<rev>.json)")
+    return parser.parse_args()
+
+
+def _engine(url: str, pool_size: int):
+    from tenant_user_service.database import EngineSettings, create_db_engine
+
+    settings = EngineSettings(pool_size=pool_size, max_overflow=0, pool_timeout=60)
+    if not url.startswith("sqlite"):
+        return create_db_engine(url, settings, name=f"bench-{pool_size}"), "SELECT pg_sleep(:ms / 1000.0)"
+
+    engine = create_db_engine(url, settings, name=f"bench-{pool_size}")
+
+    @event.listens_for(engine, "connect")
+    def add_sleep(dbapi_connection, record) -> None:
+        dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000))
+
+    return engine, "SELECT sleep_ms(:ms)"
+
+
+def _run(url: str, pool_size: int) -> Dict[str, Any]:
+    engine, query = _engine(url, pool_size)
+    statement = text(query)
+    latencies: List[float] = []
+    checkout_waits: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(_: int) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                acquired = time.perf_counter()
+                conn.execute(statement, {"ms": args.query_ms})
+            ok = True
+        except Exception:
+            acquired, ok = time.perf_counter(), False
+        finished = time.perf_counter()
+        with lock:
+            latencies.append(finished - started)
+            checkout_waits.append(acquired - started)
+            errors += not ok
+
+    # Open the connections up front so the runs compare steady state.
+    with ThreadPoolExecutor(pool_size) as warmup:
+        list(warmup.map(call, range(pool_size)))
+    latencies.clear()
+    checkout_waits.clear()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(call, range(args.requests)))
+    duration = time.perf_counter() - started
+    engine.dispose()
+
+    wait_p95 = harness.percentile(checkout_waits, 95)
+    return harness.summarize(
+        latencies, errors, duration,
+        pool_size=pool_size,
+        concurrency=args.concurrency,
+        checkout_p95_ms=round(wait_p95 * 1000, 3) if wait_p95 is not None else None,
+    )
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{tmp}/bench.db"
+        scenarios = {
+            f"pool_size={size}": _run(url, size) for size in map(int, args.pool_sizes.split(","))
+        }
+
+    harness.print_table(scenarios)
+    print()
+    for name, result in scenarios.items():
+        print(f"{name:<24}checkout p95 {result['checkout_p95_ms']} ms")
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "database_url")}
+    params["database"] = "sqlite" if not args.database_url else args.database_url.split(":", 1)[0]
+    print(f"wrote {harness.write_results('pool_sizing', scenarios, params, args.output)}")
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    main()
@@ -0,0 +1,188 @@
+"""Load benchmark for the realm API.
+
+Drives the FastAPI ``app`` in-process with concurrent requests for each CRUD
+and bulk scenario, then measures how fast the outbox dispatcher pushes the
+resulting changes into a fake Keycloak with configurable latency.
+
+    PYTHONPATH=src python benchmarks/realm_api.py --requests 500 --concurrency 32
+
+By default the database is a temporary SQLite file; pass ``--database-url``
+to run against a Postgres migrated with ``alembic upgrade head``.
+``--mode async`` on SQLite needs ``aiosqlite`` (``pip install aiosqlite``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Dict
+
+import httpx
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import harness
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bulk-size", type=int, default=100, help="realms per bulk request")
+    parser.add_argument("--kc-latency", type=float, default=0.02, help="fake Keycloak latency (s)")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync", help="REALM_API_MODE")
+    parser.add_argument("--cache-ttl", type=float, default=0.0, help="realm cache TTL (0 disables)")
+    parser.add_argument("--output", help="result file (default: results/realm_api-<rev>.json)")
+    return parser.parse_args()
+
+
+def _engines(url: str, mode: str, pool_size: int):
+    # Imported late: REALM_API_MODE must be set before main is imported.
+    from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import (
+        SCHEMA_NAME, Base,
+    )
+
+    if not url.startswith("sqlite"):
+        engine = create_engine(url, pool_size=pool_size, max_overflow=0)
+        async_url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        return engine, create_async_engine(async_url) if mode == "async" else None
+
+    options = {"schema_translate_map": {SCHEMA_NAME: None}}
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False, "timeout": 30}, execution_options=options
+    )
+    Base.metadata.create_all(engine)
+    async_engine = None
+    if mode == "async":
+        async_engine = create_async_engine(
+            url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+            connect_args={"timeout": 30},
+            execution_options=options,
+        )
+    return engine, async_engine
+
+
+async def _scenarios(client: httpx.AsyncClient, prefix: str, args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    n, concurrency = args.requests, args.concurrency
+    names = [f"{prefix}-{i}" for i in range(n)]
+
+    def request(method: str, url: str, **kwargs):
+        async def call() -> bool:
+            response = await client.request(method, url, **kwargs)
+            return response.status_code < 400
+        return call
+
+    results = {}
+    results["create"] = await harness.run_concurrently(
+        [request("POST", "/realms/", json={"realm": name, "customer_type": "Small"}) for name in names],
+        concurrency,
+    )
+    results["get"] = await harness.run_concurrently(
+        [request("GET", f"/realms/{name}") for name in names], concurrency
+    )
+    results["list"] = await harness.run_concurrently(
+        [request("GET", "/realms/", params={"limit": 100, "name_prefix": prefix}) for _ in names],
+        concurrency,
+    )
+    results["update"] = await harness.run_concurrently(
+        [request("PUT", f"/realms/{name}", json={"display_name": name.upper()}) for name in names],
+        concurrency,
+    )
+    results["delete"] = await harness.run_concurrently(
+        [request("DELETE", f"/realms/{name}") for name in names], concurrency
+    )
+    batches = [
+        {"items": [{"realm": f"{prefix}-bulk-{b}-{i}", "customer_type": "Small"} for i in range(args.bulk_size)]}
+        for b in range(max(1, n // args.bulk_size))
+    ]
+    results["bulk_create"] = await harness.run_concurrently(
+        [request("POST", "/realms/:bulk", json=batch) for batch in batches], concurrency
+    )
+    results["bulk_create"]["realms_per_request"] = args.bulk_size
+    return results
+
+
+def _drain_outbox(session_factory, fake_keycloak) -> Dict[str, Any]:
+    """Time the dispatcher applying every queued operation to the fake Keycloak."""
+    from tenant_user_service.keycloak_admin import KeycloakAdminManager
+    from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import models
+    from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.outbox import (
+        OutboxDispatcher,
+    )
+
+    manager = KeycloakAdminManager(fake_keycloak.url, "admin", "admin")
+    dispatcher = OutboxDispatcher.from_env(session_factory, manager.client)
+    pending = models.RealmOutbox.status == "pending"
+    with session_factory() as db:
+        queued = db.scalar(select(func.count()).where(pending))
+    requests_before = fake_keycloak.requests
+    started = time.perf_counter()
+    while dispatcher.dispatch_once():
+        pass
+    duration = time.perf_counter() - started
+    with session_factory() as db:
+        failed = db.scalar(select(func.count()).where(models.RealmOutbox.status == "failed"))
+    return {
+        "operations": queued,
+        "errors": failed,
+        "keycloak_requests": fake_keycloak.requests - requests_before,
+        "duration_s": round(duration, 4),
+        "throughput_ops": round(queued / duration, 2) if duration else None,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    os.environ["REALM_API_MODE"] = args.mode
+    from tenant_user_service import dependencies
+    from tenant_user_service.main import app
+    from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.cache import RealmCache
+    from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+    with tempfile.TemporaryDirectory() as tmp, FakeKeycloak(latency=args.kc_latency) as fake_keycloak:
+        database_url = args.database_url or f"sqlite:///{tmp}/bench.db"
+        engine, async_engine = _engines(database_url, args.mode, args.concurrency)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        cache = RealmCache(ttl=args.cache_ttl) if args.cache_ttl > 0 else None
+
+        def get_db():
+            with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[dependencies.get_db] = get_db
+        app.dependency_overrides[dependencies.get_realm_cache] = lambda: cache
+        # Authorization has its own benchmark (authz_decisions.py).
+        app.dependency_overrides[dependencies.get_authorizer] = lambda: None
+        if async_engine is not None:
+            async_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+            async def get_async_db():
+                async with async_factory() as db:
+                    yield db
+
+            app.dependency_overrides[dependencies.get_async_db] = get_async_db
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            scenarios = await _scenarios(client, f"bench-{uuid.uuid4().hex[:8]}", args)
+        scenarios["outbox_drain"] = _drain_outbox(session_factory, fake_keycloak)
+        if async_engine is not None:
+            await async_engine.dispose()
+        engine.dispose()
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "database_url")}
+    params["database"] = engine.dialect.name
+    drain = scenarios["outbox_drain"]
+    harness.print_table({k: v for k, v in scenarios.items() if k != "outbox_drain"})
+    print(f"\noutbox drain: {drain['operations']} operations in {drain['duration_s']}s "
+          f"({drain['throughput_ops']} ops/s, {drain['errors']} failed)")
+    print(f"wrote {harness.write_results('realm_api', scenarios, params, args.output)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
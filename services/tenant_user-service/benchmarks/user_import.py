@@ -0,0 +1,101 @@
+"""Throughput of the streaming user import against the fake Keycloak.
+
+``per_user`` writes one user per Keycloak call, one call at a time (what
+importing through the API from outside amounted to); the other scenarios use
+``--batch-size`` users per partial import with up to ``--parallel`` batches
+in flight. Latencies are per Keycloak call.
+
+    PYTHONPATH=src python benchmarks/user_import.py --users 20000 --kc-latency 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import harness
+from tenant_user_service.keycloak_admin import KeycloakAdminManager
+from tenant_user_service.tenant_management.tenant_lifecycle.directory_federation.importer import UserImporter
+from tenant_user_service.tenant_management.tenant_lifecycle.directory_federation.models import UserImportJob
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import SCHEMA_NAME, Base
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+
+class TimedAdmin:
+    def __init__(self, admin, latencies):
+        self.admin = admin
+        self.latencies = latencies
+
+    def partial_import(self, realm, payload):
+        started = time.perf_counter()
+        try:
+            return self.admin.partial_import(realm, payload)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def run_scenario(keycloak, workdir, name, users, batch_size, parallel):
+    engine = create_engine(
+        f"sqlite:///{workdir}/{name}.db", execution_options={"schema_translate_map": {SCHEMA_NAME: None}}
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    keycloak.realms[name] = {"realm": name, "enabled": True}
+    manager = KeycloakAdminManager(keycloak.url, "admin", "admin", max_concurrency=max(parallel, 1))
+    latencies = []
+    importer = UserImporter(
+        session_factory, lambda: TimedAdmin(manager.client(), latencies),
+        batch_size=batch_size, max_parallel=parallel, spool_dir=str(workdir),
+    )
+    path = importer.spool_path(name)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(users):
+            f.write(json.dumps({"username": f"user{i}", "email": f"user{i}@example.com", "firstName": "User"}) + "\n")
+    with session_factory() as db:
+        db.add(UserImportJob(id=name, realm=name, format="ndjson", source_path=path))
+        db.commit()
+
+    started = time.perf_counter()
+    importer.run(name)
+    duration = time.perf_counter() - started
+    with session_factory() as db:
+        job = db.get(UserImportJob, name)
+        errors = users - job.imported
+    result = harness.summarize(latencies, errors, duration, batch_size=batch_size, parallel=parallel)
+    result["throughput_ops"] = round(users / duration, 1)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--per-user", type=int, default=300, help="users for the per_user baseline")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--kc-latency", type=float, default=0.02)
+    parser.add_argument("--output", help="result file (default: results/user_import-<rev>.json)")
+    args = parser.parse_args()
+
+    with FakeKeycloak(latency=args.kc_latency) as keycloak, tempfile.TemporaryDirectory() as workdir:
+        scenarios = {
+            "per_user": run_scenario(keycloak, workdir, "per_user", args.per_user, 1, 1),
+            "batched": run_scenario(keycloak, workdir, "batched", args.users, args.batch_size, 1),
+            "batched_parallel": run_scenario(
+                keycloak, workdir, "batched_parallel", args.users, args.batch_size, args.parallel
+            ),
+        }
+
+    print(f"{'scenario':<20}{'users/s':>12}{'calls':>8}{'p95_ms':>10}{'errors':>8}")
+    for name, result in scenarios.items():
+        print(f"{name:<20}{result['throughput_ops']:>12}{result['requests']:>8}{result['p95_ms']:>10}{result['errors']:>8}")
+    params = vars(args)
+    print(f"wrote {harness.write_results('user_import', scenarios, params, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,21 @@ setup(
         "fastapi>=0.100,<0.101",
         "uvicorn[standard]>=0.23,<0.24",
         "psycopg2-binary>=2.9,<3.0",
+        "asyncpg>=0.28,<1.0",
+        "httpx>=0.24,<0.28",
+        "prometheus_client>=0.17,<1.0",
         "python-keycloak>=2.0,<3.0",
+        "python-jose>=3.3,<4.0",
         "SQLAlchemy>=2.0,<2.1",
         "alembic>=1.11,<1.12",
         "python-dotenv",
-        "hvac>=2.3.0",
         "pydantic>=1.10,<2.0",
-        "PyYAML>=6.0"
     ],
+    # Not needed to serve the API; kept out of the base install.
+    extras_require={
+        "kafka": ["kafka-python>=2.0,<3.0"],
+        "vault": ["hvac>=2.3.0"],
+        "yaml": ["PyYAML>=6.0"],
+    },
     python_requires=">=3.8",
 ) 
\ No newline at end of file
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, NamedTuple, Optional, Protocol, Tuple
+
+from .metrics import ADMISSION_DECISIONS, ADMISSION_QUEUE_WAIT
+from .tenant_management.identity_access_secrets.fine_grained_authorization.tokens import TokenVerifier
+
+logger = logging.getLogger(__name__)
+
+# Everything else counts as a mutation.
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class Limit(NamedTuple):
+    """A token bucket refilled at ``rate`` per second, holding at most ``burst`` tokens."""
+
+    rate: float
+    burst: float
+
+
+# Rate limits ----------------------------------------------------------
+
+class BucketStore(Protocol):
+    """Where the token buckets live; a shared store gives all replicas one budget."""
+
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take a token from ``key``'s bucket: 0 if there was one, else seconds until there is."""
+
+
+class MemoryBucketStore:
+    """Process-local buckets (the default); beyond ``maxsize`` keys the least recently used go."""
+
+    def __init__(self, maxsize: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        with self._lock:
+            now = self._clock()
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class RedisBucketStore:
+    """Buckets in Redis, shared by every replica; requires the optional ``redis`` package.
+
+    Each take is one Lua script (atomic, on Redis' clock); idle buckets
+    expire once they would be full again.
+    """
+
+    _SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = math.min(burst, (tonumber(state[1]) or burst) + math.max(0, now - (tonumber(state[2]) or now)) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+    def __init__(self, url: str, prefix: str = "admission:"):
+        import redis.asyncio  # optional dependency, only needed when configured
+
+        self.prefix = prefix
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    async def take(self, key: str, limit: Limit) -> float:
+        return float(await self._script(keys=[self.prefix + key], args=[limit.rate, limit.burst]))
+
+
+# Concurrency ----------------------------------------------------------
+
+class _Slots:
+    __slots__ = ("in_flight", "waiters")
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests in flight per key; up to ``queue_size`` more wait in line.
+
+    A queued request gets the slot of the next one to finish, or gives up
+    after ``timeout`` seconds. Runs on the event loop, so needs no lock.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._keys: Dict[str, _Slots] = {}
+
+    def in_flight(self, key: str) -> int:
+        slots = self._keys.get(key)
+        return slots.in_flight if slots is not None else 0
+
+    async def acquire(self, key: str) -> Optional[float]:
+        """Seconds waited for a slot, or ``None`` if the queue was full or the wait timed out."""
+        slots = self._keys.setdefault(key, _Slots())
+        if slots.in_flight < self.limit and not slots.waiters:
+            slots.in_flight += 1
+            return 0.0
+        if len(slots.waiters) >= self.queue_size or self.timeout <= 0:
+            return None
+        waiter = asyncio.get_running_loop().create_future()
+        slots.waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except BaseException as exc:  # timed out, or the client went away
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended: pass it on.
+                self.release(key)
+            else:
+                if waiter in slots.waiters:
+                    slots.waiters.remove(waiter)
+                self._discard_if_idle(key, slots)
+            if isinstance(exc, asyncio.TimeoutError):
+                return None
+            raise
+        return time.perf_counter() - started
+
+    def release(self, key: str) -> None:
+        slots = self._keys[key]
+        while slots.waiters:
+            waiter = slots.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot passes to the waiter
+                return
+        slots.in_flight -= 1
+        self._discard_if_idle(key, slots)
+
+    def _discard_if_idle(self, key: str, slots: _Slots) -> None:
+        if not slots.in_flight and not slots.waiters:
+            self._keys.pop(key, None)
+
+
+# Tenants --------------------------------------------------------------
+
+def tenant_key(scope: Dict[str, Any], verifier: Optional[TokenVerifier] = None) -> str:
+    """Who a request is charged to: its token's tenant (else user), else the peer address.
+
+    Only tokens ``verifier`` has already verified count; claims are never
+    read from an unchecked token. A new token is charged to the peer
+    address until its first request has passed authorization, so a forged
+    token naming another tenant spends only the caller's own budget, and
+    minting fresh tokens does not buy fresh buckets.
+    """
+    if verifier is not None:
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    principal = verifier.cached(token)
+                    if principal is not None:
+                        return f"tenant:{principal.tenant}" if principal.tenant else f"user:{principal.subject}"
+                break
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "anonymous"
+
+
+# Middleware -----------------------------------------------------------
+
+class Rejection(NamedTuple):
+    retry_after: float
+    detail: str
+
+
+class AdmissionControl:
+    """Per-tenant admission to the realm API.
+
+    Every request under one of ``prefixes`` takes a token from its tenant's
+    bucket for the route class (``read`` or ``mutation``), then one of the
+    tenant's ``max_concurrency`` slots, waiting in a short queue if need
+    be. Requests that find the bucket empty or the queue full are rejected
+    at once with 429 and ``Retry-After``, before they hold a threadpool
+    thread or a database connection, so one tenant's burst cannot starve
+    the others. Buckets may be shared across replicas (``store``); slots
+    are per process.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Limit],
+        max_concurrency: int = 8,
+        queue_size: int = 16,
+        queue_timeout: float = 1.0,
+        store: Optional[BucketStore] = None,
+        key: Callable[[Dict[str, Any]], str] = tenant_key,
+        prefixes: Iterable[str] = ("/realms", "/realm-templates"),
+    ):
+        self.limits = limits
+        self.store = store or MemoryBucketStore()
+        self.slots = ConcurrencyLimiter(max_concurrency, queue_size, queue_timeout)
+        self.key = key
+        self.prefixes = tuple(prefixes)
+
+    @classmethod
+    def from_env(cls, verifier: Optional[TokenVerifier] = None) -> Optional["AdmissionControl"]:
+        """``None`` unless ADMISSION_ENABLED is true.
+
+        Tenants are recognised by tokens ``verifier`` (the authorization
+        engine's) has verified; without one, requests are charged per address.
+        """
+        if os.getenv("ADMISSION_ENABLED", "false").lower() != "true":
+            return None
+        redis_url = os.getenv("ADMISSION_REDIS_URL")
+        return cls(
+            limits={
+                "read": Limit(float(os.getenv("ADMISSION_READ_RATE", "50")),
+                              float(os.getenv("ADMISSION_READ_BURST", "100"))),
+                "mutation": Limit(float(os.getenv("ADMISSION_MUTATION_RATE", "10")),
+                                  float(os.getenv("ADMISSION_MUTATION_BURST", "20"))),
+            },
+            max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8")),
+            queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", "16")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1")),
+            store=RedisBucketStore(redis_url) if redis_url else None,
+            key=lambda scope: tenant_key(scope, verifier),
+        )
+
+    def applies(self, path: str) -> bool:
+        return path.startswith(self.prefixes)
+
+    async def check_rate(self, key: str, route_class: str) -> Optional[Rejection]:
+        limit = self.limits.get(route_class)
+        if limit is None or limit.rate <= 0:
+            return None
+        try:
+            wait = await self.store.take(f"{key}:{route_class}", limit)
+        except Exception:
+            # Admit rather than fail every request while the store is down.
+            logger.warning("Admission bucket store failed; admitting", exc_info=True)
+            return None
+        if wait > 0:
+            return Rejection(wait, f"Rate limit for {route_class} requests exceeded")
+        return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware enforcing an :class:`AdmissionControl`."""
+
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.control.applies(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        control = self.control
+        key = control.key(scope)
+        route_class = "read" if scope["method"] in READ_METHODS else "mutation"
+        rejection = await control.check_rate(key, route_class)
+        if rejection is not None:
+            ADMISSION_DECISIONS.labels(route_class, "rate_limited").inc()
+            await _reject(send, rejection)
+            return
+        waited = await control.slots.acquire(key)
+        if waited is None:
+            ADMISSION_DECISIONS.labels(route_class, "overloaded").inc()
+            await _reject(send, Rejection(control.slots.timeout, "Too many concurrent requests"))
+            return
+        ADMISSION_DECISIONS.labels(route_class, "queued" if waited else "admitted").inc()
+        if waited:
+            ADMISSION_QUEUE_WAIT.observe(waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.slots.release(key)
+
+
+async def _reject(send, rejection: Rejection) -> None:
+    body = json.dumps({"detail": rejection.detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(rejection.retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
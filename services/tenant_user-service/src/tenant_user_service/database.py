@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from .metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+# Session.info key holding the engine that read-only queries may use.
+REPLICA_BIND = "replica_bind"
+
+
+class EngineSettings:
+    """Connection pool and timeout settings shared by every engine we create.
+
+    Instead of ``pool_pre_ping`` (a round trip on every checkout) connections
+    are only pinged when they sat idle for ``ping_idle_after`` seconds;
+    recently used connections are trusted, and ``pool_recycle`` retires them
+    before server or load-balancer idle limits are hit.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = 1800,
+        ping_idle_after: float = 30.0,
+        statement_timeout_ms: int = 0,
+        connect_timeout: int = 10,
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.ping_idle_after = ping_idle_after
+        self.statement_timeout_ms = statement_timeout_ms
+        self.connect_timeout = connect_timeout
+
+    @classmethod
+    def from_env(cls) -> "EngineSettings":
+        return cls(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            ping_idle_after=float(os.getenv("DB_PING_IDLE_AFTER", "30")),
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")),
+            connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+        )
+
+    def engine_kwargs(self, url: str, name: str, is_async: bool) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            "pool_logging_name": name,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            # LIFO reuse keeps the hot connections hot and lets the rest
+            # idle out, so the ping only hits genuinely idle ones.
+            "pool_use_lifo": True,
+        }
+        if make_url(url).get_backend_name() == "postgresql":
+            kwargs["connect_args"] = self._postgres_connect_args(is_async)
+        return kwargs
+
+    def _postgres_connect_args(self, is_async: bool) -> Dict[str, Any]:
+        if is_async:  # asyncpg
+            args: Dict[str, Any] = {"timeout": self.connect_timeout}
+            if self.statement_timeout_ms:
+                args["server_settings"] = {"statement_timeout": str(self.statement_timeout_ms)}
+            return args
+        args = {"connect_timeout": self.connect_timeout}  # psycopg2
+        if self.statement_timeout_ms:
+            args["options"] = f"-c statement_timeout={self.statement_timeout_ms}"
+        return args
+
+
+def _ping_idle_connections(engine: Engine, idle_after: float) -> None:
+    @event.listens_for(engine.pool, "connect")
+    def on_connect(dbapi_connection, record) -> None:
+        record.info["last_used"] = time.monotonic()
+
+    @event.listens_for(engine.pool, "checkin")
+    def on_checkin(dbapi_connection, record) -> None:
+        if record is not None:
+            record.info["last_used"] = time.monotonic()
+
+    @event.listens_for(engine.pool, "checkout")
+    def on_checkout(dbapi_connection, record, proxy) -> None:
+        if time.monotonic() - record.info.get("last_used", 0.0) < idle_after:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as exc:
+            # The pool discards this connection and checks out a fresh one.
+            raise DisconnectionError() from exc
+        record.info["last_used"] = time.monotonic()
+
+
+def create_db_engine(url: str, settings: EngineSettings, name: str = "primary") -> Engine:
+    engine = create_engine(url, **settings.engine_kwargs(url, name, is_async=False))
+    _ping_idle_connections(engine, settings.ping_idle_after)
+    return engine
+
+
+def create_async_db_engine(url: str, settings: EngineSettings, name: str = "primary") -> AsyncEngine:
+    engine = create_async_engine(url, **settings.engine_kwargs(url, name, is_async=True))
+    _ping_idle_connections(engine.sync_engine, settings.ping_idle_after)
+    return engine
+
+
+def read_options(session: Union[Session, AsyncSession]) -> Dict[str, Any]:
+    """Execute options sending a read-only query to the replica, if configured.
+
+    Writes, and reads that must see them, keep using the session's primary.
+    """
+    replica: Optional[Engine] = session.info.get(REPLICA_BIND)
+    return {"bind_arguments": {"bind": replica}} if replica is not None else {}
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Protocol
+
+from .metrics import EVENT_BATCH_SIZE, EVENTS_PUBLISHED
+
+logger = logging.getLogger(__name__)
+
+
+class Event(NamedTuple):
+    key: str  # partition key: events with one key keep their order
+    value: Dict[str, Any]
+
+
+def envelope(event_type: str, subject: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """CloudEvents-style event body."""
+    return {
+        "id": uuid.uuid4().hex,
+        "type": event_type,
+        "subject": subject,
+        "time": datetime.now(timezone.utc).isoformat(),
+        "data": data,
+    }
+
+
+def _encode(value: Dict[str, Any]) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+# Backends -------------------------------------------------------------
+
+class EventBackend(Protocol):
+    def send_batch(self, batch: List[Event]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class MemoryBackend:
+    """Keeps the most recent events in memory (no broker configured, tests)."""
+
+    def __init__(self, maxlen: int = 10000):
+        self.events: Deque[Event] = deque(maxlen=maxlen)
+
+    def send_batch(self, batch: List[Event]) -> None:
+        self.events.extend(batch)
+
+    def close(self) -> None:
+        pass
+
+
+class FileBackend:
+    """Appends events to a JSON-lines file; with ``gzip`` each batch is one gzip member."""
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = path
+        self.compression = compression
+
+    def send_batch(self, batch: List[Event]) -> None:
+        data = b"".join(_encode(event.value) + b"\n" for event in batch)
+        if self.compression == "gzip":
+            data = gzip.compress(data)
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def close(self) -> None:
+        pass
+
+
+class KafkaBackend:
+    """Sends each batch to ``topic`` and waits for the broker to acknowledge it.
+
+    Requires the ``kafka`` extra (kafka-python).
+    """
+
+    def __init__(self, bootstrap_servers: str, topic: str, compression: Optional[str] = None):
+        from kafka import KafkaProducer  # optional dependency
+
+        self.topic = topic
+        self.producer = KafkaProducer(
+            bootstrap_servers=bootstrap_servers.split(","),
+            compression_type=compression,
+            acks="all",
+            key_serializer=str.encode,
+            value_serializer=_encode,
+        )
+
+    def send_batch(self, batch: List[Event]) -> None:
+        futures = [self.producer.send(self.topic, key=event.key, value=event.value) for event in batch]
+        self.producer.flush()
+        for future in futures:
+            future.get()  # raises if the broker rejected the record
+
+    def close(self) -> None:
+        self.producer.close()
+
+
+# Publisher ------------------------------------------------------------
+
+class EventPublisher:
+    """Publishes events in batches from a background thread.
+
+    ``publish`` never blocks: events wait in a bounded queue and are dropped
+    (and counted) when it is full. A batch is sent once ``batch_size`` events
+    are waiting or ``linger`` seconds after its first event arrived. Events
+    are published after the change is committed, so delivery is at most once.
+    A batch the backend still refuses after ``retries`` goes to ``fallback``
+    (e.g. a file to replay once the broker is back) instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        backend: EventBackend,
+        linger: float = 0.05,
+        batch_size: int = 500,
+        queue_size: int = 10000,
+        retries: int = 3,
+        fallback: Optional[EventBackend] = None,
+    ):
+        self.backend = backend
+        self.fallback = fallback
+        self.linger = linger
+        self.batch_size = batch_size
+        self.retries = retries
+        self._queue: "queue.Queue[Event]" = queue.Queue(queue_size)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "EventPublisher":
+        """Kafka when KAFKA_BOOTSTRAP_SERVERS is set, else EVENTS_FILE, else memory.
+
+        If Kafka cannot be reached, at startup or later on, the events go
+        to EVENTS_FILE (default ``events.jsonl``) instead, so they can be
+        replayed later.
+        """
+        compression = os.getenv("EVENTS_COMPRESSION") or None
+        bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS")
+        path = os.getenv("EVENTS_FILE")
+        backend: EventBackend
+        fallback: Optional[EventBackend] = None
+        if bootstrap_servers:
+            path = path or "events.jsonl"
+            try:
+                backend = KafkaBackend(
+                    bootstrap_servers, os.getenv("EVENTS_TOPIC", "tenant.realm-events"), compression
+                )
+                fallback = FileBackend(path, compression)
+            except Exception:
+                logger.warning("Kafka unavailable, writing events to %s", path, exc_info=True)
+                backend = FileBackend(path, compression)
+        elif path:
+            backend = FileBackend(path, compression)
+        else:
+            backend = MemoryBackend()
+        return cls(
+            backend,
+            linger=float(os.getenv("EVENTS_LINGER_MS", "50")) / 1000,
+            batch_size=int(os.getenv("EVENTS_BATCH_SIZE", "500")),
+            queue_size=int(os.getenv("EVENTS_QUEUE_SIZE", "10000")),
+            fallback=fallback,
+        )
+
+    def publish(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(Event(key, value))
+        except queue.Full:
+            EVENTS_PUBLISHED.labels("dropped").inc()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Send what is queued, then stop the thread and close the backend."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.backend.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every published event was handed to the backend."""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def _next_batch(self) -> List[Event]:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch: List[Event]) -> None:
+        EVENT_BATCH_SIZE.observe(len(batch))
+        for attempt in range(self.retries + 1):
+            try:
+                self.backend.send_batch(batch)
+            except Exception:
+                if attempt == self.retries:
+                    self._spill(batch, attempt + 1)
+                    return
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+            else:
+                EVENTS_PUBLISHED.labels("sent").inc(len(batch))
+                return
+
+    def _spill(self, batch: List[Event], attempts: int) -> None:
+        if self.fallback is not None:
+            try:
+                self.fallback.send_batch(batch)
+            except Exception:
+                logger.exception("Writing %d events to the fallback backend failed", len(batch))
+            else:
+                logger.warning("Event backend failed %d times, spilled %d events to the fallback", attempts, len(batch))
+                EVENTS_PUBLISHED.labels("spilled").inc(len(batch))
+                return
+        logger.exception("Dropping %d events after %d attempts", len(batch), attempts)
+        EVENTS_PUBLISHED.labels("failed").inc(len(batch))
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                continue
+            try:
+                self._send(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Sequence, Tuple
+
+
+class InFlight:
+    """Coalesces concurrent identical calls in this process (threadpool handlers).
+
+    The first caller for any of ``keys`` runs the call; callers arriving
+    while it runs wait for and share its outcome.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def run(self, keys: Sequence[Hashable], call: Callable[[], Tuple[Any, bool]]) -> Tuple[Any, bool]:
+        with self._lock:
+            running = next((self._calls[k] for k in keys if k in self._calls), None)
+            if running is None:
+                future: Future = Future()
+                for k in keys:
+                    self._calls[k] = future
+        if running is not None:
+            return running.result()[0], True
+
+        try:
+            result = call()
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                for k in keys:
+                    if self._calls.get(k) is future:
+                        del self._calls[k]
+
+
+class AsyncInFlight:
+    """:class:`InFlight` for handlers running on the event loop."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(
+        self, keys: Sequence[Hashable], call: Callable[[], Awaitable[Tuple[Any, bool]]]
+    ) -> Tuple[Any, bool]:
+        running = next((self._calls[k] for k in keys if k in self._calls), None)
+        if running is not None:
+            return (await asyncio.shield(running))[0], True
+
+        future = asyncio.get_running_loop().create_future()
+        for k in keys:
+            self._calls[k] = future
+        try:
+            result = await call()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            for k in keys:
+                if self._calls.get(k) is future:
+                    del self._calls[k]
+            if future.done() and not future.cancelled():
+                future.exception()  # mark retrieved when nobody was waiting
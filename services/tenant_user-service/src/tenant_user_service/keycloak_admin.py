@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from .metrics import KEYCLOAK_SLOT_WAIT, observe_keycloak
+
+if TYPE_CHECKING:
+    from keycloak import KeycloakAdmin
+
+# python-keycloak (and the requests/pkg_resources stack under it) is imported
+# on the first Keycloak call rather than at startup.
+
+
+class KeycloakAdminManager:
+    """Process-wide owner of a single authenticated ``KeycloakAdmin``.
+
+    The admin client (and therefore its HTTP session and token pair) is created
+    lazily on the first Keycloak call and shared by every request afterwards.
+    Tokens are refreshed ahead of expiry under a lock so concurrent requests
+    never race each other into the token endpoint, and a semaphore caps how
+    many Keycloak calls may be in flight at once.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        username: str,
+        password: str,
+        realm_name: str = "master",
+        verify: bool = False,
+        max_concurrency: int = 10,
+        refresh_margin: float = 30.0,
+        admin_factory: Optional[Callable[..., KeycloakAdmin]] = None,
+    ):
+        self.server_url = server_url
+        self.username = username
+        self.password = password
+        self.realm_name = realm_name
+        self.verify = verify
+        self.max_concurrency = max_concurrency
+        self.refresh_margin = refresh_margin
+        self._admin_factory = admin_factory
+
+        self._admin: Optional[KeycloakAdmin] = None
+        self._refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @classmethod
+    def from_env(cls) -> "KeycloakAdminManager":
+        return cls(
+            server_url=os.getenv("KEYCLOAK_URL", "http://keycloak-tenant:8080/"),
+            username=os.getenv("KEYCLOAK_ADMIN", "admin"),
+            password=os.getenv("KEYCLOAK_ADMIN_PASSWORD", "admin"),
+            realm_name=os.getenv("KEYCLOAK_ADMIN_REALM", "master"),
+            max_concurrency=int(os.getenv("KEYCLOAK_MAX_CONCURRENCY", "10")),
+            refresh_margin=float(os.getenv("KEYCLOAK_TOKEN_REFRESH_MARGIN", "30")),
+        )
+
+    # Connection management ---------------------------------------------
+
+    @property
+    def admin(self) -> KeycloakAdmin:
+        """Return the shared admin client, logging in on first use."""
+        if self._admin is None:
+            with self._lock:
+                if self._admin is None:
+                    self._admin = self._login()
+        return self._admin
+
+    def _login(self) -> KeycloakAdmin:
+        factory = self._admin_factory
+        if factory is None:
+            from keycloak import KeycloakAdmin as factory
+        admin = factory(
+            server_url=self.server_url,
+            username=self.username,
+            password=self.password,
+            realm_name=self.realm_name,
+            verify=self.verify,
+        )
+        self._size_http_pool(admin)
+        self._schedule_refresh(admin)
+        return admin
+
+    def _size_http_pool(self, admin: KeycloakAdmin) -> None:
+        # requests keeps at most 10 connections per host by default; match the
+        # pool to our concurrency cap so parallel calls do not reconnect.
+        session = getattr(getattr(admin, "connection", None), "_s", None)
+        if session is None:
+            return
+        from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
+        for prefix, adapter in list(session.adapters.items()):
+            if isinstance(adapter, HTTPAdapter):
+                # Keep python-keycloak's retry policy (it retries POSTs once).
+                session.mount(prefix, HTTPAdapter(
+                    pool_connections=DEFAULT_POOLSIZE,
+                    pool_maxsize=max(self.max_concurrency, DEFAULT_POOLSIZE),
+                    max_retries=adapter.max_retries,
+                ))
+                adapter.close()
+
+    @staticmethod
+    def _connection(admin: KeycloakAdmin) -> Any:
+        # python-keycloak >= 2.13 keeps the token on ``admin.connection``;
+        # earlier 2.x releases keep it on the admin object itself.
+        return getattr(admin, "connection", admin)
+
+    def _schedule_refresh(self, admin: KeycloakAdmin) -> None:
+        token = self._connection(admin).token or {}
+        lifetime = float(token.get("expires_in", 60))
+        self._refresh_at = time.monotonic() + max(lifetime - self.refresh_margin, lifetime / 2)
+
+    def _ensure_fresh_token(self) -> None:
+        if time.monotonic() < self._refresh_at:
+            return
+        with self._lock:
+            if time.monotonic() < self._refresh_at or self._admin is None:
+                return
+            from keycloak.exceptions import KeycloakError
+
+            conn = self._connection(self._admin)
+            try:
+                conn.refresh_token()
+            except KeycloakError:
+                # Refresh token expired or was revoked: fall back to a new login.
+                conn.get_token()
+            self._schedule_refresh(self._admin)
+
+    def invalidate(self) -> None:
+        """Drop the shared client so the next call performs a fresh login."""
+        with self._lock:
+            self._admin = None
+            self._refresh_at = 0.0
+
+    def rotate_password(self, password: str) -> None:
+        """Use ``password`` from now on; the next call logs in with it."""
+        with self._lock:
+            self.password = password
+            self._admin = None
+            self._refresh_at = 0.0
+
+    # Calls ---------------------------------------------------------------
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Invoke ``KeycloakAdmin.<method>`` within the concurrency limit."""
+        return self._invoke(method, lambda admin: getattr(admin, method)(*args, **kwargs))
+
+    def partial_import(self, realm_name: str, payload: dict) -> dict:
+        """``POST /admin/realms/{realm}/partialImport``, which python-keycloak 2.x does not wrap."""
+        return self.realm_call("partial_import", "POST", realm_name, "partialImport", payload)
+
+    def realm_call(
+        self, operation: str, method: str, realm_name: str, path: str, payload: Optional[dict] = None, **params: Any
+    ) -> Any:
+        """``<method> /admin/realms/{realm}/<path>`` within the concurrency limit.
+
+        For endpoints python-keycloak 2.x does not wrap, or only for the realm
+        the admin client logged in to (components, client secrets).
+        """
+        from keycloak.exceptions import (
+            KeycloakDeleteError, KeycloakGetError, KeycloakPostError, KeycloakPutError, raise_error_from_response,
+        )
+
+        url = f"admin/realms/{realm_name}/{path}"
+        errors = {"GET": KeycloakGetError, "POST": KeycloakPostError, "PUT": KeycloakPutError,
+                  "DELETE": KeycloakDeleteError}
+
+        def send(admin: KeycloakAdmin) -> Any:
+            connection = self._connection(admin)
+            if method == "GET":
+                response = connection.raw_get(url, **params)
+            elif method == "DELETE":
+                response = connection.raw_delete(url, **params)
+            else:
+                send_body = connection.raw_post if method == "POST" else connection.raw_put
+                response = send_body(url, data=json.dumps(payload or {}), **params)
+            return raise_error_from_response(response, errors[method])
+
+        return self._invoke(operation, send)
+
+    def _invoke(self, operation: str, invoke: Callable[[KeycloakAdmin], Any]) -> Any:
+        # Latency includes waiting for a slot; the wait is also exported
+        # separately to tell Keycloak slowness from local queueing.
+        from keycloak.exceptions import KeycloakAuthenticationError
+
+        with observe_keycloak(operation):
+            waiting_since = time.perf_counter()
+            with self._slots:
+                KEYCLOAK_SLOT_WAIT.observe(time.perf_counter() - waiting_since)
+                admin = self.admin
+                self._ensure_fresh_token()
+                try:
+                    return invoke(admin)
+                except KeycloakAuthenticationError:
+                    # Session revoked server-side; log in again and retry once.
+                    self.invalidate()
+                    return invoke(self.admin)
+
+    def client(self) -> "PooledKeycloakAdmin":
+        return PooledKeycloakAdmin(self)
+
+
+class PooledKeycloakAdmin:
+    """``KeycloakAdmin`` stand-in that routes every method through the manager.
+
+    Creating one is free: no HTTP traffic happens until a method is called.
+    """
+
+    def __init__(self, manager: KeycloakAdminManager):
+        self._manager = manager
+
+    @property
+    def server_url(self) -> str:
+        return self._manager.server_url
+
+    def partial_import(self, realm_name: str, payload: dict) -> dict:
+        return self._manager.partial_import(realm_name, payload)
+
+    def realm_call(self, operation: str, method: str, realm_name: str, path: str, *args: Any, **kwargs: Any) -> Any:
+        return self._manager.realm_call(operation, method, realm_name, path, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._manager.admin, name)
+        if not callable(attr):
+            return attr
+
+        def _call(*args: Any, **kwargs: Any) -> Any:
+            return self._manager.call(name, *args, **kwargs)
+
+        return _call
@@ -1,13 +1,113 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from .admission import AdmissionControl, AdmissionMiddleware
+from .dependencies import (
+    REALM_API_MODE, get_audit_trail, get_authorizer, get_event_publisher, get_outbox_dispatcher, get_realm_cache,
+    get_reconciler, get_rotation_scheduler, get_secrets, get_template_cache, stop_user_imports,
+)
+from .metrics import PrometheusMiddleware
+from .structured_logging import RequestIdMiddleware, configure_logging, shutdown_logging
+from .tenant_management.tenant_lifecycle.directory_federation import api as user_import_api
 from .tenant_management.tenant_lifecycle.realm_management import api as realm_api
+from .tenant_management.tenant_lifecycle.realm_management import api_async as realm_api_async
+from .warmup import Readiness
+
+# Applies queued Keycloak side effects; disable on replicas that should only
+# serve the API.
+OUTBOX_DISPATCHER_ENABLED = os.getenv("OUTBOX_DISPATCHER_ENABLED", "true").lower() == "true"
+
 
-app = FastAPI(title="Tenant User Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Only background threads start here; database engines, Keycloak clients
+    # and their imports are created on first use or by STARTUP_WARMUP hooks.
+    configure_logging()
+    # Renews the leases of Vault-issued credentials (no-op without VAULT_ADDR);
+    # secrets themselves are read on first use.
+    secrets = get_secrets()
+    if secrets is not None:
+        secrets.start()
+    if OUTBOX_DISPATCHER_ENABLED:
+        get_outbox_dispatcher().start()
+    # No-op unless RECONCILE_INTERVAL > 0; replicas coordinate via an
+    # advisory lock so only one runs each pass.
+    get_reconciler().start()
+    # No-op unless KEY_ROTATION_PERIOD_DAYS > 0; one replica at a time runs
+    # the rotations, paced by KEY_ROTATION_RATE.
+    get_rotation_scheduler().start()
+    get_event_publisher().start()
+    # Writes records spilled by the previous shutdown, then flushes in the
+    # background.
+    get_audit_trail().start()
+    app.state.readiness = Readiness.from_env()
+    app.state.readiness.start()
+    try:
+        yield
+    finally:
+        # Sends the events and audit records still queued before the process
+        # exits; audit records the database refuses are spilled to disk.
+        # Running user imports stop at a checkpoint and can be resumed.
+        stop_user_imports()
+        get_rotation_scheduler().stop()
+        get_event_publisher().stop()
+        get_audit_trail().stop()
+        get_reconciler().stop()
+        if OUTBOX_DISPATCHER_ENABLED:
+            get_outbox_dispatcher().stop()
+        if secrets is not None:
+            secrets.stop()
+        # Last, so records from the other shutdown steps are flushed.
+        shutdown_logging()
+
+
+app = FastAPI(title="Tenant User Service", lifespan=lifespan)
+# Innermost, so rejected requests are still timed and carry a request id.
+# Requests are charged to the tenant of a token authorization has verified.
+authorizer = get_authorizer()
+admission = AdmissionControl.from_env(authorizer.verifier if authorizer is not None else None)
+if admission is not None:
+    app.add_middleware(AdmissionMiddleware, control=admission)
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 # Routers
+if REALM_API_MODE == "async":
+    # Async handlers take precedence; routes without an async variant fall
+    # through to the sync router.
+    app.include_router(realm_api_async.router)
 app.include_router(realm_api.router)
+app.include_router(realm_api.templates_router)
+app.include_router(user_import_api.router)
 
 
 @app.get("/healthz")
 async def health_check() -> dict[str, str]:
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness_check() -> JSONResponse:
+    readiness = getattr(app.state, "readiness", None)
+    if readiness is None or not readiness.is_ready():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return JSONResponse({"status": "ready", "warmup": readiness.timings})
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> dict:
+    cache = get_realm_cache()
+    return {
+        "realms": cache.stats.as_dict() if cache is not None else None,
+        "templates": get_template_cache().stats.as_dict(),
+    }
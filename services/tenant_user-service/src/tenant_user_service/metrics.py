@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .cache import CacheStats
+
+# Latency buckets tuned for an API whose calls range from cache hits (~1ms)
+# to Keycloak round trips (~100ms-1s).
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served.",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool.",
+    ["pool"],
+    buckets=_LATENCY_BUCKETS,
+)
+KEYCLOAK_REQUEST_DURATION = Histogram(
+    "keycloak_request_duration_seconds",
+    "Keycloak admin API latency by operation and outcome.",
+    ["operation", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+KEYCLOAK_SLOT_WAIT = Histogram(
+    "keycloak_slot_wait_seconds",
+    "Time spent waiting for one of the KEYCLOAK_MAX_CONCURRENCY call slots.",
+    buckets=_LATENCY_BUCKETS,
+)
+KEYCLOAK_ERRORS = Counter(
+    "keycloak_request_errors",
+    "Failed Keycloak admin API calls by operation and error type.",
+    ["operation", "error"],
+)
+EVENTS_PUBLISHED = Counter(
+    "events_published",
+    "Domain events by outcome: sent, spilled (to the fallback file), dropped (queue full) or failed (backend error).",
+    ["outcome"],
+)
+EVENT_BATCH_SIZE = Histogram(
+    "event_batch_size",
+    "Events per batch handed to the event backend.",
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000),
+)
+AUTHZ_DECISIONS = Counter(
+    "authz_decisions",
+    "Authorization checks by action and outcome: allowed, denied or unauthenticated.",
+    ["action", "outcome"],
+)
+AUDIT_RECORDS = Counter(
+    "audit_records",
+    "Audit records by outcome: written, spilled (to AUDIT_SPILL_FILE) or failed.",
+    ["outcome"],
+)
+AUDIT_BUFFER_FULL = Counter(
+    "audit_buffer_full",
+    "Times a mutation waited for the audit flusher because the buffer was full.",
+)
+AUDIT_BATCH_SIZE = Histogram(
+    "audit_batch_size",
+    "Audit records per INSERT.",
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000),
+)
+USER_IMPORT_RECORDS = Counter(
+    "user_import_records",
+    "Records of user import jobs by outcome: imported, skipped (already in the realm), duplicates, invalid or failed.",
+    ["outcome"],
+)
+USER_IMPORT_BATCH_DURATION = Histogram(
+    "user_import_batch_duration_seconds",
+    "Time to write one batch of imported users to Keycloak, including retries.",
+    buckets=_LATENCY_BUCKETS + (30.0, 60.0),
+)
+VAULT_SECRET_REFRESHES = Counter(
+    "vault_secret_refreshes",
+    "Background secret refreshes by outcome: renewed (lease extended), unchanged, rotated or failed.",
+    ["outcome"],
+)
+CREDENTIAL_ROTATIONS = Counter(
+    "credential_rotations",
+    "Scheduled realm credential changes by action (rotate, retire) and outcome (done, failed).",
+    ["action", "outcome"],
+)
+CREDENTIAL_ROTATION_BUDGET_WAIT = Histogram(
+    "credential_rotation_budget_wait_seconds",
+    "Time a due rotation waited for the KEY_ROTATION_RATE budget.",
+    buckets=_LATENCY_BUCKETS + (30.0, 60.0),
+)
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions",
+    "Realm API admission by route class and outcome: admitted, queued (admitted after waiting), "
+    "rate_limited or overloaded (queue full or wait timed out).",
+    ["route_class", "outcome"],
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests waited for one of their tenant's ADMISSION_MAX_CONCURRENCY slots.",
+    buckets=_LATENCY_BUCKETS,
+)
+
+
+# Keycloak -----------------------------------------------------------------
+
+@contextmanager
+def observe_keycloak(operation: str) -> Iterator[None]:
+    """Time one Keycloak call; exceptions are counted by class and re-raised."""
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except Exception as exc:
+        outcome = "error"
+        KEYCLOAK_ERRORS.labels(operation, exc.__class__.__name__).inc()
+        raise
+    finally:
+        KEYCLOAK_REQUEST_DURATION.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+# Database pool ------------------------------------------------------------
+
+_pools: "weakref.WeakSet[QueuePool]" = weakref.WeakSet()
+
+
+class _InstrumentedPoolMixin:
+    """Records checkout wait per pool, labelled by ``pool_logging_name``."""
+
+    def __init__(self, *args: Any, max_overflow: int = 10, logging_name: Optional[str] = None, **kwargs: Any):
+        super().__init__(*args, max_overflow=max_overflow, logging_name=logging_name, **kwargs)
+        # Kept as configured; the pool's own copies are private.
+        self.max_overflow = max_overflow
+        self.metrics_name = logging_name or "default"
+        _pools.add(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class _PoolCollector:
+    """Reports size, usage and saturation of every live instrumented pool."""
+
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size.", labels=["pool"])
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out", "Connections currently checked out.", labels=["pool"]
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow", "Connections open beyond pool_size.", labels=["pool"]
+        )
+        saturation = GaugeMetricFamily(
+            "db_pool_saturation",
+            "Checked-out connections as a fraction of pool_size + max_overflow.",
+            labels=["pool"],
+        )
+        for pool in list(_pools):
+            name = pool.metrics_name
+            capacity = pool.size() + max(pool.max_overflow, 0)
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+            saturation.add_metric([name], pool.checkedout() / capacity if capacity else 0.0)
+        return [size, checked_out, overflow, saturation]
+
+
+# Caches -------------------------------------------------------------------
+
+_caches: Dict[str, CacheStats] = {}
+
+
+def track_cache(name: str, stats: CacheStats) -> None:
+    """Export ``stats`` as ``cache_*_total{cache="<name>"}`` counters."""
+    _caches[name] = stats
+
+
+class _CacheCollector:
+    def collect(self):
+        families = {
+            field: CounterMetricFamily(f"cache_{field}", f"Cache {field} by cache.", labels=["cache"])
+            for field in ("hits", "misses", "evictions", "invalidations")
+        }
+        for name, stats in list(_caches.items()):
+            for field, family in families.items():
+                family.add_metric([name], getattr(stats, field))
+        return list(families.values())
+
+
+REGISTRY.register(_PoolCollector())
+REGISTRY.register(_CacheCollector())
+
+
+# HTTP -----------------------------------------------------------------------
+
+class PrometheusMiddleware:
+    """ASGI middleware timing each request under its route template.
+
+    Labelling by template (``/realms/{realm_name}``) rather than raw path
+    keeps the series count bounded; unmatched paths share one label. The
+    timer stops when the last body chunk is sent, so streamed exports are
+    measured in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,40 @@
+from typing import Literal
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, String
+
+# Audit records share the service's metadata so create_all and Alembic see
+# one schema.
+from ...tenant_lifecycle.realm_management.models import Base
+
+# Every action an audit record is written with; GET /realms/:audit filters on these.
+AuditAction = Literal["created", "updated", "deleted", "credentials_rotated", "credentials_retired"]
+
+
+class AuditRecord(Base):
+    """One realm mutation, chained to the previous record by ``hash``.
+
+    ``hash`` is the SHA-256 of ``prev_hash`` and the record's content (see
+    :func:`.trail.record_hash`), so editing or deleting a row breaks the chain
+    from that ``seq`` on. On Postgres the table is range-partitioned by month
+    on ``occurred_at`` (migration 0008).
+    """
+
+    __tablename__ = "audit_records"
+    __table_args__ = (
+        Index("ix_audit_records_realm_seq", "realm", "seq"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    # Position in the hash chain, assigned when the record is written.
+    seq: int = Column(BigInteger, primary_key=True, autoincrement=False)
+    # Partition key, so part of the primary key on Postgres.
+    occurred_at = Column(DateTime(timezone=True), primary_key=True)
+    realm: str = Column(String, nullable=False)
+    action: str = Column(String, nullable=False)  # an AuditAction
+    actor: str | None = Column(String)
+    request_id: str | None = Column(String)
+    # Changed attributes only: values before and after the mutation.
+    before = Column(JSON)
+    after = Column(JSON)
+    prev_hash: str = Column(String(64), nullable=False)
+    hash: str = Column(String(64), nullable=False)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ...tenant_lifecycle.realm_management import pagination
+from ....database import read_options
+from .models import AuditRecord
+from .schemas import AuditVerifyReport
+from .trail import GENESIS_HASH, record_hash
+
+
+def page(
+    db: Session,
+    realm: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = pagination.DEFAULT_PAGE_SIZE,
+) -> Tuple[List[AuditRecord], Optional[str]]:
+    """Newest records first, keyset-paginated on ``seq``.
+
+    With ``realm`` the scan runs on ``ix_audit_records_realm_seq``, otherwise
+    on the primary key; ``since``/``until`` also prune partitions. Raises
+    ``ValueError`` for a malformed cursor.
+    """
+    stmt = select(AuditRecord)
+    before_seq = pagination.decode_cursor(cursor)
+    if before_seq is not None:
+        stmt = stmt.where(AuditRecord.seq < before_seq)
+    if realm is not None:
+        stmt = stmt.where(AuditRecord.realm == realm)
+    if action is not None:
+        stmt = stmt.where(AuditRecord.action == action)
+    if since is not None:
+        stmt = stmt.where(AuditRecord.occurred_at >= since)
+    if until is not None:
+        stmt = stmt.where(AuditRecord.occurred_at < until)
+    rows = list(db.scalars(
+        stmt.order_by(AuditRecord.seq.desc()).limit(limit + 1), **read_options(db)
+    ))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1].seq)
+    return rows, next_cursor
+
+
+def verify(db: Session, after_seq: int = 0, limit: int = 10_000) -> AuditVerifyReport:
+    """Re-compute the chain for up to ``limit`` records following ``after_seq``.
+
+    Reads from the primary: a lagging replica would report a truncated chain.
+    Records removed from the end of the chain cannot be detected from the
+    table alone; compare last_seq and its hash with a copy kept elsewhere.
+    """
+    report = AuditVerifyReport(after_seq=after_seq)
+    prev_hash = GENESIS_HASH
+    if after_seq:
+        prev_hash = db.scalar(select(AuditRecord.hash).where(AuditRecord.seq == after_seq))
+        if prev_hash is None:
+            report.valid, report.broken_at, report.detail = False, after_seq, "record missing"
+            return report
+    expected_seq = after_seq + 1
+    rows = db.scalars(
+        select(AuditRecord).where(AuditRecord.seq > after_seq).order_by(AuditRecord.seq).limit(limit)
+    )
+    for row in rows:
+        broken_at = row.seq
+        if row.seq != expected_seq:
+            broken_at, detail = expected_seq, f"records {expected_seq}..{row.seq - 1} missing"
+        elif row.prev_hash != prev_hash:
+            detail = "link to the previous record does not match"
+        elif row.hash != record_hash(prev_hash, row.seq, row):
+            detail = "content does not match its hash"
+        else:
+            detail = None
+        if detail is not None:
+            report.valid, report.broken_at, report.detail = False, broken_at, detail
+            return report
+        report.checked += 1
+        report.last_seq = row.seq
+        prev_hash = row.hash
+        expected_seq += 1
+    return report
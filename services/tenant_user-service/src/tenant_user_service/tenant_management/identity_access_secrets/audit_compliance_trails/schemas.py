@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+
+class AuditRecordRead(BaseModel):
+    seq: int
+    occurred_at: datetime
+    realm: str
+    action: str
+    actor: Optional[str]
+    request_id: Optional[str]
+    before: Optional[Dict[str, Any]]
+    after: Optional[Dict[str, Any]]
+    prev_hash: str
+    hash: str
+
+    class Config:
+        orm_mode = True
+
+
+class AuditVerifyReport(BaseModel):
+    """Result of re-computing the hash chain over ``checked`` records after ``after_seq``."""
+
+    after_seq: int
+    checked: int = 0
+    last_seq: Optional[int] = None
+    valid: bool = True
+    # First record whose hash, link or position does not match.
+    broken_at: Optional[int] = None
+    detail: Optional[str] = None
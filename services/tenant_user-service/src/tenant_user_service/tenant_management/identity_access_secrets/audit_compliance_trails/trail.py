@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from ....metrics import AUDIT_BATCH_SIZE, AUDIT_BUFFER_FULL, AUDIT_RECORDS
+from ....structured_logging import request_id_var
+from .models import AuditAction, AuditRecord
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0" * 64
+
+# Arbitrary constant identifying the audit writers' Postgres advisory lock.
+_ADVISORY_LOCK_KEY = 0x6175646974
+
+
+class AuditEntry(NamedTuple):
+    """A mutation waiting to be written; ``seq`` and hashes are assigned at write time."""
+
+    occurred_at: datetime
+    realm: str
+    action: str
+    actor: Optional[str]
+    request_id: Optional[str]
+    before: Optional[Dict[str, Any]]
+    after: Optional[Dict[str, Any]]
+
+
+# Hash chain -----------------------------------------------------------
+
+def _timestamp(value: datetime) -> str:
+    # SQLite hands back naive datetimes; hash the UTC wall time either way.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def record_hash(prev_hash: str, seq: int, record: Any) -> str:
+    """Chain hash of an ``AuditEntry`` or stored ``AuditRecord`` at position ``seq``."""
+    content = json.dumps(
+        [seq, _timestamp(record.occurred_at), record.realm, record.action, record.actor,
+         record.request_id, record.before, record.after],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256((prev_hash + content).encode()).hexdigest()
+
+
+def _jsonable(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # What the JSON column will hand back, so the hash is stable across a round trip.
+    return json.loads(json.dumps(value, default=str)) if value is not None else None
+
+
+# Partitions -----------------------------------------------------------
+
+def partition_bounds(day: date) -> Tuple[date, date]:
+    start = day.replace(day=1)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def ensure_partition(db: Session, day: date) -> None:
+    """Create the monthly partition holding ``day`` if it is missing (Postgres only)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    start, end = partition_bounds(day)
+    schema = AuditRecord.__table__.schema
+    db.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{schema}".audit_records_{start:%Y_%m} '
+        f'PARTITION OF "{schema}".audit_records '
+        # Explicit UTC bounds: bare dates would be read in the session time zone,
+        # while rows are routed here by their UTC date.
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    ))
+
+
+# Buffer ---------------------------------------------------------------
+
+class RingBuffer:
+    """Fixed-capacity FIFO over preallocated slots.
+
+    ``put`` refuses new items when full instead of overwriting: audit
+    records are never dropped to make room. Not thread-safe on its own.
+    """
+
+    def __init__(self, capacity: int):
+        self._slots: List[Any] = [None] * capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, item: Any) -> bool:
+        if self._size == len(self._slots):
+            return False
+        self._slots[(self._head + self._size) % len(self._slots)] = item
+        self._size += 1
+        return True
+
+    def take(self, limit: int) -> List[Any]:
+        items = []
+        while self._size and len(items) < limit:
+            items.append(self._slots[self._head])
+            self._slots[self._head] = None
+            self._head = (self._head + 1) % len(self._slots)
+            self._size -= 1
+        return items
+
+
+# Writer ---------------------------------------------------------------
+
+class AuditTrail:
+    """Buffers audit entries and writes them in batches from a background thread.
+
+    ``record`` only appends to an in-memory ring buffer. A batch is written
+    once ``batch_size`` entries are waiting or every ``interval`` seconds, as
+    one multi-row INSERT under an advisory lock that keeps the hash chain
+    linear across replicas. When the buffer is full, ``record`` waits for the
+    flusher rather than dropping anything. Batches the database still
+    refuses after ``retries`` attempts (and whatever is left at shutdown) are
+    appended to ``spill_path`` and written on the next start, so it has to be
+    on storage that outlives the process (a mounted volume in Kubernetes).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        capacity: int = 10_000,
+        batch_size: int = 500,
+        interval: float = 0.2,
+        retries: int = 3,
+        spill_path: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retries = retries
+        self.spill_path = spill_path
+        self._buffer = RingBuffer(capacity)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._partitions: Set[date] = set()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Serializes writers within the process (the flusher, shutdown and
+        # synchronous flushes); the advisory lock does so across processes.
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, session_factory: Callable[[], Session]) -> "AuditTrail":
+        return cls(
+            session_factory,
+            capacity=int(os.getenv("AUDIT_BUFFER_SIZE", "10000")),
+            batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+            interval=float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200")) / 1000,
+            spill_path=os.getenv("AUDIT_SPILL_FILE") or None,
+        )
+
+    def record(
+        self,
+        realm: str,
+        action: AuditAction,
+        before: Optional[Dict[str, Any]] = None,
+        after: Optional[Dict[str, Any]] = None,
+        actor: Optional[str] = None,
+    ) -> None:
+        """Queue one mutation of ``realm``; call it once the change is committed."""
+        entry = AuditEntry(
+            datetime.now(timezone.utc), realm, action, actor, request_id_var.get(),
+            _jsonable(before), _jsonable(after),
+        )
+        with self._cond:
+            while not self._buffer.put(entry):
+                AUDIT_BUFFER_FULL.inc()
+                if self._thread is None:
+                    break
+                self._cond.notify_all()
+                self._cond.wait(self.interval)
+            else:
+                if len(self._buffer) >= self.batch_size:
+                    self._cond.notify_all()
+                return
+        # Full and nobody is draining it: make room synchronously.
+        self.flush()
+        self.record(realm, action, before, after, actor)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._buffer) + self._in_flight
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._replay_spill()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-trail", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Write everything buffered; what cannot be written is spilled to disk."""
+        if self._thread is not None:
+            self._stopping.set()
+            with self._cond:
+                self._cond.notify_all()
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            leftover = self._buffer.take(len(self._buffer))
+        if leftover:
+            self._spill(leftover)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every recorded entry was written (or write them now if not started)."""
+        if self._thread is None:
+            while self._take_and_write():
+                pass
+            return True
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not len(self._buffer) and not self._in_flight, timeout)
+
+    # Internals ----------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if len(self._buffer) < self.batch_size and not self._stopping.is_set():
+                    self._cond.wait(self.interval)
+                if not len(self._buffer) and self._stopping.is_set():
+                    return
+            # The thread must outlive any failure: record() waits on it once
+            # the buffer is full.
+            try:
+                self._take_and_write()
+            except Exception:
+                logger.exception("Audit flush failed")
+                self._stopping.wait(self.interval)
+
+    def _take_and_write(self) -> bool:
+        with self._cond:
+            batch = self._buffer.take(self.batch_size)
+            self._in_flight += len(batch)
+            self._cond.notify_all()  # room for waiting writers
+        if not batch:
+            return False
+        try:
+            self._write_with_retries(batch)
+        finally:
+            with self._cond:
+                self._in_flight -= len(batch)
+                self._cond.notify_all()
+        return True
+
+    def _write_with_retries(self, batch: List[AuditEntry]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                self._write(batch)
+            except Exception:
+                if attempt == self.retries:
+                    logger.exception("Writing %d audit records failed after %d attempts", len(batch), attempt + 1)
+                    self._spill(batch)
+                    return
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+            else:
+                return
+
+    def _write(self, batch: List[AuditEntry]) -> None:
+        AUDIT_BATCH_SIZE.observe(len(batch))
+        with self._write_lock, self.session_factory() as db:
+            if db.get_bind().dialect.name == "postgresql":
+                db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+                for day in {entry.occurred_at.date() for entry in batch} - self._partitions:
+                    ensure_partition(db, day)
+            last = db.execute(
+                select(AuditRecord.seq, AuditRecord.hash).order_by(AuditRecord.seq.desc()).limit(1)
+            ).first()
+            seq, prev_hash = (last.seq, last.hash) if last else (0, GENESIS_HASH)
+            rows = []
+            for entry in batch:
+                seq += 1
+                digest = record_hash(prev_hash, seq, entry)
+                rows.append({**entry._asdict(), "seq": seq, "prev_hash": prev_hash, "hash": digest})
+                prev_hash = digest
+            # executemany: SQLAlchemy sends these as multi-row INSERT ... VALUES.
+            db.execute(insert(AuditRecord), rows)
+            db.commit()
+        AUDIT_RECORDS.labels("written").inc(len(batch))
+        self._partitions.update(entry.occurred_at.date() for entry in batch)
+
+    # Spill file -------------------------------------------------------
+
+    def _spill(self, batch: List[AuditEntry]) -> None:
+        if not self.spill_path:
+            AUDIT_RECORDS.labels("failed").inc(len(batch))
+            logger.error("Lost %d audit records: no AUDIT_SPILL_FILE configured", len(batch))
+            return
+        try:
+            _write_lines(self.spill_path, batch, "a")
+        except OSError:
+            AUDIT_RECORDS.labels("failed").inc(len(batch))
+            logger.exception("Lost %d audit records: cannot append to %s", len(batch), self.spill_path)
+            return
+        AUDIT_RECORDS.labels("spilled").inc(len(batch))
+        logger.warning("Spilled %d audit records to %s", len(batch), self.spill_path)
+
+    def _replay_spill(self) -> None:
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        entries, corrupt = _read_lines(self.spill_path)
+        if corrupt:
+            # e.g. the last line of an append cut short by a crash.
+            AUDIT_RECORDS.labels("failed").inc(corrupt)
+            logger.error("Skipped %d undecodable lines in %s", corrupt, self.spill_path)
+        for start in range(0, len(entries), self.batch_size):
+            try:
+                self._write(entries[start:start + self.batch_size])
+            except Exception:
+                logger.exception("Replaying %s failed; the rest is kept for the next start", self.spill_path)
+                self._keep_unwritten(entries[start:])
+                return
+        os.remove(self.spill_path)
+        logger.info("Replayed %d spilled audit records", len(entries))
+
+    def _keep_unwritten(self, entries: List[AuditEntry]) -> None:
+        # Swapped in atomically: if this fails the old file stays, and the
+        # records already written are replayed again rather than any lost.
+        tmp = f"{self.spill_path}.tmp"
+        try:
+            _write_lines(tmp, entries, "w")
+            os.replace(tmp, self.spill_path)
+        except OSError:
+            logger.exception("Could not rewrite %s; it is replayed in full on the next start", self.spill_path)
+
+
+def _write_lines(path: str, entries: List[AuditEntry], mode: str) -> None:
+    lines = "".join(
+        json.dumps({**entry._asdict(), "occurred_at": entry.occurred_at.isoformat()}) + "\n"
+        for entry in entries
+    )
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_lines(path: str) -> Tuple[List[AuditEntry], int]:
+    entries, corrupt = [], 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                raw = json.loads(line)
+                entries.append(AuditEntry(**{**raw, "occurred_at": datetime.fromisoformat(raw["occurred_at"])}))
+            except (ValueError, TypeError, KeyError):
+                corrupt += 1
+    return entries, corrupt
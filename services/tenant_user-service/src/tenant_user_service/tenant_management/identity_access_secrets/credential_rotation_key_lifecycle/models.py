@@ -0,0 +1,32 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+
+# Rotation state shares the service's metadata so create_all and Alembic see
+# one schema.
+from ...tenant_lifecycle.realm_management.models import Base, _utcnow
+
+
+class RealmRotationState(Base):
+    """Credential rotation schedule and progress per realm (see :mod:`.scheduler`).
+
+    A rotation adds new signing keys and client secrets but keeps the ones
+    they replace, listed in ``retiring``, until ``retire_at``: tokens issued
+    before the rotation keep verifying through the grace period. The next
+    rotation is only due once they are removed.
+    """
+
+    __tablename__ = "realm_rotation_state"
+    __table_args__ = (
+        Index("ix_realm_rotation_state_next_rotation_at", "next_rotation_at"),
+        Index("ix_realm_rotation_state_retire_at", "retire_at"),
+    )
+
+    realm: str = Column(String, primary_key=True)
+    generation: int = Column(Integer, nullable=False, default=0)  # completed rotations
+    next_rotation_at = Column(DateTime(timezone=True), nullable=False)
+    retire_at = Column(DateTime(timezone=True))
+    # Superseded credentials: {"keys": [component ids], "clients": [client ids]}.
+    retiring = Column(JSON)
+    last_rotated_at = Column(DateTime(timezone=True))
+    attempts: int = Column(Integer, nullable=False, default=0)  # consecutive failures
+    last_error: str | None = Column(String)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
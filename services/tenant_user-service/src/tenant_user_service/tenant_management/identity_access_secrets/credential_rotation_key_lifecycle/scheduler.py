@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, delete, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from ....metrics import CREDENTIAL_ROTATION_BUDGET_WAIT, CREDENTIAL_ROTATIONS
+from ...tenant_lifecycle.realm_management.models import Realm
+from ..audit_compliance_trails.models import AuditAction
+from ..audit_compliance_trails.trail import AuditTrail
+from .models import RealmRotationState
+
+logger = logging.getLogger(__name__)
+
+KEY_PROVIDER_TYPE = "org.keycloak.keys.KeyProvider"
+# Settings carried over from the key provider being replaced; the generated
+# key material itself (masked by Keycloak anyway) never is.
+_INHERITED_KEY_CONFIG = ("algorithm", "keySize", "secretSize", "keyUse")
+
+# Arbitrary constants identifying the rotation scheduler's Postgres advisory
+# locks: one for the scheduling pass, and a namespace for per-realm locks.
+_LEADER_LOCK_KEY = 0x6B6579726F74
+_REALM_LOCK_NAMESPACE = 0x6B657973
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class RateBudget:
+    """Token bucket: ``rate`` acquisitions per second, in bursts of up to ``burst``.
+
+    A ``rate`` of 0 disables the budget.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Take a token and return 0, or return how long until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def take(self, stopped: threading.Event) -> bool:
+        """Wait for a token; False if ``stopped`` was set first."""
+        while True:
+            delay = self.delay()
+            if delay <= 0:
+                return True
+            if stopped.wait(delay):
+                return False
+
+
+class RotationReport:
+    """What one scheduling pass did."""
+
+    def __init__(self, scheduled: int = 0):
+        self.scheduled = scheduled  # realms seen for the first time
+        self.outcomes: Dict[str, int] = {"rotated": 0, "retired": 0, "failed": 0, "skipped": 0}
+
+    def __repr__(self) -> str:
+        return f"RotationReport(scheduled={self.scheduled}, {self.outcomes})"
+
+
+class RotationScheduler:
+    """Rotates the signing keys and client secrets of every realm in ``tenant.realms``.
+
+    Each realm is rotated every ``period`` seconds (give or take ``jitter``
+    of it). A realm seen for the first time is scheduled at a random point
+    within the first period, so a fleet of realms is spread evenly over the
+    period instead of coming due together; the jitter keeps it spread.
+
+    A rotation adds a new key provider per type in ``providers`` with a
+    higher priority (Keycloak signs with it from then on) and regenerates
+    the secrets of the confidential ``clients``. The providers it replaces
+    stay active, so tokens they signed still verify, until the grace period
+    ends; then they are deleted, along with the clients' rotated secrets
+    (which Keycloak only keeps when the realm's client policies include
+    secret rotation).
+
+    Passes run on one replica at a time (an advisory lock elects the
+    leader), take at most ``rate`` realms per second from the due list and
+    run up to ``max_parallel`` of them at once. Each realm is also locked
+    while it is changed and re-checked under the lock, so a rotation never
+    runs twice, even when passes of two replicas overlap.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        kc_admin_factory: Callable[[], Any],
+        period: float = 0.0,
+        grace: float = 86400.0,
+        jitter: float = 0.1,
+        rate: float = 1.0,
+        burst: float = 5.0,
+        max_parallel: int = 4,
+        batch_size: int = 500,
+        poll_interval: float = 60.0,
+        providers: Iterable[str] = ("rsa-generated",),
+        clients: Iterable[str] = (),
+        backoff_base: float = 60.0,
+        backoff_max: float = 3600.0,
+        audit: Optional[AuditTrail] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        if period > 0 and grace >= period:
+            raise ValueError("The grace period must be shorter than the rotation period")
+        self.session_factory = session_factory
+        self.kc_admin_factory = kc_admin_factory
+        self.period = period
+        self.grace = grace
+        self.jitter = jitter
+        self.budget = RateBudget(rate, burst)
+        self.max_parallel = max_parallel
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.providers = list(providers)
+        self.clients = list(clients)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.audit = audit
+        self.rng = rng or random.Random()
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        session_factory: Callable[[], Session],
+        kc_admin_factory: Callable[[], Any],
+        audit: Optional[AuditTrail] = None,
+    ) -> "RotationScheduler":
+        return cls(
+            session_factory,
+            kc_admin_factory,
+            period=float(os.getenv("KEY_ROTATION_PERIOD_DAYS", "0")) * 86400,
+            grace=float(os.getenv("KEY_ROTATION_GRACE_HOURS", "24")) * 3600,
+            jitter=float(os.getenv("KEY_ROTATION_JITTER", "0.1")),
+            rate=float(os.getenv("KEY_ROTATION_RATE", "1")),
+            burst=float(os.getenv("KEY_ROTATION_BURST", "5")),
+            max_parallel=int(os.getenv("KEY_ROTATION_MAX_PARALLEL", "4")),
+            poll_interval=float(os.getenv("KEY_ROTATION_POLL_INTERVAL", "60")),
+            providers=_split(os.getenv("KEY_ROTATION_PROVIDERS", "rsa-generated")),
+            clients=_split(os.getenv("KEY_ROTATION_CLIENTS", "")),
+            audit=audit,
+        )
+
+    # Scheduling --------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.period <= 0 or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="key-rotation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop after the rotations in progress; due ones wait for the next start."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                report = self.run_once()
+            except Exception:  # try again next interval
+                logger.exception("Credential rotation pass failed")
+                continue
+            if report is not None and (report.outcomes["rotated"] or report.outcomes["retired"]
+                                       or report.outcomes["failed"]):
+                logger.info(
+                    "Credential rotation pass finished",
+                    extra={"scheduled": report.scheduled, **report.outcomes},
+                )
+
+    def schedule_new_realms(self, db: Session, now: datetime) -> int:
+        """Add state rows for realms without one; drop those of deleted realms."""
+        new = db.scalars(
+            select(Realm.realm)
+            .outerjoin(RealmRotationState, RealmRotationState.realm == Realm.realm)
+            .where(RealmRotationState.realm.is_(None))
+        ).all()
+        for name in new:
+            offset = self.rng.uniform(0, self.period)
+            db.add(RealmRotationState(realm=name, next_rotation_at=now + timedelta(seconds=offset), updated_at=now))
+        db.execute(
+            delete(RealmRotationState).where(RealmRotationState.realm.not_in(select(Realm.realm))),
+            execution_options={"synchronize_session": False},
+        )
+        return len(new)
+
+    def due(self, db: Session, now: datetime) -> List[str]:
+        """Realms whose rotation or retirement is due, the most overdue first."""
+        return list(db.scalars(
+            select(RealmRotationState.realm)
+            .where(or_(
+                RealmRotationState.retire_at <= now,
+                and_(RealmRotationState.retire_at.is_(None), RealmRotationState.next_rotation_at <= now),
+            ))
+            .order_by(func.coalesce(RealmRotationState.retire_at, RealmRotationState.next_rotation_at))
+            .limit(self.batch_size)
+        ))
+
+    def run_once(self) -> Optional[RotationReport]:
+        """One pass over the due realms; None when another replica holds the pass lock."""
+        # The leader's transaction stays open (holding the lock) for the
+        # whole pass; the work itself uses separate sessions.
+        with self.session_factory() as leader:
+            if not _try_lock(leader, "SELECT pg_try_advisory_xact_lock(:key)", key=_LEADER_LOCK_KEY):
+                return None
+            now = _utcnow()
+            with self.session_factory() as db:
+                report = RotationReport(self.schedule_new_realms(db, now))
+                db.commit()
+                due = self.due(db, now)
+            self._process_all(due, report)
+            return report
+
+    def _process_all(self, realms: List[str], report: RotationReport) -> None:
+        in_flight: Set[Future] = set()
+
+        def collect(done: Iterable[Future]) -> None:
+            for future in done:
+                report.outcomes[future.result()] += 1
+
+        with ThreadPoolExecutor(self.max_parallel, thread_name_prefix="key-rotation") as pool:
+            for realm in realms:
+                if len(in_flight) >= self.max_parallel:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                waiting_since = time.perf_counter()
+                if not self.budget.take(self._stopped):
+                    break
+                CREDENTIAL_ROTATION_BUDGET_WAIT.observe(time.perf_counter() - waiting_since)
+                in_flight.add(pool.submit(self.process, realm))
+            collect(wait(in_flight).done)
+
+    # Rotation ------------------------------------------------------------------
+
+    def process(self, realm: str) -> str:
+        """Rotate or retire ``realm``'s credentials if still due; returns the outcome."""
+        with self.session_factory() as db:
+            if not _try_lock(
+                db, "SELECT pg_try_advisory_xact_lock(:namespace, hashtext(:realm))",
+                namespace=_REALM_LOCK_NAMESPACE, realm=realm,
+            ):
+                return "skipped"  # another replica is on it
+            state = db.get(RealmRotationState, realm)
+            now = _utcnow()
+            if state is None:
+                return "skipped"
+            audited: AuditAction
+            if state.retire_at is not None:
+                if _aware(state.retire_at) > now:
+                    return "skipped"
+                action, outcome, audited = "retire", "retired", "credentials_retired"
+            elif _aware(state.next_rotation_at) <= now:
+                action, outcome, audited = "rotate", "rotated", "credentials_rotated"
+            else:
+                return "skipped"  # done since the due list was read
+
+            before = state.retiring
+            try:
+                if action == "rotate":
+                    self._rotate(self.kc_admin_factory(), state, now)
+                else:
+                    self._retire(self.kc_admin_factory(), state)
+            except Exception as exc:
+                self._failed(state, action, exc, now)
+                outcome = "failed"
+            else:
+                state.attempts = 0
+                state.last_error = None
+            state.updated_at = now
+            after = state.retiring
+            db.commit()
+
+        CREDENTIAL_ROTATIONS.labels(action, "failed" if outcome == "failed" else "done").inc()
+        if self.audit is not None and outcome != "failed":
+            self.audit.record(realm, audited, before, after, actor="key-rotation")
+        return outcome
+
+    def _rotate(self, kc_admin: Any, state: RealmRotationState, now: datetime) -> None:
+        realm = state.realm
+        components = kc_admin.realm_call("get_key_providers", "GET", realm, "components", type=KEY_PROVIDER_TYPE)
+        keys = [c for c in components if c.get("providerType", KEY_PROVIDER_TYPE) == KEY_PROVIDER_TYPE]
+        replaced: List[str] = []
+        for provider in self.providers:
+            current = [c for c in keys if c.get("providerId") == provider]
+            newest = _config(max(current, key=_priority)) if current else {}
+            config = {key: value for key, value in newest.items() if key in _INHERITED_KEY_CONFIG}
+            priority = max((_priority(c) for c in current), default=100) + 1
+            parent = current[0].get("parentId") if current else kc_admin.get_realm(realm).get("id", realm)
+            kc_admin.realm_call("create_key_provider", "POST", realm, "components", {
+                "name": f"{provider}-{state.generation + 1}",
+                "providerId": provider,
+                "providerType": KEY_PROVIDER_TYPE,
+                "parentId": parent,
+                "config": {**config, "priority": [str(priority)], "enabled": ["true"], "active": ["true"]},
+            })
+            replaced.extend(c["id"] for c in current)
+
+        rotated_clients: List[str] = []
+        for client_id in self.clients:
+            for client in kc_admin.realm_call("get_clients", "GET", realm, "clients", clientId=client_id):
+                if client.get("clientId") != client_id or client.get("publicClient"):
+                    continue
+                kc_admin.realm_call("regenerate_client_secret", "POST", realm, f"clients/{client['id']}/client-secret")
+                rotated_clients.append(client["id"])
+
+        state.generation += 1
+        state.last_rotated_at = now
+        state.next_rotation_at = now + timedelta(seconds=self.period * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+        if replaced or rotated_clients:
+            state.retiring = {"keys": replaced, "clients": rotated_clients}
+            state.retire_at = now + timedelta(seconds=self.grace)
+
+    def _retire(self, kc_admin: Any, state: RealmRotationState) -> None:
+        from keycloak.exceptions import KeycloakError
+
+        retiring = state.retiring or {}
+        paths = [f"components/{key_id}" for key_id in retiring.get("keys", [])]
+        paths += [f"clients/{client_id}/client-secret/rotated" for client_id in retiring.get("clients", [])]
+        for path in paths:
+            try:
+                kc_admin.realm_call("retire_credential", "DELETE", state.realm, path)
+            except KeycloakError as exc:
+                # Already gone (e.g. deleted by hand, or a retried retirement).
+                if exc.response_code != 404:
+                    raise
+        state.retiring = None
+        state.retire_at = None
+
+    def _failed(self, state: RealmRotationState, action: str, exc: Exception, now: datetime) -> None:
+        state.attempts += 1
+        state.last_error = (str(exc) or exc.__class__.__name__)[:1000]
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (state.attempts - 1))
+        retry_at = now + timedelta(seconds=delay * self.rng.uniform(0.5, 1.0))
+        if action == "rotate":
+            state.next_rotation_at = retry_at
+        else:
+            state.retire_at = retry_at
+        logger.warning(
+            "Credential %s failed, will retry", action,
+            extra={"realm": state.realm, "attempts": state.attempts, "error": state.last_error},
+        )
+
+
+def _try_lock(db: Session, statement: str, **params: Any) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(db.execute(text(statement), params).scalar())
+
+
+def _config(component: Dict[str, Any]) -> Dict[str, Any]:
+    return component.get("config") or {}
+
+
+def _priority(component: Dict[str, Any]) -> int:
+    # Component config values are lists of strings.
+    try:
+        return int((_config(component).get("priority") or ["0"])[0])
+    except ValueError:
+        return 0
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import List, Optional
+
+from ....cache import CacheStats, TTLCache
+from .policies import DEFAULT_POLICY, CompiledPolicy, Decision
+from .tokens import JWKSCache, Principal, TokenVerifier, jwks_url
+
+logger = logging.getLogger(__name__)
+
+
+class AuthorizationEngine:
+    """Local authorization: token verification plus memoized policy decisions.
+
+    Decisions are cached per (principal, action, realm) for ``ttl`` seconds.
+    ``reload`` swaps the policy and drops every cached decision; ``revoke``
+    makes a user's current tokens unusable, e.g. after a role change that
+    should not wait for their tokens to expire.
+    """
+
+    def __init__(self, verifier: TokenVerifier, policy: CompiledPolicy, ttl: float = 30.0, maxsize: int = 100_000):
+        self.verifier = verifier
+        self.policy = policy
+        self.stats = CacheStats()
+        self.decisions = TTLCache(maxsize=maxsize, ttl=ttl, stats=self.stats)
+        # Part of every cache key: a decision computed while the policy was
+        # being swapped can never be served afterwards.
+        self._generation = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["AuthorizationEngine"]:
+        """The configured engine, or ``None`` when AUTHZ_ENABLED is set to ``false``."""
+        if os.getenv("AUTHZ_ENABLED", "true").lower() == "false":
+            logger.warning(
+                "AUTHZ_ENABLED=false: the realm, template and user import APIs accept unauthenticated requests"
+            )
+            return None
+        keycloak_url = os.getenv("KEYCLOAK_URL", "http://keycloak-tenant:8080/").rstrip("/")
+        issuers = os.getenv("AUTHZ_ISSUERS", f"{keycloak_url}/realms/master")
+        jwks_ttl = float(os.getenv("AUTHZ_JWKS_TTL", "300"))
+        verifier = TokenVerifier(
+            {issuer: JWKSCache(jwks_url(issuer), ttl=jwks_ttl) for issuer in _split(issuers)},
+            audience=os.getenv("AUTHZ_AUDIENCE") or None,
+            tenant_claim=os.getenv("AUTHZ_TENANT_CLAIM", "tenant"),
+            attribute_claims=_split(os.getenv("AUTHZ_ATTRIBUTE_CLAIMS", "")),
+        )
+        path = os.getenv("AUTHZ_POLICY_FILE")
+        policy = CompiledPolicy.from_file(path) if path else CompiledPolicy.from_document(DEFAULT_POLICY)
+        return cls(verifier, policy, ttl=float(os.getenv("AUTHZ_DECISION_CACHE_TTL", "30")))
+
+    def authenticate(self, token: str) -> Principal:
+        return self.verifier.verify(token)
+
+    def decide(self, principal: Principal, action: str, realm: Optional[str] = None) -> Decision:
+        key = (self._generation, principal, action, realm)
+        decision = self.decisions.get(key)
+        if decision is None:
+            self.stats.misses += 1
+            decision = self.policy.evaluate(principal, action, realm)
+            self.decisions.set(key, decision)
+        else:
+            self.stats.hits += 1
+        return decision
+
+    def reload(self, policy: CompiledPolicy) -> None:
+        self.policy = policy
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop every cached decision."""
+        self.stats.invalidations += 1
+        self._generation += 1
+        self.decisions.clear()
+
+    def revoke(self, subject: str) -> None:
+        self.verifier.revoke(subject)
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
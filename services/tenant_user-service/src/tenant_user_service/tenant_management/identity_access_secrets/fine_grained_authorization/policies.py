@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from .tokens import Principal
+
+# Every action the service checks. A rule's ``"*"`` expands to all of them.
+ACTIONS = (
+    "realm:create",
+    "realm:list",
+    "realm:read",
+    "realm:update",
+    "realm:delete",
+    "realm:reconcile",
+    "realm:audit",
+    "template:read",
+    "template:write",
+    "user:import",
+)
+
+ANY = "*"
+# Resource pattern for the realm named by the principal's tenant claim.
+OWN = "own"
+
+# Used when AUTHZ_POLICY_FILE is not set. Platform admins are the master
+# realm's admins (its "admin" realm role) and, for tokens of other issuers,
+# holders of the realm-admin client role of Keycloak's realm-management.
+DEFAULT_POLICY: Dict[str, Any] = {
+    "rules": [
+        {
+            "id": "platform-admin",
+            "roles": ["admin", "realm-management:realm-admin"],
+            "actions": [ANY],
+            "realms": [ANY],
+        },
+        {
+            "id": "tenant-admin",
+            "roles": ["tenant-admin"],
+            "actions": ["realm:read", "realm:update", "realm:audit", "user:import"],
+            "realms": [OWN],
+        },
+        {"id": "tenant-viewer", "roles": ["tenant-viewer"], "actions": ["realm:read"], "realms": [OWN]},
+    ]
+}
+
+
+class PolicyError(ValueError):
+    """A policy document is malformed."""
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    rule: Optional[str]  # id of the deciding rule, None when nothing matched
+
+    @property
+    def reason(self) -> str:
+        if self.rule is None:
+            return "no matching rule"
+        return f"{'allowed' if self.allowed else 'denied'} by rule {self.rule!r}"
+
+
+NO_MATCH = Decision(False, None)
+
+
+class Rule(NamedTuple):
+    """One compiled rule; only its resource and attribute checks run per decision."""
+
+    id: str
+    allow: bool
+    any_realm: bool
+    own_realm: bool
+    realms: FrozenSet[str]
+    prefixes: Tuple[str, ...]
+    conditions: Tuple[Tuple[str, FrozenSet[str]], ...]
+
+    def matches(self, principal: Principal, realm: Optional[str]) -> bool:
+        if not self.any_realm:
+            # Collection actions (realm is None) need a rule covering every realm.
+            if realm is None:
+                return False
+            if not (
+                (self.own_realm and realm == principal.tenant)
+                or realm in self.realms
+                or realm.startswith(self.prefixes)
+            ):
+                return False
+        for claim, values in self.conditions:
+            if principal.attribute(claim) not in values:
+                return False
+        return True
+
+
+def _strings(raw: Dict[str, Any], field: str, rule_id: str, default: Optional[List[str]] = None) -> List[str]:
+    values = raw.get(field, default)
+    if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+        raise PolicyError(f"Rule {rule_id!r}: {field!r} must be a non-empty list of strings")
+    return values
+
+
+def _compile_rule(raw: Dict[str, Any], position: int) -> Tuple[List[str], List[str], Rule]:
+    rule_id = str(raw.get("id", position))
+    effect = raw.get("effect", "allow")
+    if effect not in ("allow", "deny"):
+        raise PolicyError(f"Rule {rule_id!r}: effect must be 'allow' or 'deny'")
+    roles = _strings(raw, "roles", rule_id)
+    actions = _strings(raw, "actions", rule_id)
+    if ANY in actions:
+        actions = list(ACTIONS)
+    unknown = sorted(set(actions) - set(ACTIONS))
+    if unknown:
+        raise PolicyError(f"Rule {rule_id!r}: unknown actions {', '.join(unknown)}")
+    realms = _strings(raw, "realms", rule_id, default=[ANY])
+    conditions = raw.get("when", {})
+    if not isinstance(conditions, dict):
+        raise PolicyError(f"Rule {rule_id!r}: 'when' must map claims to allowed values")
+    rule = Rule(
+        id=rule_id,
+        allow=effect == "allow",
+        any_realm=ANY in realms,
+        own_realm=OWN in realms,
+        realms=frozenset(r for r in realms if r not in (ANY, OWN) and not r.endswith("*")),
+        prefixes=tuple(r[:-1] for r in realms if r != ANY and r.endswith("*")),
+        conditions=tuple(
+            (claim, frozenset(str(v) for v in (values if isinstance(values, list) else [values])))
+            for claim, values in sorted(conditions.items())
+        ),
+    )
+    return roles, actions, rule
+
+
+class CompiledPolicy:
+    """Rules indexed by action, then role, so a decision only looks at rules that can apply.
+
+    Roles may be ``"*"`` to match any authenticated caller. A matching deny
+    rule always wins; without a matching allow rule the answer is deny.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]]):
+        index: Dict[str, Dict[str, List[Rule]]] = {action: {} for action in ACTIONS}
+        for position, raw in enumerate(rules):
+            roles, actions, rule = _compile_rule(raw, position)
+            for action in actions:
+                for role in roles:
+                    index[action].setdefault(role, []).append(rule)
+        # Deny rules first, so evaluation can stop at the first match of each role.
+        self._index = {
+            action: {role: tuple(sorted(rules, key=lambda r: r.allow)) for role, rules in by_role.items()}
+            for action, by_role in index.items()
+        }
+        self._roles = {action: frozenset(by_role) - {ANY} for action, by_role in self._index.items()}
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "CompiledPolicy":
+        rules = document.get("rules")
+        if not isinstance(rules, list):
+            raise PolicyError("Policy document needs a 'rules' list")
+        return cls(rules)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CompiledPolicy":
+        with open(path, encoding="utf-8") as handle:
+            return cls.from_document(json.load(handle))
+
+    def evaluate(self, principal: Principal, action: str, realm: Optional[str]) -> Decision:
+        by_role = self._index.get(action)
+        if by_role is None:
+            return NO_MATCH
+        allowed = NO_MATCH
+        candidates = self._roles[action] & principal.roles
+        for role in (*candidates, ANY):
+            for rule in by_role.get(role, ()):
+                if rule.matches(principal, realm):
+                    if not rule.allow:
+                        return Decision(False, rule.id)
+                    if not allowed.allowed:
+                        allowed = Decision(True, rule.id)
+                    break
+        return allowed
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+from ....cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenError(Exception):
+    """The bearer token is missing, malformed, expired, revoked or not signed by a trusted issuer."""
+
+
+class Principal(NamedTuple):
+    """The caller, as far as authorization is concerned.
+
+    Hashable, so it can be part of a decision cache key; two tokens for the
+    same user with the same roles map to equal principals.
+    """
+
+    subject: str
+    tenant: Optional[str]
+    roles: FrozenSet[str]
+    attributes: Tuple[Tuple[str, str], ...] = ()
+
+    def attribute(self, name: str) -> Optional[str]:
+        for key, value in self.attributes:
+            if key == name:
+                return value
+        return None
+
+
+# JWKS -----------------------------------------------------------------
+
+def _fetch_json(url: str, timeout: float) -> Dict[str, Any]:
+    import httpx  # only needed once keys are actually fetched
+
+    response = httpx.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+class JWKSCache:
+    """Signing keys of one issuer, parsed once and refreshed every ``ttl`` seconds.
+
+    A token signed with an unknown ``kid`` triggers an early refresh (key
+    rotation), at most once per ``min_refresh_interval``. If a refresh fails
+    the previous keys stay in use.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = 300.0,
+        min_refresh_interval: float = 10.0,
+        timeout: float = 5.0,
+        fetch: Callable[[str, float], Dict[str, Any]] = _fetch_json,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._fetch = fetch
+        self._keys: Dict[Optional[str], Any] = {}
+        self._fetched_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def key(self, kid: Optional[str]) -> Any:
+        now = time.monotonic()
+        if now - self._fetched_at >= self.ttl or (
+            kid not in self._keys and now - self._fetched_at >= self.min_refresh_interval
+        ):
+            self._refresh()
+        try:
+            return self._keys[kid]
+        except KeyError:
+            raise TokenError(f"Unknown signing key {kid!r}") from None
+
+    def _refresh(self) -> None:
+        from jose import jwk
+
+        with self._lock:
+            try:
+                document = self._fetch(self.url, self.timeout)
+            except Exception:
+                logger.warning("Fetching JWKS from %s failed", self.url, exc_info=True)
+                # Keep the old keys, but do not retry on every request.
+                self._fetched_at = time.monotonic() - self.ttl + self.min_refresh_interval
+                return
+            keys: Dict[Optional[str], Any] = {}
+            for entry in document.get("keys", ()):
+                if entry.get("use", "sig") != "sig":
+                    continue
+                try:
+                    keys[entry.get("kid")] = jwk.construct(entry, entry.get("alg", "RS256"))
+                except Exception:
+                    logger.warning("Skipping unusable JWK %s", entry.get("kid"), exc_info=True)
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+
+def jwks_url(issuer: str) -> str:
+    """Keycloak's certificate endpoint for a realm issuer URL."""
+    return issuer.rstrip("/") + "/protocol/openid-connect/certs"
+
+
+# Verification ---------------------------------------------------------
+
+class TokenVerifier:
+    """Verifies bearer tokens and turns their claims into a ``Principal``.
+
+    Verified tokens are cached until they expire, so the signature check
+    runs once per token rather than once per request. Roles are Keycloak's
+    realm roles (``realm_access.roles``) plus its client roles
+    (``resource_access``) as ``<clientId>:<role>``, e.g.
+    ``realm-management:realm-admin``; ``attribute_claims`` are copied onto
+    the principal for attribute-based rules.
+    """
+
+    def __init__(
+        self,
+        issuers: Dict[str, JWKSCache],
+        audience: Optional[str] = None,
+        algorithms: Sequence[str] = ("RS256",),
+        tenant_claim: str = "tenant",
+        attribute_claims: Iterable[str] = (),
+        leeway: int = 30,
+        cache_size: int = 10_000,
+    ):
+        self.issuers = issuers
+        self.audience = audience
+        self.algorithms = list(algorithms)
+        self.tenant_claim = tenant_claim
+        self.attribute_claims = tuple(attribute_claims)
+        self.leeway = leeway
+        # Expiry is checked per entry; the TTL only bounds how long a token
+        # stays cached.
+        self._tokens = TTLCache(maxsize=cache_size, ttl=300.0)
+        self._not_before: Dict[str, float] = {}
+
+    def verify(self, token: str) -> Principal:
+        entry = self._tokens.get(token)
+        if entry is None or entry[0] + self.leeway <= time.time():
+            entry = self._decode(token)
+            self._tokens.set(token, entry)
+        _, issued_at, principal = entry
+        if issued_at < self._not_before.get(principal.subject, 0):
+            raise TokenError("Token revoked")
+        return principal
+
+    def cached(self, token: str) -> Optional[Principal]:
+        """``token``'s principal if it was verified before and is still valid, else ``None``.
+
+        Never decodes or fetches keys, so it is safe to call on the event loop.
+        """
+        entry = self._tokens.get(token)
+        if entry is None or entry[0] + self.leeway <= time.time():
+            return None
+        _, issued_at, principal = entry
+        if issued_at < self._not_before.get(principal.subject, 0):
+            return None
+        return principal
+
+    def revoke(self, subject: str) -> None:
+        """Reject ``subject``'s tokens issued before now (``iat`` has whole-second precision)."""
+        self._not_before[subject] = int(time.time())
+
+    def _decode(self, token: str) -> Tuple[float, float, Principal]:
+        from jose import JWTError, jwt
+
+        try:
+            issuer = jwt.get_unverified_claims(token).get("iss")
+            keys = self.issuers.get(issuer)
+            if keys is None:
+                raise TokenError(f"Untrusted issuer {issuer!r}")
+            key = keys.key(jwt.get_unverified_header(token).get("kid"))
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=issuer,
+                options={"verify_aud": self.audience is not None, "require_exp": True, "leeway": self.leeway},
+            )
+        except JWTError as exc:
+            raise TokenError(str(exc)) from exc
+        return float(claims["exp"]), float(claims.get("iat", 0)), self._principal(claims)
+
+    def _principal(self, claims: Dict[str, Any]) -> Principal:
+        if not claims.get("sub"):
+            raise TokenError("Token has no subject")
+        roles = set((claims.get("realm_access") or {}).get("roles") or ())
+        for client, access in (claims.get("resource_access") or {}).items():
+            roles.update(f"{client}:{role}" for role in (access or {}).get("roles") or ())
+        attributes = tuple(
+            (name, str(claims[name])) for name in self.attribute_claims if claims.get(name) is not None
+        )
+        tenant = claims.get(self.tenant_claim)
+        return Principal(
+            claims["sub"], str(tenant) if tenant is not None else None, frozenset(roles), attributes
+        )
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .client import VaultSecrets
+
+
+class PasswordHolder(Protocol):
+    def rotate_password(self, password: str) -> None: ...
+
+
+def use_database_credentials(engine: Engine, secrets: VaultSecrets, path: str, close_idle: bool = True) -> None:
+    """Connect ``engine`` as the ``username``/``password`` stored at ``path``.
+
+    Every new connection takes the current credential from the cache, so
+    the URL only needs host and database. On rotation the pool is replaced:
+    idle connections are closed (unless ``close_idle`` is false, e.g. for
+    async engines whose connections belong to an event loop) and checked-out
+    ones are discarded when returned.
+    """
+
+    @event.listens_for(engine, "do_connect")
+    def _credentials(dialect: Any, record: Any, cargs: Any, cparams: Dict[str, Any]) -> None:
+        # Served from memory; Vault is only read here if a lease lapsed
+        # without being renewed.
+        credentials = secrets.get(path)
+        cparams["user"] = credentials["username"]
+        cparams["password"] = credentials["password"]
+
+    secrets.subscribe(path, lambda data: engine.dispose(close=close_idle))
+
+
+def use_keycloak_password(client: PasswordHolder, secrets: VaultSecrets, path: str, field: str = "password") -> None:
+    """Log ``client`` in with the password at ``path``, and again whenever it rotates."""
+    client.rotate_password(secrets.get(path)[field])
+    secrets.subscribe(path, lambda data: client.rotate_password(data[field]))
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional
+
+from ....cache import CacheStats
+from ....in_flight import InFlight
+from ....metrics import VAULT_SECRET_REFRESHES
+
+if TYPE_CHECKING:
+    import hvac
+
+logger = logging.getLogger(__name__)
+
+# hvac (and requests under it) is imported on the first Vault call.
+
+Listener = Callable[[Dict[str, Any]], None]
+
+
+class SecretError(RuntimeError):
+    """A secret could not be read from Vault."""
+
+
+class Secret(NamedTuple):
+    data: Dict[str, Any]
+    lease_id: Optional[str]
+    lease_duration: float  # seconds granted by the read, 0 for unleased (KV) secrets
+    renewable: bool
+    refresh_at: float  # monotonic time of the next renewal or re-read
+    expires_at: Optional[float]  # monotonic; None when there is no lease
+
+
+class VaultSecrets:
+    """In-memory cache of Vault secrets that keeps their leases alive.
+
+    ``get`` serves secrets from memory; the first read of a path goes to
+    Vault, and concurrent first reads share one request. A background
+    thread renews each lease once ``renew_fraction`` of it has passed. When
+    Vault stops extending a lease (its max TTL is near) or the lease cannot
+    be renewed, the secret is read again before the old one expires;
+    unleased KV secrets are re-read every ``refresh_interval`` seconds.
+    Listeners registered with ``subscribe`` are called whenever a re-read
+    returns different data, so holders of the credential can switch over.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], hvac.Client],
+        renew_fraction: float = 2 / 3,
+        refresh_interval: float = 300.0,
+        retry_interval: float = 5.0,
+    ):
+        self._client_factory = client_factory
+        self._client: Optional[hvac.Client] = None
+        self.renew_fraction = renew_fraction
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.stats = CacheStats()
+        self._secrets: Dict[str, Secret] = {}
+        self._listeners: Dict[str, List[Listener]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._fetches = InFlight()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def connect(cls, url: str, token: Optional[str], namespace: Optional[str] = None, **kwargs: Any) -> "VaultSecrets":
+        def client() -> hvac.Client:
+            import hvac
+
+            return hvac.Client(url=url, token=token, namespace=namespace)
+
+        return cls(client, **kwargs)
+
+    @classmethod
+    def from_env(cls) -> Optional["VaultSecrets"]:
+        """The configured cache, or ``None`` when VAULT_ADDR is not set."""
+        url = os.getenv("VAULT_ADDR")
+        if not url:
+            return None
+        return cls.connect(
+            url,
+            os.getenv("VAULT_TOKEN"),
+            namespace=os.getenv("VAULT_NAMESPACE") or None,
+            renew_fraction=float(os.getenv("VAULT_RENEW_FRACTION", "0.67")),
+            refresh_interval=float(os.getenv("VAULT_REFRESH_INTERVAL", "300")),
+        )
+
+    @property
+    def client(self) -> hvac.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    # Reads ---------------------------------------------------------------
+
+    def get(self, path: str) -> Dict[str, Any]:
+        """The secret's data (for KV v2 paths, the stored key/value pairs)."""
+        secret = self._secrets.get(path)
+        if secret is not None and (secret.expires_at is None or secret.expires_at > time.monotonic()):
+            self.stats.hits += 1
+            return secret.data
+        self.stats.misses += 1
+        return self._load(path).data
+
+    def subscribe(self, path: str, listener: Listener) -> None:
+        """Call ``listener(data)`` each time the secret at ``path`` changes."""
+        with self._lock:
+            self._listeners.setdefault(path, []).append(listener)
+
+    def _load(self, path: str) -> Secret:
+        secret, _ = self._fetches.run((path,), lambda: (self._fetch(path), False))
+        return secret
+
+    def _fetch(self, path: str) -> Secret:
+        secret = self._read(path)
+        with self._wakeup:
+            previous = self._secrets.get(path)
+            self._secrets[path] = secret
+            self._wakeup.notify_all()
+        if previous is not None and previous.data != secret.data:
+            self._notify(path, secret.data)
+        return secret
+
+    def _read(self, path: str) -> Secret:
+        try:
+            response = self.client.read(path)
+        except Exception as exc:
+            raise SecretError(f"Reading {path!r} from Vault failed: {exc}") from exc
+        if response is None:
+            raise SecretError(f"No secret at {path!r}")
+        data = response.get("data") or {}
+        if isinstance(data.get("data"), dict) and "metadata" in data:  # KV v2 envelope
+            data = data["data"]
+        lease_id = response.get("lease_id") or None
+        duration = float(response.get("lease_duration") or 0)
+        now = time.monotonic()
+        if lease_id is None or not duration:
+            return Secret(data, None, 0.0, False, now + self.refresh_interval, None)
+        renewable = bool(response.get("renewable"))
+        return Secret(data, lease_id, duration, renewable, now + duration * self.renew_fraction, now + duration)
+
+    def _notify(self, path: str, data: Dict[str, Any]) -> None:
+        self.stats.invalidations += 1
+        with self._lock:
+            listeners = list(self._listeners.get(path, ()))
+        for listener in listeners:
+            try:
+                listener(data)
+            except Exception:
+                logger.exception("Secret rotation listener for %s failed", path)
+
+    # Background renewal ----------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="vault-secrets", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            with self._wakeup:
+                now = time.monotonic()
+                due = [path for path, secret in self._secrets.items() if secret.refresh_at <= now]
+                if not due:
+                    next_at = min((s.refresh_at for s in self._secrets.values()), default=now + self.refresh_interval)
+                    self._wakeup.wait(next_at - now)
+                    continue
+            for path in due:
+                if self._stopping.is_set():
+                    return
+                self._refresh(path)
+
+    def _refresh(self, path: str) -> None:
+        secret = self._secrets[path]
+        if secret.renewable and self._renew(path, secret):
+            return
+        try:
+            fresh = self._load(path)
+        except SecretError:
+            VAULT_SECRET_REFRESHES.labels("failed").inc()
+            logger.warning("Refreshing %s failed; retrying in %ss", path, self.retry_interval, exc_info=True)
+            # Keep serving what we have (get() reads again once a lease lapses).
+            self._reschedule(path, secret, time.monotonic() + self.retry_interval)
+            return
+        VAULT_SECRET_REFRESHES.labels("unchanged" if fresh.data == secret.data else "rotated").inc()
+
+    def _renew(self, path: str, secret: Secret) -> bool:
+        try:
+            response = self.client.sys.renew_lease(secret.lease_id, increment=int(secret.lease_duration))
+        except Exception:
+            logger.warning("Renewing the lease on %s failed; reading it again", path, exc_info=True)
+            return False
+        now = time.monotonic()
+        granted = float(response.get("lease_duration") or 0)
+        VAULT_SECRET_REFRESHES.labels("renewed").inc()
+        # Less than asked for means the lease reached its max TTL and cannot be
+        # extended again: keep using it for now, and rotate to a new
+        # credential before it ends.
+        capped = granted < secret.lease_duration
+        self._reschedule(
+            path, secret._replace(renewable=not capped, expires_at=now + granted), now + granted * self.renew_fraction
+        )
+        return True
+
+    def _reschedule(self, path: str, secret: Secret, refresh_at: float) -> None:
+        with self._lock:
+            # A concurrent get() may have stored a newer read meanwhile.
+            if self._secrets.get(path) is not None and self._secrets[path].lease_id == secret.lease_id:
+                self._secrets[path] = secret._replace(refresh_at=refresh_at)
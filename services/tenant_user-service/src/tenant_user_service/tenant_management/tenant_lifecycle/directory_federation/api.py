@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import uuid
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ....dependencies import get_db, get_user_importer
+from ...identity_access_secrets.fine_grained_authorization.tokens import Principal
+from ..realm_management.api import _actor, authorize
+from ..realm_management.repository import RealmRepository
+from .importer import UserImporter
+from .models import UserImportJob
+from .schemas import UserImportJobRead
+
+router = APIRouter(prefix="/realms", tags=["user imports"], dependencies=[Depends(authorize)])
+
+
+def _job_location(job: UserImportJob) -> str:
+    return f"{router.prefix}/{job.realm}/users/:import/{job.id}"
+
+
+def _spool(path: str, chunk: bytes) -> None:
+    with open(path, "ab") as handle:
+        handle.write(chunk)
+
+
+@router.post("/{realm_name}/users/:import", response_model=UserImportJobRead, status_code=status.HTTP_202_ACCEPTED)
+async def import_users(
+    realm_name: str,
+    request: Request,
+    response: Response,
+    format: Literal["csv", "ndjson", "ldif"] = "ndjson",
+    db: Session = Depends(get_db),
+    importer: UserImporter = Depends(get_user_importer),
+    principal: Optional[Principal] = Depends(authorize),
+):
+    """Import the users in the request body (a CSV, NDJSON or LDIF file) into the realm.
+
+    The body is streamed to disk and imported in the background; poll the
+    job at ``Location`` for progress. Users that already exist are skipped.
+    """
+    if await run_in_threadpool(RealmRepository(db).get, realm_name) is None:
+        raise HTTPException(status_code=404, detail="Realm not found")
+    job_id = uuid.uuid4().hex
+    path = importer.spool_path(job_id)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(_spool, path, chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    if not os.path.exists(path):
+        raise HTTPException(status_code=400, detail="Empty import file")
+    job = await run_in_threadpool(importer.create, db, job_id, realm_name, format, _actor(principal))
+    response.headers["Location"] = _job_location(job)
+    return job
+
+
+def _get_job(db: Session, realm_name: str, job_id: str) -> UserImportJob:
+    job = db.get(UserImportJob, job_id)
+    if job is None or job.realm != realm_name:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/{realm_name}/users/:import/{job_id}", response_model=UserImportJobRead)
+def get_user_import(realm_name: str, job_id: str, db: Session = Depends(get_db)):
+    return _get_job(db, realm_name, job_id)
+
+
+@router.post(
+    "/{realm_name}/users/:import/{job_id}/:resume",
+    response_model=UserImportJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def resume_user_import(
+    realm_name: str,
+    job_id: str,
+    db: Session = Depends(get_db),
+    importer: UserImporter = Depends(get_user_importer),
+):
+    """Continue an interrupted or failed import after its last checkpoint."""
+    job = _get_job(db, realm_name, job_id)
+    if not os.path.exists(job.source_path):
+        raise HTTPException(status_code=409, detail="The import file is gone; start a new import")
+    if not importer.resume(db, job_id):
+        raise HTTPException(status_code=409, detail=f"Import job is {job.status}")
+    db.refresh(job)
+    return job
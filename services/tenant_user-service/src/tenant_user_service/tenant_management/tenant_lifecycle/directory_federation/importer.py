@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from ....metrics import USER_IMPORT_BATCH_DURATION, USER_IMPORT_RECORDS
+from ....user_management.users import UserValidationError, to_representation
+from .models import UserImportJob
+from .sources import READERS, SourceRecord
+
+logger = logging.getLogger(__name__)
+
+# Problems kept on a job for display; the counters cover every record.
+MAX_ERRORS = 100
+OUTCOMES = ("imported", "skipped", "duplicates", "invalid", "failed")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Reading ----------------------------------------------------------------
+
+class Deduper:
+    """Remembers the usernames and emails of accepted users; the first occurrence wins."""
+
+    def __init__(self) -> None:
+        self._usernames: Set[str] = set()
+        self._emails: Set[str] = set()
+
+    def duplicate_of(self, user: Dict[str, Any]) -> Optional[str]:
+        """Why ``user`` repeats an earlier one, or ``None`` (and remember it)."""
+        email = user.get("email")
+        if user["username"] in self._usernames:
+            return f"duplicate username {user['username']!r}"
+        if email and email in self._emails:
+            return f"duplicate email {email!r}"
+        self._usernames.add(user["username"])
+        if email:
+            self._emails.add(email)
+        return None
+
+
+class ImportBatch:
+    """Outcome of source records ``[start, end)``: the users to write and what was rejected."""
+
+    def __init__(self, start: int):
+        self.start = start
+        self.end = start
+        self.users: List[Dict[str, Any]] = []
+        self.positions: List[int] = []  # source position of each user, for error reports
+        self.counts = dict.fromkeys(OUTCOMES, 0)
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, outcome: str, position: int, error: str) -> None:
+        self.counts[outcome] += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"record": position + 1, "error": error})
+
+
+def batches(records: Iterable[SourceRecord], checkpoint: int, batch_size: int) -> Iterator[ImportBatch]:
+    """Validate and dedupe ``records``, grouping the users to write ``batch_size`` at a time.
+
+    Records before ``checkpoint`` were handled by an earlier run: they are
+    only read again so that later duplicates of them are still recognised.
+    """
+    seen = Deduper()
+    batch = ImportBatch(checkpoint)
+    for position, record in enumerate(records):
+        user = None
+        error = record.error
+        if error is None:
+            try:
+                user = to_representation(record.fields)
+            except UserValidationError as exc:
+                error = str(exc)
+        if position < checkpoint:
+            if user is not None:
+                seen.duplicate_of(user)
+            continue
+        batch.end = position + 1
+        if user is None:
+            batch.reject("invalid", position, error)
+            continue
+        duplicate = seen.duplicate_of(user)
+        if duplicate:
+            batch.reject("duplicates", position, duplicate)
+            continue
+        batch.users.append(user)
+        batch.positions.append(position)
+        if len(batch.users) >= batch_size:
+            yield batch
+            batch = ImportBatch(batch.end)
+    if batch.end > batch.start:
+        yield batch
+
+
+# Jobs -------------------------------------------------------------------
+
+class _ClaimedJob(NamedTuple):
+    id: str
+    realm: str
+    format: str
+    source_path: str
+    checkpoint: int
+
+
+class UserImporter:
+    """Runs user import jobs: streams the spooled file, writes users to Keycloak in batches.
+
+    Users are written with Keycloak's partial import (existing users are
+    skipped), up to ``max_parallel`` batches at a time per job, so at most
+    that many batches are held in memory. After each batch, in file order,
+    the job's checkpoint and counters are committed; an interrupted or
+    failed job resumes after its checkpoint. A batch Keycloak rejects as a
+    whole (e.g. one user's email is taken) is split until the offending
+    users are isolated and counted as failed.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        kc_admin_factory: Callable[[], Any],
+        batch_size: int = 500,
+        max_parallel: int = 4,
+        max_jobs: int = 1,
+        retries: int = 3,
+        spool_dir: Optional[str] = None,
+        stale_after: float = 120.0,
+    ):
+        self.session_factory = session_factory
+        self.kc_admin_factory = kc_admin_factory
+        self.batch_size = batch_size
+        self.max_parallel = max_parallel
+        self.max_jobs = max_jobs
+        self.retries = retries
+        self.spool_dir = spool_dir or os.path.join(tempfile.gettempdir(), "user-imports")
+        self.stale_after = stale_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    @classmethod
+    def from_env(cls, session_factory: Callable[[], Session], kc_admin_factory: Callable[[], Any]) -> "UserImporter":
+        return cls(
+            session_factory,
+            kc_admin_factory,
+            batch_size=int(os.getenv("USER_IMPORT_BATCH_SIZE", "500")),
+            max_parallel=int(os.getenv("USER_IMPORT_MAX_PARALLEL", "4")),
+            max_jobs=int(os.getenv("USER_IMPORT_MAX_JOBS", "1")),
+            spool_dir=os.getenv("USER_IMPORT_SPOOL_DIR") or None,
+            stale_after=float(os.getenv("USER_IMPORT_STALE_AFTER", "120")),
+        )
+
+    def spool_path(self, job_id: str) -> str:
+        """Where the uploaded file of ``job_id`` is kept until the job completes."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        return os.path.join(self.spool_dir, f"{job_id}.import")
+
+    def create(self, db: Session, job_id: str, realm: str, format: str, actor: Optional[str] = None) -> UserImportJob:
+        """Record a job for the file at ``spool_path(job_id)`` and queue it."""
+        job = UserImportJob(
+            id=job_id, realm=realm, format=format, source_path=self.spool_path(job_id), actor=actor, errors=[]
+        )
+        db.add(job)
+        db.commit()
+        self.submit(job_id)
+        return job
+
+    def resume(self, db: Session, job_id: str) -> bool:
+        """Queue a job that stopped before finishing; False if it is not resumable.
+
+        A job still marked running is only taken over once its checkpoint
+        has not moved for ``stale_after`` seconds (its process died).
+        """
+        stale = _utcnow() - timedelta(seconds=self.stale_after)
+        resumed = db.execute(
+            update(UserImportJob)
+            .where(UserImportJob.id == job_id)
+            .where(or_(
+                UserImportJob.status.in_(("interrupted", "failed")),
+                and_(UserImportJob.status.in_(("queued", "running")), UserImportJob.updated_at < stale),
+            ))
+            .values(status="queued", updated_at=_utcnow())
+        ).rowcount
+        db.commit()
+        if resumed:
+            self.submit(job_id)
+        return bool(resumed)
+
+    def submit(self, job_id: str) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._stopping.clear()
+                self._executor = ThreadPoolExecutor(self.max_jobs, thread_name_prefix="user-import")
+            self._executor.submit(self.run, job_id)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Interrupt running jobs at their next batch; queued ones stay queued."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        self._stopping.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # Running ----------------------------------------------------------------
+
+    def run(self, job_id: str) -> None:
+        job = self._claim(job_id)
+        if job is None:
+            return  # already running elsewhere, or no longer queued
+        logger.info("User import started", extra={"job": job.id, "realm": job.realm, "checkpoint": job.checkpoint})
+        try:
+            status = self._import(job)
+        except Exception as exc:
+            logger.exception("User import failed", extra={"job": job.id, "realm": job.realm})
+            self._finish(job, "failed", str(exc) or exc.__class__.__name__)
+        else:
+            self._finish(job, status)
+
+    def _claim(self, job_id: str) -> Optional[_ClaimedJob]:
+        now = _utcnow()
+        with self.session_factory() as db:
+            claimed = db.execute(
+                update(UserImportJob)
+                .where(UserImportJob.id == job_id, UserImportJob.status == "queued")
+                .values(
+                    status="running", started_at=now, updated_at=now, finished_at=None, last_error=None,
+                    started_from=UserImportJob.checkpoint,
+                )
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(UserImportJob, job_id)
+            return _ClaimedJob(job.id, job.realm, job.format, job.source_path, job.checkpoint)
+
+    def _import(self, job: _ClaimedJob) -> str:
+        kc_admin = self.kc_admin_factory()
+        in_flight: Deque[Tuple[ImportBatch, Future]] = deque()
+        interrupted = False
+        with open(job.source_path, encoding="utf-8-sig", newline="") as source, \
+                ThreadPoolExecutor(self.max_parallel, thread_name_prefix=f"user-import-{job.id[:8]}") as pool:
+            for batch in batches(READERS[job.format](source), job.checkpoint, self.batch_size):
+                if self._stopping.is_set():
+                    interrupted = True
+                    break
+                in_flight.append((batch, pool.submit(self._write, kc_admin, job.realm, batch)))
+                if len(in_flight) >= self.max_parallel:
+                    self._checkpoint(job, *in_flight.popleft())
+            while in_flight:
+                self._checkpoint(job, *in_flight.popleft())
+        return "interrupted" if interrupted else "completed"
+
+    def _checkpoint(self, job: _ClaimedJob, batch: ImportBatch, written: Future) -> None:
+        written.result()  # a batch that could not be written fails the job here
+        with self.session_factory() as db:
+            row = db.get(UserImportJob, job.id)
+            row.checkpoint = batch.end
+            for outcome, count in batch.counts.items():
+                setattr(row, outcome, getattr(row, outcome) + count)
+                if count:
+                    USER_IMPORT_RECORDS.labels(outcome).inc(count)
+            if batch.errors and len(row.errors or []) < MAX_ERRORS:
+                row.errors = (row.errors or []) + batch.errors[:MAX_ERRORS - len(row.errors or [])]
+            row.updated_at = _utcnow()
+            db.commit()
+
+    def _finish(self, job: _ClaimedJob, status: str, error: Optional[str] = None) -> None:
+        with self.session_factory() as db:
+            row = db.get(UserImportJob, job.id)
+            row.status = status
+            row.last_error = error[:1000] if error else None
+            row.updated_at = row.finished_at = _utcnow()
+            db.commit()
+            logger.info(
+                "User import %s", status,
+                extra={"job": job.id, "realm": job.realm, "checkpoint": row.checkpoint, "imported": row.imported},
+            )
+        if status == "completed":
+            try:
+                os.remove(job.source_path)
+            except FileNotFoundError:
+                pass
+
+    # Keycloak writes --------------------------------------------------------
+
+    def _write(self, kc_admin: Any, realm: str, batch: ImportBatch) -> None:
+        started = time.perf_counter()
+        try:
+            self._write_users(kc_admin, realm, batch, batch.users, batch.positions)
+        finally:
+            USER_IMPORT_BATCH_DURATION.observe(time.perf_counter() - started)
+
+    def _write_users(
+        self, kc_admin: Any, realm: str, batch: ImportBatch, users: List[Dict[str, Any]], positions: List[int]
+    ) -> None:
+        from keycloak.exceptions import KeycloakPostError
+
+        if not users:
+            return
+        payload = {"ifResourceExists": "SKIP", "users": users}
+        try:
+            result = self._with_retries(lambda: kc_admin.partial_import(realm, payload))
+        except KeycloakPostError as exc:
+            if exc.response_code not in (400, 409):
+                raise
+            if len(users) == 1:
+                batch.reject("failed", positions[0], _reason(exc))
+                return
+            # The import is one transaction, so one bad user rejects all of
+            # them: halve the batch until the bad ones are on their own.
+            middle = len(users) // 2
+            self._write_users(kc_admin, realm, batch, users[:middle], positions[:middle])
+            self._write_users(kc_admin, realm, batch, users[middle:], positions[middle:])
+            return
+        batch.counts["imported"] += result.get("added", 0)
+        batch.counts["skipped"] += result.get("skipped", 0) + result.get("overwritten", 0)
+
+    def _with_retries(self, call: Callable[[], Any]) -> Any:
+        from keycloak.exceptions import KeycloakError
+
+        for attempt in range(self.retries + 1):
+            try:
+                return call()
+            except KeycloakError as exc:
+                # Client errors are about the payload; only retry the rest
+                # (connection failures, 5xx).
+                if attempt == self.retries or (exc.response_code is not None and exc.response_code < 500):
+                    raise
+            time.sleep(min(0.5 * 2 ** attempt, 10.0))
+
+
+def _reason(exc: Any) -> str:
+    message = exc.error_message
+    if isinstance(message, bytes):
+        message = message.decode("utf-8", "replace")
+    try:
+        return str(json.loads(message).get("errorMessage") or message)
+    except (ValueError, AttributeError):
+        return str(message)
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+
+# Import jobs share the service's metadata so create_all and Alembic see one
+# schema.
+from ..realm_management.models import Base, _utcnow
+
+
+class UserImportJob(Base):
+    """A bulk import of directory users into one realm (see :mod:`.importer`).
+
+    ``checkpoint`` counts the source records handled so far, in file order;
+    a resumed job re-reads the spooled file from ``source_path`` and skips
+    them. The counters only cover records up to the checkpoint.
+    """
+
+    __tablename__ = "user_import_jobs"
+    __table_args__ = (Index("ix_user_import_jobs_realm_created_at", "realm", "created_at"),)
+
+    id: str = Column(String(32), primary_key=True)
+    realm: str = Column(String, nullable=False)
+    format: str = Column(String, nullable=False)  # csv | ndjson | ldif
+    source_path: str = Column(String, nullable=False)
+    # queued | running | completed | failed | interrupted
+    status: str = Column(String, nullable=False, default="queued")
+    actor: str | None = Column(String)
+
+    checkpoint: int = Column(Integer, nullable=False, default=0)
+    imported: int = Column(Integer, nullable=False, default=0)
+    skipped: int = Column(Integer, nullable=False, default=0)  # already in the realm
+    duplicates: int = Column(Integer, nullable=False, default=0)  # repeated within the file
+    invalid: int = Column(Integer, nullable=False, default=0)
+    failed: int = Column(Integer, nullable=False, default=0)  # rejected by Keycloak
+    # The first few problems: [{"record": <1-based position>, "error": "..."}].
+    errors = Column(JSON)
+    last_error: str | None = Column(String)
+
+    # Checkpoint at the latest (re)start, for the throughput of this run.
+    started_from: int = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    started_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    finished_at = Column(DateTime(timezone=True))
+
+    @property
+    def records_per_second(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or datetime.now(timezone.utc)
+        elapsed = (_aware(end) - _aware(self.started_at)).total_seconds()
+        return (self.checkpoint - self.started_from) / elapsed if elapsed > 0 else 0.0
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class UserImportJobRead(BaseModel):
+    id: str
+    realm: str
+    format: str
+    status: str
+    actor: Optional[str]
+    # Source records handled so far; the sum of the counters below.
+    checkpoint: int
+    imported: int
+    skipped: int
+    duplicates: int
+    invalid: int
+    failed: int
+    errors: Optional[List[Dict[str, Any]]]
+    last_error: Optional[str]
+    records_per_second: float
+    created_at: datetime
+    started_at: Optional[datetime]
+    updated_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import csv
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class SourceRecord(NamedTuple):
+    """One record of an import file: its fields, or why they could not be read."""
+
+    fields: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+# Each reader consumes an iterable of text lines (an open file works) and
+# yields one SourceRecord per user, holding at most one record in memory.
+Reader = Callable[[Iterable[str]], Iterator[SourceRecord]]
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[SourceRecord]:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as exc:
+            yield SourceRecord(None, f"invalid JSON: {exc}")
+            continue
+        if not isinstance(fields, dict):
+            yield SourceRecord(None, "expected a JSON object")
+            continue
+        yield SourceRecord(fields)
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[SourceRecord]:
+    """Rows of a CSV file with a header; empty cells are left out."""
+    for row in csv.DictReader(lines):
+        if None in row:
+            yield SourceRecord(None, "more cells than header columns")
+            continue
+        yield SourceRecord({column: value for column, value in row.items() if column and value})
+
+
+# LDAP attributes mapped onto Keycloak user fields (the same defaults as
+# Keycloak's own LDAP federation); unmapped attributes are not imported.
+LDAP_ATTRIBUTES = {
+    "uid": "username",
+    "mail": "email",
+    "givenname": "firstName",
+    "sn": "lastName",
+}
+# Keycloak's attribute for the entry a federated user came from.
+LDAP_DN_ATTRIBUTE = "LDAP_ENTRY_DN"
+
+
+def _ldif_entry(entry: List[str]) -> SourceRecord:
+    attributes: Dict[str, List[str]] = {}
+    for line in entry:
+        name, sep, value = line.partition(":")
+        if not sep:
+            return SourceRecord(None, f"malformed line {line[:80]!r}")
+        if value.startswith(":"):
+            try:
+                value = base64.b64decode(value[1:].strip(), validate=True).decode("utf-8")
+            except (binascii.Error, UnicodeDecodeError):
+                return SourceRecord(None, f"{name}: invalid base64 value")
+        elif value.startswith("<"):
+            return SourceRecord(None, f"{name}: URL values are not supported")
+        else:
+            value = value.strip()
+        attributes.setdefault(name.strip().lower(), []).append(value)
+    if "changetype" in attributes:
+        return SourceRecord(None, "change records are not supported, only entries")
+    dn = attributes.get("dn")
+    if not dn:
+        return SourceRecord(None, "entry without dn")
+    fields: Dict[str, Any] = {LDAP_DN_ATTRIBUTE: dn[0]}
+    for ldap_name, field in LDAP_ATTRIBUTES.items():
+        if ldap_name in attributes:
+            fields[field] = attributes[ldap_name][0]
+    return SourceRecord(fields)
+
+
+def read_ldif(lines: Iterable[str]) -> Iterator[SourceRecord]:
+    """Entries of an LDIF content file (RFC 2849), one user per entry."""
+    entry: List[str] = []
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line.startswith(" ") and entry:
+            entry[-1] += line[1:]  # folded continuation of the previous line
+            continue
+        if not line:
+            if entry:
+                yield _ldif_entry(entry)
+                entry = []
+            continue
+        if line.startswith("#") or (not entry and line.lower().startswith("version:")):
+            continue
+        entry.append(line)
+    if entry:
+        yield _ldif_entry(entry)
+
+
+READERS: Dict[str, Reader] = {"csv": read_csv, "ndjson": read_ndjson, "ldif": read_ldif}
@@ -1,90 +1,378 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import logging
+import json
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from keycloak import KeycloakAdmin
+from sqlalchemy.orm.exc import StaleDataError
 
-from . import service, schemas
-from ....dependencies import get_db, get_keycloak_admin  # to be implemented at higher level
+from . import conditional, export, idempotency, pagination, service, schemas
+from .reconciliation import Reconciler
+from .cache import RealmCache
+from .templates import TemplateCache, TemplateRollout, render
+from ....dependencies import (  # to be implemented at higher level
+    get_db, get_event_publisher, get_keycloak_admin, get_realm_cache, get_reconciler,
+    get_audit_trail, get_template_cache, get_template_rollout, notify_outbox,
+)
+from ....events import EventPublisher
+from ....keycloak_admin import PooledKeycloakAdmin
+from ...identity_access_secrets.audit_compliance_trails import queries as audit_queries
+from ...identity_access_secrets.audit_compliance_trails.models import AuditAction
+from ...identity_access_secrets.audit_compliance_trails.schemas import AuditRecordRead, AuditVerifyReport
+from ...identity_access_secrets.audit_compliance_trails.trail import AuditTrail
+from ...identity_access_secrets.fine_grained_authorization.guard import Authorize
+from ...identity_access_secrets.fine_grained_authorization.tokens import Principal
 
-router = APIRouter(prefix="/realms", tags=["realms"])
+# Authorization ----------------------------------------------------------
+
+_ROUTE_ACTIONS = {
+    ("POST", "/realms/"): "realm:create",
+    ("POST", "/realms/:bulk"): "realm:create",
+    ("POST", "/realms/:reconcile"): "realm:reconcile",
+    ("GET", "/realms/"): "realm:list",
+    ("GET", "/realms/:export"): "realm:list",
+    ("GET", "/realms/:operations/{operation_id}"): "realm:list",
+    ("GET", "/realms/:audit"): "realm:audit",
+    ("GET", "/realms/:audit/verify"): "realm:audit",
+    ("GET", "/realms/{realm_name}/audit"): "realm:audit",
+    ("GET", "/realms/{realm_name}"): "realm:read",
+    ("PUT", "/realms/{realm_name}"): "realm:update",
+    ("PATCH", "/realms/{realm_name}"): "realm:update",
+    ("DELETE", "/realms/{realm_name}"): "realm:delete",
+    ("POST", "/realms/{realm_name}/users/:import"): "user:import",
+    ("GET", "/realms/{realm_name}/users/:import/{job_id}"): "user:import",
+    ("POST", "/realms/{realm_name}/users/:import/{job_id}/:resume"): "user:import",
+    ("GET", "/realm-templates/"): "template:read",
+    ("GET", "/realm-templates/{customer_type}"): "template:read",
+    ("PUT", "/realm-templates/{customer_type}"): "template:write",
+}
+
+
+def realm_action(request: Request) -> Tuple[str, Optional[str]]:
+    # Unlisted routes are operator tooling and need the reconcile permission.
+    route = request.scope.get("route")
+    action = _ROUTE_ACTIONS.get((request.method, getattr(route, "path", None)), "realm:reconcile")
+    return action, request.path_params.get("realm_name")
+
+
+# Shared with ``api_async.router``.
+authorize = Authorize(realm_action)
+
+router = APIRouter(prefix="/realms", tags=["realms"], dependencies=[Depends(authorize)])
+
+logger = logging.getLogger(__name__)
+
+
+def _actor(principal: Optional[Principal]) -> Optional[str]:
+    # None while AUTHZ_ENABLED is off: the caller is unknown.
+    return principal.subject if principal is not None else None
+
+
+def _operation_headers(svc: service.RealmService | service.AsyncRealmService) -> Dict[str, str]:
+    # Keycloak changes are applied asynchronously from the outbox; point the
+    # caller at the status of the queued operation and wake the dispatcher.
+    if not svc.operations:
+        return {}
+    notify_outbox()
+    return {"Operation-Location": f"{router.prefix}/:operations/{svc.operations[-1].id}"}
+
+
+def _track_operations(response: Response, svc: service.RealmService | service.AsyncRealmService) -> None:
+    response.headers.update(_operation_headers(svc))
+
+
+def _created(svc: service.RealmService | service.AsyncRealmService, realm) -> idempotency.StoredResponse:
+    body = json.loads(schemas.RealmRead.from_orm(realm).json())
+    return idempotency.StoredResponse(status.HTTP_201_CREATED, body, _operation_headers(svc))
+
+
+def _create_failed(exc: Exception) -> idempotency.StoredResponse:
+    # A duplicate realm is a definitive outcome worth replaying; anything
+    # else is raised so the Idempotency-Key is released for a retry.
+    if isinstance(exc, IntegrityError):
+        return idempotency.StoredResponse(status.HTTP_400_BAD_REQUEST, {"detail": str(exc)}, {})
+    raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
 @router.post("/", response_model=schemas.RealmRead, status_code=status.HTTP_201_CREATED)
 def create_realm(
     payload: schemas.RealmCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: Session = Depends(get_db),
-    kc_admin: KeycloakAdmin = Depends(get_keycloak_admin),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    templates: TemplateCache = Depends(get_template_cache),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(authorize),
 ):
-    print("Inside /create-realm/ endpoint")
-    print(f"Received payload: {payload}")
-    print(f"kc_admin object: {kc_admin}")
-    try:
-        svc = service.RealmService(db, kc_admin)
-        realm = svc.create(payload)
-        return realm
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    """Create a realm.
+
+    Attributes left out of the request come from the realm template of its
+    ``customer_type``, if there is one. Retries carrying the same ``Idempotency-Key`` replay the stored response
+    instead of creating anything again; concurrent requests with the same key,
+    or without a key for the same realm, share one execution.
+    """
+    logger.debug("Creating realm", extra={"realm": payload.realm})
+
+    def perform() -> idempotency.StoredResponse:
+        svc = service.RealmService(db, cache, events, templates, audit=audit, actor=_actor(principal))
+        try:
+            realm = svc.create(payload)
+        except Exception as exc:
+            db.rollback()
+            return _create_failed(exc)
+        return _created(svc, realm)
+
+    return idempotency.run_once(db, idempotency_key, payload, perform)
+
+
+@router.post("/:bulk", response_model=schemas.RealmBulkResult)
+def bulk_create_realms(
+    payload: schemas.RealmBulkCreate,
+    db: Session = Depends(get_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    templates: TemplateCache = Depends(get_template_cache),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(authorize),
+):
+    svc = service.RealmService(db, cache, events, templates, audit=audit, actor=_actor(principal))
+    result = svc.bulk_create(payload.items)
+    if svc.operations:
+        notify_outbox()
+    return result
+
+
+@router.post("/:reconcile", response_model=schemas.RealmReconcileReport)
+def reconcile_realms(
+    apply: bool = False,
+    reconciler: Reconciler = Depends(get_reconciler),
+):
+    """Diff every realm against Keycloak; with ``apply=true`` queue the repairs."""
+    return reconciler.run(apply=apply)
 
 
 @router.get("/", response_model=List[schemas.RealmRead])
 def list_realms(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    customer_type: Optional[str] = None,
+    enabled: Optional[bool] = None,
+    name_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+):
+    svc = service.RealmService(db, cache=cache)
+    try:
+        realms, next_cursor = svc.list(customer_type, enabled, name_prefix, cursor, limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve)) from ve
+    etag = conditional.page_etag(realms, next_cursor)
+    unchanged = conditional.not_modified(if_none_match, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return realms
+
+
+@router.get("/:operations/{operation_id}", response_model=schemas.RealmOperationRead)
+def get_operation(
+    operation_id: int,
+    db: Session = Depends(get_db),
+):
+    operation = service.RealmService(db).get_operation(operation_id)
+    if not operation:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return operation
+
+
+# Registered before "/{realm_name}" so ":export" is not read as a realm name.
+@router.get("/:export")
+def export_realms(
+    format: Literal["ndjson", "csv"] = "ndjson",
     customer_type: Optional[str] = None,
     enabled: Optional[bool] = None,
     db: Session = Depends(get_db),
-    kc_admin: KeycloakAdmin = Depends(get_keycloak_admin),
 ):
-    svc = service.RealmService(db, kc_admin)
-    return svc.list(customer_type, enabled)
+    rows = service.RealmService(db).stream(customer_type, enabled)
+    return StreamingResponse(
+        export.RENDERERS[format](rows),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="realms.{format}"'},
+    )
+
+
+# Audit trail ------------------------------------------------------------
+# Records are written in batches shortly after each mutation commits (see
+# AUDIT_FLUSH_INTERVAL_MS), so the newest changes may take a moment to show.
+
+@router.get("/:audit", response_model=List[AuditRecordRead])
+def list_audit_records(
+    response: Response,
+    realm: Optional[str] = None,
+    action: Optional[AuditAction] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Audit records of all realms, newest first; follow ``X-Next-Cursor`` for older ones."""
+    try:
+        records, next_cursor = audit_queries.page(db, realm, action, since, until, cursor, limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve)) from ve
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return records
+
+
+@router.get("/:audit/verify", response_model=AuditVerifyReport)
+def verify_audit_trail(
+    after_seq: int = Query(0, ge=0),
+    limit: int = Query(10_000, ge=1, le=100_000),
+    db: Session = Depends(get_db),
+):
+    """Check the hash chain for ``limit`` records after ``after_seq``; resume from ``last_seq``."""
+    return audit_queries.verify(db, after_seq, limit)
+
+
+@router.get("/{realm_name}/audit", response_model=List[AuditRecordRead])
+def list_realm_audit_records(
+    realm_name: str,
+    response: Response,
+    action: Optional[AuditAction] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    return list_audit_records(response, realm_name, action, since, until, cursor, limit, db)
 
 
 @router.get("/{realm_name}", response_model=schemas.RealmRead)
 def get_realm(
     realm_name: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    kc_admin: KeycloakAdmin = Depends(get_keycloak_admin),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
 ):
-    svc = service.RealmService(db, kc_admin)
+    svc = service.RealmService(db, cache=cache)
     realm = svc.get(realm_name)
     if not realm:
         raise HTTPException(status_code=404, detail="Realm not found")
+    # Answer 304 before the body is ever serialized.
+    etag = conditional.realm_etag(realm)
+    unchanged = conditional.not_modified(if_none_match, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
     return realm
 
 
 @router.put("/{realm_name}", response_model=schemas.RealmRead)
+@router.patch("/{realm_name}", response_model=schemas.RealmRead)
 def update_realm(
     realm_name: str,
     payload: schemas.RealmUpdate,
+    response: Response,
     db: Session = Depends(get_db),
-    kc_admin: KeycloakAdmin = Depends(get_keycloak_admin),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(authorize),
 ):
-    svc = service.RealmService(db, kc_admin)
+    svc = service.RealmService(db, cache, events, audit=audit, actor=_actor(principal))
     try:
-        return svc.update(realm_name, payload)
+        realm = svc.update(realm_name, payload)
     except ValueError as ve:
         raise HTTPException(status_code=404, detail=str(ve)) from ve
+    except StaleDataError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    _track_operations(response, svc)
+    return realm
 
 
 @router.delete("/{realm_name}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_realm(
     realm_name: str,
+    response: Response,
     db: Session = Depends(get_db),
-    kc_admin: KeycloakAdmin = Depends(get_keycloak_admin),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(authorize),
 ):
-    svc = service.RealmService(db, kc_admin)
+    svc = service.RealmService(db, cache, events, audit=audit, actor=_actor(principal))
     svc.delete(realm_name)
+    _track_operations(response, svc)
+
+
+# Realm templates --------------------------------------------------------
+
+templates_router = APIRouter(
+    prefix="/realm-templates", tags=["realm templates"], dependencies=[Depends(authorize)]
+)
+
+
+@templates_router.get("/", response_model=List[schemas.RealmTemplateRead])
+def list_realm_templates(db: Session = Depends(get_db)):
+    return service.RealmService(db).repo.list_templates()
+
+
+@templates_router.get("/{customer_type}", response_model=schemas.RealmTemplateRead)
+def get_realm_template(customer_type: str, db: Session = Depends(get_db)):
+    template = service.RealmService(db).repo.get_template(customer_type)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Realm template not found")
+    return template
+
+
+@templates_router.put("/{customer_type}", response_model=schemas.RealmTemplateRead)
+def save_realm_template(
+    customer_type: str,
+    payload: schemas.RealmTemplateWrite,
+    background_tasks: BackgroundTasks,
+    rollout: bool = False,
+    db: Session = Depends(get_db),
+    templates: TemplateCache = Depends(get_template_cache),
+    template_rollout: TemplateRollout = Depends(get_template_rollout),
+):
+    """Create or replace the template for a customer tier.
+
+    New realms of the tier use it right away. With ``rollout=true`` the
+    changed settings are also applied to existing realms of the tier, in
+    batches after the response is sent, except where a realm's value was
+    set per tenant.
+    """
+    try:
+        previous, template = service.RealmService(db).repo.save_template(customer_type, payload.settings)
+    except (IntegrityError, StaleDataError) as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Realm template was modified concurrently") from exc
+    templates.invalidate(customer_type)
+    if rollout:
+        background_tasks.add_task(template_rollout.run, render(template), previous)
+    return template
 
 
 @router.get("/test-kc-dependency/", status_code=status.HTTP_200_OK)
 def test_keycloak_dependency(
-    kc_admin: KeycloakAdmin = Depends(get_keycloak_admin),
+    kc_admin: PooledKeycloakAdmin = Depends(get_keycloak_admin),
 ):
-    print("Inside /test-kc-dependency/ endpoint")
     if kc_admin:
-        print("kc_admin object received in test endpoint")
         return {"message": "KeycloakAdmin dependency resolved successfully", "kc_server_url": kc_admin.server_url}
     else:
-        print("kc_admin object is None in test endpoint")
+        logger.warning("Keycloak admin dependency resolved to None")
         return {"message": "KeycloakAdmin dependency was None (this shouldn't happen if no error)"} 
\ No newline at end of file
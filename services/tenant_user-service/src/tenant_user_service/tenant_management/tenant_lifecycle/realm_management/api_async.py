@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from . import api, conditional, idempotency, pagination, service, schemas
+from .cache import RealmCache
+from .templates import TemplateCache
+from ....dependencies import (
+    get_async_db, get_audit_trail, get_event_publisher, get_realm_cache, get_template_cache,
+)
+from ....events import EventPublisher
+from ...identity_access_secrets.audit_compliance_trails.trail import AuditTrail
+from ...identity_access_secrets.fine_grained_authorization.tokens import Principal
+
+# Same routes as ``api.router``, served on the event loop instead of the
+# threadpool. ``main`` mounts one or the other depending on REALM_API_MODE.
+router = APIRouter(prefix="/realms", tags=["realms"], dependencies=[Depends(api.authorize)])
+
+
+@router.post("/", response_model=schemas.RealmRead, status_code=status.HTTP_201_CREATED)
+async def create_realm(
+    payload: schemas.RealmCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    templates: TemplateCache = Depends(get_template_cache),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(api.authorize),
+):
+    async def perform() -> idempotency.StoredResponse:
+        svc = service.AsyncRealmService(db, cache, events, templates, audit=audit, actor=api._actor(principal))
+        try:
+            realm = await svc.create(payload)
+        except Exception as exc:
+            await db.rollback()
+            return api._create_failed(exc)
+        return api._created(svc, realm)
+
+    return await idempotency.run_once_async(db, idempotency_key, payload, perform)
+
+
+@router.get("/", response_model=List[schemas.RealmRead])
+async def list_realms(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    customer_type: Optional[str] = None,
+    enabled: Optional[bool] = None,
+    name_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+):
+    svc = service.AsyncRealmService(db, cache=cache)
+    try:
+        realms, next_cursor = await svc.list(customer_type, enabled, name_prefix, cursor, limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve)) from ve
+    etag = conditional.page_etag(realms, next_cursor)
+    unchanged = conditional.not_modified(if_none_match, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return realms
+
+
+# The export streams from a psycopg2 server-side cursor in the threadpool in
+# both modes; it is registered here too so it wins over "/{realm_name}".
+router.add_api_route("/:export", api.export_realms, methods=["GET"])
+# Same for the audit trail query.
+router.add_api_route("/:audit", api.list_audit_records, methods=["GET"], response_model=List[api.AuditRecordRead])
+
+
+@router.get("/{realm_name}", response_model=schemas.RealmRead)
+async def get_realm(
+    realm_name: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+):
+    svc = service.AsyncRealmService(db, cache=cache)
+    realm = await svc.get(realm_name)
+    if not realm:
+        raise HTTPException(status_code=404, detail="Realm not found")
+    # Answer 304 before the body is ever serialized.
+    etag = conditional.realm_etag(realm)
+    unchanged = conditional.not_modified(if_none_match, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    return realm
+
+
+@router.put("/{realm_name}", response_model=schemas.RealmRead)
+@router.patch("/{realm_name}", response_model=schemas.RealmRead)
+async def update_realm(
+    realm_name: str,
+    payload: schemas.RealmUpdate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(api.authorize),
+):
+    svc = service.AsyncRealmService(db, cache, events, audit=audit, actor=api._actor(principal))
+    try:
+        realm = await svc.update(realm_name, payload)
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve)) from ve
+    except StaleDataError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    api._track_operations(response, svc)
+    return realm
+
+
+@router.delete("/{realm_name}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_realm(
+    realm_name: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Optional[RealmCache] = Depends(get_realm_cache),
+    events: Optional[EventPublisher] = Depends(get_event_publisher),
+    audit: AuditTrail = Depends(get_audit_trail),
+    principal: Optional[Principal] = Depends(api.authorize),
+):
+    svc = service.AsyncRealmService(db, cache, events, audit=audit, actor=api._actor(principal))
+    await svc.delete(realm_name)
+    api._track_operations(response, svc)
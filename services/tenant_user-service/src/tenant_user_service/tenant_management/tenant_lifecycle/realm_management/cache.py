@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+from . import schemas
+from ....cache import CacheStats, RedisCacheBackend, SharedCacheBackend, TTLCache
+
+Page = Tuple[List[schemas.RealmRead], Optional[str]]
+
+_LIST_GENERATION_KEY = "realms:list-generation"
+
+
+class RealmCache:
+    """Read-through cache for realm lookups and listing pages.
+
+    Entries live in a local LRU+TTL tier and, when configured, in a shared
+    backend so replicas can serve each other's misses. Single realms are
+    invalidated by name; listing pages are keyed by a generation counter
+    that every mutation bumps, so stale pages are simply never read again.
+    Across replicas a local entry can lag an invalidation by at most ``ttl``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: float = 30.0,
+        shared: Optional[SharedCacheBackend] = None,
+    ):
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl, stats=self.stats)
+        self.shared = shared
+        self._generation = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RealmCache"]:
+        """Build the cache from REALM_CACHE_* settings; ``None`` when TTL is 0."""
+        ttl = float(os.getenv("REALM_CACHE_TTL", "30"))
+        if ttl <= 0:
+            return None
+        redis_url = os.getenv("REALM_CACHE_REDIS_URL")
+        return cls(
+            maxsize=int(os.getenv("REALM_CACHE_MAXSIZE", "10000")),
+            ttl=ttl,
+            shared=RedisCacheBackend(redis_url) if redis_url else None,
+        )
+
+    # Single realms -------------------------------------------------------
+
+    def get(self, realm_name: str) -> Optional[schemas.RealmRead]:
+        key = ("realm", realm_name)
+        realm = self.local.get(key)
+        if realm is None and self.shared is not None:
+            raw = self.shared.get(f"realms:realm:{realm_name}")
+            if raw is not None:
+                realm = schemas.RealmRead.parse_raw(raw)
+                self.local.set(key, realm)
+        self._count(realm is not None)
+        return realm
+
+    def set(self, realm: schemas.RealmRead) -> None:
+        self.local.set(("realm", realm.realm), realm)
+        if self.shared is not None:
+            self.shared.set(f"realms:realm:{realm.realm}", realm.json().encode(), self.ttl)
+
+    # Listing pages ---------------------------------------------------------
+
+    def _list_generation(self) -> int:
+        if self.shared is None:
+            return self._generation
+        raw = self.shared.get(_LIST_GENERATION_KEY)
+        return int(raw) if raw is not None else 0
+
+    def _page_key(self, params: tuple) -> str:
+        return "realms:page:" + json.dumps([self._list_generation(), *params])
+
+    def get_page(self, params: tuple) -> Optional[Page]:
+        key = self._page_key(params)
+        page = self.local.get(key)
+        if page is None and self.shared is not None:
+            raw = self.shared.get(key)
+            if raw is not None:
+                data = json.loads(raw)
+                page = ([schemas.RealmRead.parse_obj(r) for r in data["items"]], data["next_cursor"])
+                self.local.set(key, page)
+        self._count(page is not None)
+        return page
+
+    def set_page(self, params: tuple, page: Page) -> None:
+        key = self._page_key(params)
+        self.local.set(key, page)
+        if self.shared is not None:
+            items, next_cursor = page
+            raw = json.dumps({"items": [json.loads(r.json()) for r in items], "next_cursor": next_cursor})
+            self.shared.set(key, raw.encode(), self.ttl)
+
+    # Invalidation ----------------------------------------------------------
+
+    def invalidate(self, realm_name: Optional[str] = None) -> None:
+        """Drop ``realm_name`` (if given) and every cached listing page."""
+        if realm_name is not None:
+            self.local.delete(("realm", realm_name))
+            if self.shared is not None:
+                self.shared.delete(f"realms:realm:{realm_name}")
+        self._generation += 1
+        if self.shared is not None:
+            self.shared.incr(_LIST_GENERATION_KEY)
+        self.stats.invalidations += 1
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Response, status
+
+from . import schemas
+
+
+def realm_etag(realm: schemas.RealmRead) -> str:
+    """Strong ETag for one realm, derived from its id and row version."""
+    return f'"{realm.id}-{realm.version}"'
+
+
+def page_etag(realms: Iterable[schemas.RealmRead], next_cursor: Optional[str]) -> str:
+    """Strong ETag for a listing page: changes whenever any row on it does."""
+    digest = hashlib.sha1()
+    for realm in realms:
+        digest.update(f"{realm.id}-{realm.version};".encode())
+    digest.update((next_cursor or "").encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def not_modified(if_none_match: Optional[str], etag: str) -> Optional[Response]:
+    """Return a bodiless 304 if ``If-None-Match`` matches ``etag``, else None."""
+    if not if_none_match:
+        return None
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Iterable, Iterator, List, Mapping
+
+from . import models
+
+# Export column order: the table columns as declared on ``models.Realm``.
+EXPORT_COLUMNS: List[str] = [c.name for c in models.Realm.__table__.columns]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_ndjson(batches: Iterable[List[Mapping[str, Any]]]) -> Iterator[str]:
+    """Render each batch of rows as one chunk of newline-delimited JSON."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(row), default=_json_default, separators=(",", ":")) + "\n"
+            for row in batch
+        )
+
+
+def to_csv(batches: Iterable[List[Mapping[str, Any]]]) -> Iterator[str]:
+    """Render rows as CSV; dict/list cells are JSON-encoded."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            writer.writerow([
+                json.dumps(row[col]) if isinstance(row[col], (dict, list)) else row[col]
+                for col in EXPORT_COLUMNS
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header-only output for an empty table still needs to be sent.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+RENDERERS = {
+    "ndjson": to_ndjson,
+    "csv": to_csv,
+}
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ....in_flight import AsyncInFlight, InFlight
+from . import models, schemas
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# How long a completed response is replayed, and after how long an
+# in-progress key (whose request crashed) may be taken over by a retry.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+# Expired keys of other requests each claim deletes, so the table stays at
+# about one TTL's worth of keys without a separate sweeper.
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "100"))
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Any
+    headers: Dict[str, str]
+
+    def to_response(self, replayed: bool) -> JSONResponse:
+        headers = {**self.headers, REPLAYED_HEADER: "true"} if replayed else self.headers
+        return JSONResponse(self.body, status_code=self.status_code, headers=headers)
+
+
+def request_hash(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.json(sort_keys=True).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Durable ``Idempotency-Key`` records, shared by every replica."""
+
+    def __init__(
+        self,
+        db: Session,
+        ttl: float = IDEMPOTENCY_TTL,
+        lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT,
+        purge_batch: int = IDEMPOTENCY_PURGE_BATCH,
+    ):
+        self.db = db
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.purge_batch = purge_batch
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Reserve ``key`` for this request, or return the response stored for it.
+
+        Raises 422 if the key was used for a different request and 409 while
+        another request holding the key is still running.
+        """
+        table = models.IdempotencyKey
+        now = datetime.now(timezone.utc)
+        # Expired keys, and keys whose request died mid-flight, are free again.
+        freed = and_(
+            table.key == key,
+            or_(
+                table.expires_at <= now,
+                and_(
+                    table.status == "in_progress",
+                    table.created_at <= now - timedelta(seconds=self.lock_timeout),
+                ),
+            ),
+        )
+        if self.purge_batch > 0:
+            # Rows another claim is already deleting are skipped, not waited on.
+            expired = (
+                select(table.key)
+                .where(table.expires_at <= now)
+                .order_by(table.expires_at)
+                .limit(self.purge_batch)
+                .with_for_update(skip_locked=True)
+            )
+            freed = or_(freed, table.key.in_(expired))
+        self.db.execute(delete(table).where(freed))
+        self.db.add(table(
+            key=key, request_hash=fingerprint, created_at=now, expires_at=now + timedelta(seconds=self.ttl)
+        ))
+        try:
+            self.db.commit()
+            return None
+        except IntegrityError:
+            self.db.rollback()
+
+        record = self.db.get(table, key)
+        if record is not None and record.request_hash != fingerprint:
+            raise HTTPException(422, f"{IDEMPOTENCY_HEADER} was already used for a different request")
+        if record is None or record.status != "completed":
+            raise HTTPException(
+                409, f"A request with this {IDEMPOTENCY_HEADER} is in progress", headers={"Retry-After": "1"}
+            )
+        return StoredResponse(record.response_status, record.response_body, record.response_headers or {})
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        self.db.execute(
+            update(models.IdempotencyKey)
+            .where(models.IdempotencyKey.key == key)
+            .values(
+                status="completed",
+                response_status=response.status_code,
+                response_body=response.body,
+                response_headers=response.headers,
+            )
+        )
+        self.db.commit()
+
+    def release(self, key: str) -> None:
+        """Forget an in-progress key so the request can be retried."""
+        self.db.rollback()
+        self.db.execute(delete(models.IdempotencyKey).where(
+            models.IdempotencyKey.key == key, models.IdempotencyKey.status == "in_progress"
+        ))
+        self.db.commit()
+
+    def run(self, key: str, fingerprint: str, perform: Callable[[], StoredResponse]) -> Tuple[StoredResponse, bool]:
+        """Run ``perform`` at most once per key; returns ``(response, replayed)``.
+
+        Raising from ``perform`` (e.g. ``HTTPException``) releases the key,
+        so only definitive outcomes are stored and replayed.
+        """
+        stored = self.claim(key, fingerprint)
+        if stored is not None:
+            return stored, True
+        try:
+            response = perform()
+        except BaseException:
+            self.release(key)
+            raise
+        self.complete(key, response)
+        return response, False
+
+
+_in_flight = InFlight()
+_async_in_flight = AsyncInFlight()
+
+
+def _coalescing_key(payload: schemas.RealmCreate, key: Optional[str]) -> tuple:
+    # Only callers sharing a key may share its stored response; requests
+    # without one still collapse per realm so Keycloak is asked only once.
+    return ("key", key) if key else ("realm", payload.realm)
+
+
+def run_once(
+    db: Session, key: Optional[str], payload: schemas.RealmCreate, perform: Callable[[], StoredResponse]
+) -> JSONResponse:
+    """Serve a mutating request with idempotency and in-flight coalescing.
+
+    Only requests sent with a key are answered with ``Idempotent-Replayed``.
+    """
+    fingerprint = request_hash(payload)
+
+    def call() -> Tuple[StoredResponse, bool]:
+        if not key:
+            return perform(), False
+        return IdempotencyStore(db).run(key, fingerprint, perform)
+
+    response, replayed = _in_flight.run([_coalescing_key(payload, key)], call)
+    return response.to_response(replayed and bool(key))
+
+
+async def run_once_async(
+    db: AsyncSession,
+    key: Optional[str],
+    payload: schemas.RealmCreate,
+    perform: Callable[[], Awaitable[StoredResponse]],
+) -> JSONResponse:
+    fingerprint = request_hash(payload)
+
+    async def call() -> Tuple[StoredResponse, bool]:
+        if not key:
+            return await perform(), False
+        stored = await db.run_sync(lambda session: IdempotencyStore(session).claim(key, fingerprint))
+        if stored is not None:
+            return stored, True
+        try:
+            response = await perform()
+        except BaseException:
+            await db.run_sync(lambda session: IdempotencyStore(session).release(key))
+            raise
+        await db.run_sync(lambda session: IdempotencyStore(session).complete(key, response))
+        return response, False
+
+    response, replayed = await _async_in_flight.run([_coalescing_key(payload, key)], call)
+    return response.to_response(replayed and bool(key))
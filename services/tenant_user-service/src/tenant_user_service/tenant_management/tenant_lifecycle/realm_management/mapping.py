@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, Mapping, Tuple
+
+from . import models
+
+# Realm attribute (models.Realm / schemas.RealmBase) -> key in Keycloak's
+# RealmRepresentation. Attributes that are ours alone, like customer_type,
+# are deliberately absent.
+FIELD_MAP: Tuple[Tuple[str, str], ...] = (
+    ("realm", "realm"),
+    ("enabled", "enabled"),
+    ("display_name", "displayName"),
+    ("display_name_html", "displayNameHtml"),
+    ("login_theme", "loginTheme"),
+    ("account_theme", "accountTheme"),
+    ("ssl_required", "sslRequired"),
+    ("password_policy", "passwordPolicy"),
+    ("browser_security_headers", "browserSecurityHeaders"),
+    ("login_with_email_allowed", "loginWithEmailAllowed"),
+    ("registration_allowed", "registrationAllowed"),
+    ("remember_me", "rememberMe"),
+    ("reset_password_allowed", "resetPasswordAllowed"),
+    ("verify_email", "verifyEmail"),
+    ("duplicate_emails_allowed", "duplicateEmailsAllowed"),
+    ("internationalization_enabled", "internationalizationEnabled"),
+    ("supported_locales", "supportedLocales"),
+    ("default_locale", "defaultLocale"),
+    ("smtp_server", "smtpServer"),
+    ("access_token_lifespan", "accessTokenLifespan"),
+    ("access_code_lifespan_login", "accessCodeLifespanLogin"),
+    ("sso_session_idle_timeout", "ssoSessionIdleTimeout"),
+    ("sso_session_max_lifespan", "ssoSessionMaxLifespan"),
+    ("revoke_refresh_token", "revokeRefreshToken"),
+    ("refresh_token_max_reuse", "refreshTokenMaxReuse"),
+    ("events_enabled", "eventsEnabled"),
+    ("events_listeners", "eventsListeners"),
+)
+
+ATTRIBUTES: Tuple[str, ...] = tuple(attr for attr, _ in FIELD_MAP)
+KEYCLOAK_KEYS: Tuple[str, ...] = tuple(key for _, key in FIELD_MAP)
+TO_KEYCLOAK: Dict[str, str] = dict(FIELD_MAP)
+FROM_KEYCLOAK: Dict[str, str] = {key: attr for attr, key in FIELD_MAP}
+
+# Compiled once: a single C-level call fetches every mapped field.
+_get_attrs = attrgetter(*ATTRIBUTES)
+_get_items = itemgetter(*ATTRIBUTES)
+
+
+def _payload(values: Tuple[Any, ...]) -> Dict[str, Any]:
+    payload = {key: value for key, value in zip(KEYCLOAK_KEYS, values) if value is not None}
+    # Keycloak creates realms disabled unless told otherwise.
+    payload.setdefault("enabled", True)
+    return payload
+
+
+def to_keycloak(realm: Any) -> Dict[str, Any]:
+    """Full RealmRepresentation for a ``models.Realm`` or ``schemas.RealmBase``."""
+    return _payload(_get_attrs(realm))
+
+
+def row_to_keycloak(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """Like :func:`to_keycloak` for a mapping row (e.g. ``RealmRepository.stream``)."""
+    return _payload(_get_items(row))
+
+
+def changes_to_keycloak(changes: Mapping[str, Any]) -> Dict[str, Any]:
+    """Partial representation for changed attributes; unmapped ones are skipped."""
+    return {TO_KEYCLOAK[attr]: value for attr, value in changes.items() if attr in TO_KEYCLOAK}
+
+
+def diff(current: Any, changes: Mapping[str, Any]) -> Dict[str, Any]:
+    """The subset of ``changes`` whose value differs from ``current``'s attribute."""
+    return {attr: value for attr, value in changes.items() if getattr(current, attr) != value}
+
+
+def from_keycloak(representation: Mapping[str, Any]) -> Dict[str, Any]:
+    """Realm attributes for the mapped keys present in a RealmRepresentation."""
+    return {
+        FROM_KEYCLOAK[key]: value for key, value in representation.items() if key in FROM_KEYCLOAK
+    }
+
+
+def to_model(representation: Mapping[str, Any], customer_type: str) -> models.Realm:
+    """A new ``models.Realm`` from a Keycloak RealmRepresentation."""
+    return models.Realm(customer_type=customer_type, **from_keycloak(representation))
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, Boolean, Integer, JSON, ARRAY, MetaData
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, String, Boolean, Integer, JSON, ARRAY, MetaData, Index, DateTime, func
 from sqlalchemy.orm import declarative_base
 
 SCHEMA_NAME = "tenant"
@@ -8,11 +10,21 @@ metadata = MetaData(schema=SCHEMA_NAME)
 
 Base = declarative_base(metadata=metadata)
 
+# Postgres arrays, stored as JSON lists when the tests run against SQLite.
+StringArray = ARRAY(String).with_variant(JSON(), "sqlite")
+
 
 class Realm(Base):
     """SQLAlchemy model for a Keycloak Realm representation stored in Postgres."""
 
     __tablename__ = "realms"
+    __table_args__ = (
+        # Keyset pagination orders by id, so every filter gets an index that
+        # ends in id (see migration 0002_realm_listing_indexes).
+        Index("ix_realms_customer_type_id", "customer_type", "id"),
+        Index("ix_realms_enabled_id", "enabled", "id"),
+        Index("ix_realms_realm_prefix", "realm", postgresql_ops={"realm": "text_pattern_ops"}),
+    )
 
     id: int = Column(Integer, primary_key=True, index=True)
     realm: str = Column(String, unique=True, nullable=False)
@@ -36,7 +48,7 @@ class Realm(Base):
     duplicate_emails_allowed: bool | None = Column(Boolean)
 
     internationalization_enabled: bool | None = Column(Boolean)
-    supported_locales = Column(ARRAY(String))
+    supported_locales = Column(StringArray)
     default_locale: str | None = Column(String)
 
     smtp_server = Column(JSON)
@@ -50,4 +62,94 @@ class Realm(Base):
     refresh_token_max_reuse: int | None = Column(Integer)
 
     events_enabled: bool | None = Column(Boolean)
-    events_listeners = Column(ARRAY(String)) 
\ No newline at end of file
+    events_listeners = Column(StringArray)
+
+    # Bumped by the ORM on every UPDATE (which also refuses to overwrite a row
+    # changed concurrently); realm ETags are derived from it.
+    version: int = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __mapper_args__ = {"version_id_col": version}
+ 
+
+class RealmTemplate(Base):
+    """Default settings for every new realm of one customer tier.
+
+    ``settings`` maps realm attributes to values; a create request only
+    needs the attributes that differ (see :mod:`.templates`).
+    """
+
+    __tablename__ = "realm_templates"
+
+    customer_type: str = Column(String, primary_key=True)
+    settings = Column(JSON, nullable=False)
+    version: int = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class RealmOutbox(Base):
+    """Keycloak side effect recorded in the same transaction as the realm row.
+
+    Rows are applied to Keycloak by :class:`.outbox.OutboxDispatcher`; per
+    realm they are applied strictly in ``id`` order.
+    """
+
+    __tablename__ = "realm_outbox"
+    __table_args__ = (
+        Index("ix_realm_outbox_status_next_attempt", "status", "next_attempt_at", "id"),
+        Index("ix_realm_outbox_realm_id", "realm", "id"),
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    realm: str = Column(String, nullable=False)
+    operation: str = Column(String, nullable=False)  # create | update | delete
+    payload = Column(JSON)
+
+    status: str = Column(String, nullable=False, default="pending")  # pending | done | failed
+    attempts: int = Column(Integer, nullable=False, default=0)
+    last_error: str | None = Column(String)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    processed_at = Column(DateTime(timezone=True))
+
+
+class RealmSyncState(Base):
+    """Last reconciliation result per realm (see :mod:`.reconciliation`)."""
+
+    __tablename__ = "realm_sync_state"
+
+    realm: str = Column(String, primary_key=True)
+    # Hash of the Keycloak payload derived from the row at ``db_version``;
+    # reused until the row's version changes.
+    db_version: int = Column(Integer, nullable=False)
+    db_hash: str = Column(String(64), nullable=False)
+    kc_hash: str | None = Column(String(64))
+    in_sync: bool = Column(Boolean, nullable=False, default=False)
+    checked_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a request sent with an ``Idempotency-Key`` header.
+
+    A row is ``in_progress`` while the first request runs and ``completed``
+    once its response is stored; retries with the same key replay it.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    key: str = Column(String(255), primary_key=True)
+    request_hash: str = Column(String(64), nullable=False)
+    status: str = Column(String, nullable=False, default="in_progress")  # in_progress | completed
+    response_status: int | None = Column(Integer)
+    response_body = Column(JSON)
+    response_headers = Column(JSON)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# One Keycloak call: (operation, payload) after coalescing.
+Step = Tuple[str, Optional[dict]]
+
+
+def new_operation(operation: str, realm: str, payload: Optional[dict] = None) -> models.RealmOutbox:
+    """Build an outbox row to be committed alongside the realm change."""
+    return models.RealmOutbox(realm=realm, operation=operation, payload=payload)
+
+
+def coalesce(operations: List[models.RealmOutbox]) -> List[Step]:
+    """Collapse one realm's ordered operations into the fewest Keycloak calls.
+
+    Consecutive updates merge into the preceding create/update, and a delete
+    supersedes whatever create/update precedes it.
+    """
+    steps: List[Step] = []
+    for op in operations:
+        last = steps[-1][0] if steps else None
+        if op.operation == "update" and last in ("create", "update"):
+            steps[-1] = (last, {**steps[-1][1], **(op.payload or {})})
+        elif op.operation == "delete" and last in ("create", "update", "delete"):
+            # Still delete after a create: a previous attempt may already
+            # have created the realm before its outcome was recorded.
+            steps[-1] = ("delete", None)
+        else:
+            steps.append((op.operation, dict(op.payload or {})))
+    return steps
+
+
+class OutboxDispatcher:
+    """Background worker applying ``realm_outbox`` rows to Keycloak.
+
+    Each round claims a batch of due rows with ``FOR UPDATE SKIP LOCKED``
+    and leases them for ``lease`` seconds (pushing ``next_attempt_at`` out)
+    in one short transaction, so replicas never apply the same row twice.
+    Keycloak is then called with no transaction or connection held,
+    different realms in parallel, and the outcomes are recorded in a second
+    short transaction. Failures are retried with capped exponential backoff;
+    rows of a dispatcher that died mid-batch are retried once its lease ends.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        kc_admin_factory: Callable[[], Any],
+        batch_size: int = 50,
+        poll_interval: float = 0.5,
+        max_parallel: int = 8,
+        max_attempts: int = 8,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+        lease: float = 300.0,
+    ):
+        self.session_factory = session_factory
+        self.kc_admin_factory = kc_admin_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_parallel = max_parallel
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(
+        cls, session_factory: Callable[[], Session], kc_admin_factory: Callable[[], Any]
+    ) -> "OutboxDispatcher":
+        return cls(
+            session_factory,
+            kc_admin_factory,
+            batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "50")),
+            poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5")),
+            max_parallel=int(os.getenv("OUTBOX_MAX_PARALLEL", "8")),
+            max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")),
+            backoff_base=float(os.getenv("OUTBOX_BACKOFF_BASE", "1")),
+            backoff_max=float(os.getenv("OUTBOX_BACKOFF_MAX", "300")),
+            lease=float(os.getenv("OUTBOX_LEASE_SECONDS", "300")),
+        )
+
+    # Lifecycle -------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="realm-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self) -> None:
+        """Skip the rest of the current poll interval (new rows were committed)."""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                claimed = self.dispatch_once()
+            except Exception:  # keep the worker alive; the batch is retried
+                logger.exception("Outbox dispatch round failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    # Dispatch ----------------------------------------------------------------
+
+    def dispatch_once(self) -> int:
+        """Claim, apply and record one batch; returns the number of rows claimed."""
+        claimed, groups, lease_until = self._claim()
+        if groups:
+            kc_admin = self.kc_admin_factory()
+            workers = min(self.max_parallel, len(groups))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                errors = dict(zip(
+                    groups,
+                    pool.map(lambda ops: self._apply(kc_admin, ops), groups.values()),
+                ))
+            self._finish(groups, errors, lease_until)
+        return claimed
+
+    def _claim(self) -> Tuple[int, "OrderedDict[str, List[models.RealmOutbox]]", datetime]:
+        """Lease the runnable rows of one batch; they come back detached."""
+        with self.session_factory() as db:
+            now = datetime.now(timezone.utc)
+            claimed = db.scalars(
+                select(models.RealmOutbox)
+                .where(models.RealmOutbox.status == "pending")
+                .where(models.RealmOutbox.next_attempt_at <= now)
+                .order_by(models.RealmOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not claimed:
+                return 0, OrderedDict(), now
+            groups = self._runnable_groups(db, claimed)
+            lease_until = now + timedelta(seconds=self.lease)
+            for ops in groups.values():
+                for op in ops:
+                    op.next_attempt_at = lease_until
+            db.flush()
+            # Keep the loaded rows usable after the session closes.
+            db.expunge_all()
+            db.commit()
+            return len(claimed), groups, lease_until
+
+    def _finish(
+        self,
+        groups: "OrderedDict[str, List[models.RealmOutbox]]",
+        errors: Dict[str, Optional[str]],
+        lease_until: datetime,
+    ) -> None:
+        ids = [op.id for ops in groups.values() for op in ops]
+        with self.session_factory() as db:
+            now = datetime.now(timezone.utc)
+            for op in db.scalars(
+                select(models.RealmOutbox).where(models.RealmOutbox.id.in_(ids)).with_for_update()
+            ):
+                if op.status != "pending" or _as_utc(op.next_attempt_at) != lease_until:
+                    # The lease ran out and another dispatcher took the row over.
+                    continue
+                self._record(op, errors[op.realm], now)
+            db.commit()
+
+    def _runnable_groups(
+        self, db: Session, claimed: List[models.RealmOutbox]
+    ) -> "OrderedDict[str, List[models.RealmOutbox]]":
+        groups: "OrderedDict[str, List[models.RealmOutbox]]" = OrderedDict()
+        for op in claimed:
+            groups.setdefault(op.realm, []).append(op)
+        # A realm is only runnable if none of its earlier rows are still
+        # pending outside this batch (backing off, or locked by a replica).
+        first_pending: Dict[str, int] = dict(db.execute(
+            select(models.RealmOutbox.realm, func.min(models.RealmOutbox.id))
+            .where(models.RealmOutbox.status == "pending")
+            .where(models.RealmOutbox.realm.in_(list(groups)))
+            .group_by(models.RealmOutbox.realm)
+        ).all())
+        for realm in list(groups):
+            if first_pending.get(realm, groups[realm][0].id) < groups[realm][0].id:
+                del groups[realm]
+        return groups
+
+    def _apply(self, kc_admin: Any, operations: List[models.RealmOutbox]) -> Optional[str]:
+        from keycloak.exceptions import KeycloakError
+
+        realm = operations[0].realm
+        try:
+            for operation, payload in coalesce(operations):
+                if operation == "create":
+                    result = kc_admin.create_realm(payload=payload, skip_exists=True)
+                    if result == {"msg": "Already exists"}:
+                        # Retried create: make sure Keycloak has this payload.
+                        kc_admin.update_realm(realm_name=realm, payload=payload)
+                elif operation == "update":
+                    kc_admin.update_realm(realm_name=realm, payload=payload)
+                elif operation == "delete":
+                    try:
+                        kc_admin.delete_realm(realm_name=realm)
+                    except KeycloakError as exc:
+                        if exc.response_code != 404:
+                            raise
+        except Exception as exc:
+            return str(exc) or exc.__class__.__name__
+        return None
+
+    def _record(self, op: models.RealmOutbox, error: Optional[str], now: datetime) -> None:
+        if error is None:
+            op.status = "done"
+            op.processed_at = now
+            op.last_error = None
+            return
+        op.attempts += 1
+        op.last_error = error[:1000]
+        if op.attempts >= self.max_attempts:
+            op.status = "failed"
+            op.processed_at = now
+            logger.error(
+                "Keycloak operation failed permanently",
+                extra={"realm": op.realm, "operation": op.operation, "attempts": op.attempts, "error": op.last_error},
+            )
+            return
+        logger.warning(
+            "Keycloak operation failed, will retry",
+            extra={"realm": op.realm, "operation": op.operation, "attempts": op.attempts, "error": op.last_error},
+        )
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (op.attempts - 1))
+        op.next_attempt_at = now + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from . import mapping, models, outbox, repository, schemas
+
+logger = logging.getLogger(__name__)
+
+# Keycloak never returns secrets (e.g. the SMTP password); it masks them.
+MASKED_SECRET = "**********"
+
+# Arbitrary constant identifying the reconciler's Postgres advisory lock.
+_ADVISORY_LOCK_KEY = 0x7265616C6D73
+
+
+def content_hash(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def project(desired: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the part of Keycloak's ``actual`` representation that ``desired`` manages.
+
+    Nested objects are narrowed to the keys we set, masked secrets are taken
+    as matching, and list order is ignored (Keycloak stores locales and event
+    listeners as sets).
+    """
+    projected = {}
+    for key, want in desired.items():
+        have = actual.get(key)
+        if isinstance(want, dict) and isinstance(have, dict):
+            have = {k: want[k] if have.get(k) == MASKED_SECRET else have.get(k) for k in want}
+        elif isinstance(want, list) and isinstance(have, list) and sorted(have) == sorted(want):
+            have = want
+        projected[key] = have
+    return projected
+
+
+def minimal_update(desired: Dict[str, Any], projected: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the attributes whose Keycloak value differs from the database."""
+    return {key: value for key, value in desired.items() if projected.get(key) != value}
+
+
+class Reconciler:
+    """Detects and repairs drift between ``tenant.realms`` and Keycloak.
+
+    All Keycloak realms are fetched with one ``get_realms`` call. A realm is
+    skipped without building or diffing payloads when its row version and the
+    hash of its Keycloak representation both match the last in-sync run
+    (``realm_sync_state``). Drifted realms get a minimal update payload built
+    with the shared field mapping (``mapping.row_to_keycloak``); when
+    applying, repairs are queued on the realm outbox rather than sent inline.
+    Realms present only in Keycloak are reported, never deleted.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        kc_admin_factory: Callable[[], Any],
+        interval: float = 0.0,
+        ignore_realms: Iterable[str] = ("master",),
+        on_enqueue: Optional[Callable[[], None]] = None,
+    ):
+        self.session_factory = session_factory
+        self.kc_admin_factory = kc_admin_factory
+        self.interval = interval
+        self.ignore_realms = set(ignore_realms)
+        self.on_enqueue = on_enqueue
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        session_factory: Callable[[], Session],
+        kc_admin_factory: Callable[[], Any],
+        on_enqueue: Optional[Callable[[], None]] = None,
+    ) -> "Reconciler":
+        ignore = os.getenv("RECONCILE_IGNORE_REALMS", "master")
+        return cls(
+            session_factory,
+            kc_admin_factory,
+            interval=float(os.getenv("RECONCILE_INTERVAL", "0")),
+            ignore_realms=[name.strip() for name in ignore.split(",") if name.strip()],
+            on_enqueue=on_enqueue,
+        )
+
+    # Scheduling --------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="realm-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                report = self.run(apply=True, exclusive=True)
+            except Exception:  # try again next interval
+                logger.exception("Scheduled realm reconciliation failed")
+                continue
+            if report is not None and (report.enqueued or report.orphaned_in_keycloak):
+                logger.info(
+                    "Realm reconciliation queued repairs",
+                    extra={"enqueued": report.enqueued, "orphaned": report.orphaned_in_keycloak},
+                )
+
+    # Reconciliation ----------------------------------------------------------
+
+    def run(self, apply: bool = False, exclusive: bool = False) -> Optional[schemas.RealmReconcileReport]:
+        """Diff every realm; with ``apply`` queue repairs on the outbox.
+
+        With ``exclusive`` the run is skipped (returns None) when another
+        replica holds the reconciler's advisory lock.
+        """
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            if exclusive and not self._try_lock(db):
+                return None
+            kc_realms = {rep["realm"]: rep for rep in self.kc_admin_factory().get_realms()}
+            report = self._diff(db, kc_realms, apply)
+            db.commit()
+        if apply and report.enqueued and self.on_enqueue is not None:
+            self.on_enqueue()
+        report.duration_ms = (time.perf_counter() - started) * 1000
+        return report
+
+    @staticmethod
+    def _try_lock(db: Session) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return True
+        return bool(db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+        ).scalar())
+
+    def _diff(
+        self, db: Session, kc_realms: Dict[str, dict], apply: bool
+    ) -> schemas.RealmReconcileReport:
+        report = schemas.RealmReconcileReport()
+        states = {state.realm: state for state in db.scalars(select(models.RealmSyncState))}
+        in_flight = set(db.scalars(
+            select(models.RealmOutbox.realm).where(models.RealmOutbox.status == "pending").distinct()
+        ))
+        now = datetime.now(timezone.utc)
+        seen = set()
+
+        for batch in repository.RealmRepository(db).stream():
+            for row in batch:
+                name = row["realm"]
+                seen.add(name)
+                report.checked += 1
+                if name in in_flight:
+                    # The dispatcher is about to change this realm anyway.
+                    report.skipped_in_flight.append(name)
+                    continue
+
+                actual = kc_realms.get(name)
+                kc_hash = content_hash(actual) if actual is not None else None
+                state = states.get(name)
+                if (
+                    state is not None
+                    and state.in_sync
+                    and state.db_version == row["version"]
+                    and state.kc_hash == kc_hash
+                ):
+                    report.unchanged += 1
+                    state.checked_at = now
+                    continue
+
+                desired = mapping.row_to_keycloak(row)
+                if actual is None:
+                    report.missing_in_keycloak.append(name)
+                    repair = ("create", desired)
+                else:
+                    changes = minimal_update(desired, project(desired, actual))
+                    if changes:
+                        report.drifted[name] = changes
+                    repair = ("update", changes) if changes else None
+
+                if repair is not None and apply:
+                    db.add(outbox.new_operation(repair[0], name, repair[1]))
+                    report.enqueued += 1
+
+                if state is None:
+                    state = models.RealmSyncState(realm=name)
+                    db.add(state)
+                state.db_version = row["version"]
+                state.db_hash = content_hash(desired)
+                state.kc_hash = kc_hash
+                # A queued repair changes Keycloak, so check again next run.
+                state.in_sync = repair is None
+                state.checked_at = now
+
+        for name, state in states.items():
+            if name not in seen:
+                db.delete(state)
+        report.orphaned_in_keycloak = sorted(
+            name for name in kc_realms if name not in seen and name not in self.ignore_realms
+        )
+        return report
@@ -1,12 +1,57 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
 
+from sqlalchemy import Row, Select, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from ....database import read_options
 from . import models, schemas
 
 
+def _list_query(
+    customer_type: Optional[str],
+    enabled: Optional[bool],
+    name_prefix: Optional[str],
+    after_id: Optional[int],
+    limit: Optional[int],
+) -> Select:
+    # Filters map onto the (column, id) indexes from migration 0002 so a page
+    # is an index range scan that stops after ``limit`` rows.
+    query = select(models.Realm)
+    if customer_type:
+        query = query.where(models.Realm.customer_type == customer_type)
+    if enabled is not None:
+        query = query.where(models.Realm.enabled == enabled)
+    if name_prefix:
+        query = query.where(models.Realm.realm.startswith(name_prefix, autoescape=True))
+    if after_id is not None:
+        query = query.where(models.Realm.id > after_id)
+    query = query.order_by(models.Realm.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _update_query(realm_obj: models.Realm, changes: Mapping[str, Any]):
+    # A Core UPDATE bumps the version itself (the ORM's version_id_col only
+    # applies to flushes) and is guarded by it the same way; RETURNING hands
+    # back the new row so no refresh SELECT is needed.
+    table = models.Realm.__table__
+    return (
+        update(table)
+        .where(table.c.id == realm_obj.id, table.c.version == realm_obj.version)
+        .values(**changes, version=table.c.version + 1)
+        .returning(*table.c)
+    )
+
+
+def _stale(realm_obj: models.Realm) -> StaleDataError:
+    return StaleDataError(f"Realm {realm_obj.realm!r} was modified concurrently")
+
+
 class RealmRepository:
     """Data access layer for realm objects."""
 
@@ -14,42 +59,221 @@ class RealmRepository:
         self.db = db
 
     # READ
-    def get(self, realm_name: str) -> Optional[models.Realm]:
-        return (
-            self.db.query(models.Realm)
-            .filter(models.Realm.realm == realm_name)
-            .first()
-        )
+    # ``get`` and ``list`` are served by the read replica when one is
+    # configured; pass ``primary=True`` to read a row you are about to write.
+    def get(self, realm_name: str, primary: bool = False) -> Optional[models.Realm]:
+        return self.db.scalars(
+            select(models.Realm).where(models.Realm.realm == realm_name).limit(1),
+            **({} if primary else read_options(self.db)),
+        ).first()
 
     def list(
         self,
         customer_type: Optional[str] = None,
         enabled: Optional[bool] = None,
+        name_prefix: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
     ) -> List[models.Realm]:
-        query = self.db.query(models.Realm)
-        if customer_type:
-            query = query.filter(models.Realm.customer_type == customer_type)
-        if enabled is not None:
-            query = query.filter(models.Realm.enabled == enabled)
-        return query.all()
+        """Realms ordered by id, starting after ``after_id`` (keyset pagination)."""
+        return self.db.scalars(
+            _list_query(customer_type, enabled, name_prefix, after_id, limit),
+            **read_options(self.db),
+        ).all()
+
+    def stream(
+        self,
+        customer_type: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Yield batches of raw realm rows from a server-side cursor.
+
+        Rows are plain column mappings rather than ORM objects, so neither the
+        identity map nor Pydantic validation grows with the table.
+        """
+        query = _list_query(customer_type, enabled, None, None, None)
+        query = query.with_only_columns(*models.Realm.__table__.columns)
+        result = self.db.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.mappings().partitions():
+            yield partition
+
+    def get_operation(self, operation_id: int) -> Optional[models.RealmOutbox]:
+        return self.db.get(models.RealmOutbox, operation_id)
 
     # CUD
-    def create(self, data: schemas.RealmCreate) -> models.Realm:
+    # ``outbox`` rows passed to the mutating methods are committed in the same
+    # transaction as the realm change itself.
+    def create(
+        self, data: schemas.RealmCreate, outbox: Optional[models.RealmOutbox] = None
+    ) -> models.Realm:
         realm = models.Realm(**data.dict(exclude_unset=True))
         self.db.add(realm)
+        if outbox is not None:
+            self.db.add(outbox)
         self.db.commit()
         self.db.refresh(realm)
         return realm
 
     def update(
-        self, realm_obj: models.Realm, data: schemas.RealmUpdate
-    ) -> models.Realm:
-        for field, value in data.dict(exclude_unset=True).items():
-            setattr(realm_obj, field, value)
+        self,
+        realm_obj: models.Realm,
+        changes: Mapping[str, Any],
+        outbox: Optional[models.RealmOutbox] = None,
+    ) -> Row:
+        """Write ``changes`` with one ``UPDATE ... RETURNING`` and commit.
+
+        Raises ``StaleDataError`` if the row changed since ``realm_obj`` was read.
+        """
+        if outbox is not None:
+            self.db.add(outbox)
+        row = self.db.execute(_update_query(realm_obj, changes)).first()
+        if row is None:
+            self.db.rollback()
+            raise _stale(realm_obj)
         self.db.commit()
-        self.db.refresh(realm_obj)
-        return realm_obj
+        return row
+
+    def existing_names(self, realm_names: List[str]) -> Set[str]:
+        if not realm_names:
+            return set()
+        return set(self.db.scalars(
+            select(models.Realm.realm).where(models.Realm.realm.in_(realm_names))
+        ))
+
+    def bulk_create(
+        self,
+        items: List[schemas.RealmCreate],
+        outbox: Sequence[models.RealmOutbox] = (),
+    ) -> List[models.Realm]:
+        """Insert all ``items`` in one multi-row INSERT ... RETURNING and commit once."""
+        if not items:
+            return []
+        self.db.add_all(outbox)
+        realms = self.db.scalars(
+            insert(models.Realm).returning(models.Realm),
+            [item.dict(exclude_unset=True) for item in items],
+        ).all()
+        self.db.commit()
+        return realms
+
+    def delete(
+        self, realm_obj: Optional[models.Realm], outbox: Optional[models.RealmOutbox] = None
+    ) -> None:
+        if realm_obj is not None:
+            self.db.delete(realm_obj)
+        if outbox is not None:
+            self.db.add(outbox)
+        self.db.commit()
+
+    # Templates
+    def get_template(self, customer_type: str) -> Optional[models.RealmTemplate]:
+        return self.db.get(models.RealmTemplate, customer_type)
+
+    def list_templates(self) -> List[models.RealmTemplate]:
+        return self.db.scalars(
+            select(models.RealmTemplate).order_by(models.RealmTemplate.customer_type)
+        ).all()
+
+    def save_template(
+        self, customer_type: str, settings: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], models.RealmTemplate]:
+        """Create or replace a template; returns its previous settings and the saved row."""
+        template = self.get_template(customer_type)
+        previous = dict(template.settings) if template is not None else {}
+        if template is None:
+            template = models.RealmTemplate(customer_type=customer_type, settings=settings)
+            self.db.add(template)
+        else:
+            template.settings = settings
+        self.db.commit()
+        self.db.refresh(template)
+        return previous, template
+
+    def tier_rows(
+        self, customer_type: str, columns: Sequence[str], after_id: Optional[int], limit: int
+    ) -> List[Row]:
+        """``id``, ``realm``, ``version`` and ``columns`` of one keyset page of a tier."""
+        table = models.Realm.__table__
+        query = (
+            select(table.c.id, table.c.realm, table.c.version, *(table.c[name] for name in columns))
+            .where(table.c.customer_type == customer_type)
+            .order_by(table.c.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(table.c.id > after_id)
+        return self.db.execute(query).all()
+
+    def update_unless_stale(self, realm_row: Any, changes: Mapping[str, Any]) -> Optional[Row]:
+        """Version-guarded UPDATE in the current transaction; ``None`` if the row changed since read."""
+        return self.db.execute(_update_query(realm_row, changes)).first()
+
+
+class AsyncRealmRepository:
+    """Async counterpart of :class:`RealmRepository` for ``AsyncSession``."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # READ
+    async def get(self, realm_name: str, primary: bool = False) -> Optional[models.Realm]:
+        result = await self.db.execute(
+            select(models.Realm).where(models.Realm.realm == realm_name).limit(1),
+            **({} if primary else read_options(self.db)),
+        )
+        return result.scalars().first()
+
+    async def list(
+        self,
+        customer_type: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        name_prefix: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[models.Realm]:
+        result = await self.db.scalars(
+            _list_query(customer_type, enabled, name_prefix, after_id, limit),
+            **read_options(self.db),
+        )
+        return list(result.all())
+
+    # CUD
+    async def create(
+        self, data: schemas.RealmCreate, outbox: Optional[models.RealmOutbox] = None
+    ) -> models.Realm:
+        realm = models.Realm(**data.dict(exclude_unset=True))
+        self.db.add(realm)
+        if outbox is not None:
+            self.db.add(outbox)
+        await self.db.commit()
+        await self.db.refresh(realm)
+        return realm
+
+    async def update(
+        self,
+        realm_obj: models.Realm,
+        changes: Mapping[str, Any],
+        outbox: Optional[models.RealmOutbox] = None,
+    ) -> Row:
+        if outbox is not None:
+            self.db.add(outbox)
+        row = (await self.db.execute(_update_query(realm_obj, changes))).first()
+        if row is None:
+            await self.db.rollback()
+            raise _stale(realm_obj)
+        await self.db.commit()
+        return row
+
+    async def delete(
+        self, realm_obj: Optional[models.Realm], outbox: Optional[models.RealmOutbox] = None
+    ) -> None:
+        if realm_obj is not None:
+            await self.db.delete(realm_obj)
+        if outbox is not None:
+            self.db.add(outbox)
+        await self.db.commit()
 
-    def delete(self, realm_obj: models.Realm) -> None:
-        self.db.delete(realm_obj)
-        self.db.commit() 
\ No newline at end of file
+    # Templates
+    async def get_template(self, customer_type: str) -> Optional[models.RealmTemplate]:
+        return await self.db.get(models.RealmTemplate, customer_type)
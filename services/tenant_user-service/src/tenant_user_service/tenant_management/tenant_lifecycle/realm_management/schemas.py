@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import Optional, List, Dict
+from datetime import datetime
+from typing import Any, Optional, List, Dict, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conlist, validator
 
 
 class RealmBase(BaseModel):
@@ -52,17 +53,133 @@ class RealmCreate(RealmBase):
 
 
 class RealmUpdate(BaseModel):
+    """Every attribute mapped to Keycloak except the realm name; omitted ones are left as they are."""
+
     enabled: Optional[bool]
+
     display_name: Optional[str]
     display_name_html: Optional[str]
     login_theme: Optional[str]
     account_theme: Optional[str]
+
+    ssl_required: Optional[str]
     password_policy: Optional[str]
     browser_security_headers: Optional[Dict[str, str]]
+
+    login_with_email_allowed: Optional[bool]
+    registration_allowed: Optional[bool]
+    remember_me: Optional[bool]
+    reset_password_allowed: Optional[bool]
+    verify_email: Optional[bool]
+    duplicate_emails_allowed: Optional[bool]
+
+    internationalization_enabled: Optional[bool]
+    supported_locales: Optional[List[str]]
+    default_locale: Optional[str]
+
+    smtp_server: Optional[Dict[str, str]]
+
+    access_token_lifespan: Optional[int]
+    access_code_lifespan_login: Optional[int]
+    sso_session_idle_timeout: Optional[int]
+    sso_session_max_lifespan: Optional[int]
+
+    revoke_refresh_token: Optional[bool]
+    refresh_token_max_reuse: Optional[int]
+
     events_enabled: Optional[bool]
     events_listeners: Optional[List[str]]
-    # Include any other mutable fields as optional
 
 
 class RealmRead(RealmBase):
-    id: int 
\ No newline at end of file
+    id: int
+    version: int = 1
+    updated_at: Optional[datetime]
+
+
+class RealmBulkCreate(BaseModel):
+    items: conlist(RealmCreate, min_items=1, max_items=1000)  # type: ignore[valid-type]
+
+
+class RealmBulkItemResult(BaseModel):
+    realm: str
+    status: Literal["created", "failed"]
+    detail: Optional[str] = None
+    operation_id: Optional[int] = None
+    item: Optional[RealmRead] = None
+
+
+class RealmBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[RealmBulkItemResult]
+
+
+class RealmOperationRead(BaseModel):
+    """Status of a Keycloak side effect queued in the realm outbox."""
+
+    id: int
+    realm: str
+    operation: str
+    status: Literal["pending", "done", "failed"]
+    attempts: int
+    last_error: Optional[str]
+    created_at: datetime
+    next_attempt_at: Optional[datetime]
+    processed_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
+class RealmReconcileReport(BaseModel):
+    """Outcome of one Keycloak/Postgres reconciliation pass."""
+
+    checked: int = 0
+    unchanged: int = 0
+    missing_in_keycloak: List[str] = []
+    drifted: Dict[str, Dict[str, Any]] = {}
+    orphaned_in_keycloak: List[str] = []
+    skipped_in_flight: List[str] = []
+    enqueued: int = 0
+    duration_ms: float = 0.0
+
+
+# Attributes a realm template may set: everything except the identity fields.
+TEMPLATE_FIELDS = frozenset(RealmBase.__fields__) - {"customer_type", "realm"}
+
+
+class RealmTemplateWrite(BaseModel):
+    settings: Dict[str, Any] = Field(..., description="Realm attributes applied to new realms of the tier")
+
+    @validator("settings")
+    def _validate_settings(cls, settings: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(settings) - TEMPLATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown realm settings: {', '.join(sorted(unknown))}")
+        # Validated (and coerced) exactly as a create request would be.
+        return RealmBase(customer_type="-", realm="-", **settings).dict(include=set(settings))
+
+
+class RealmTemplateRead(BaseModel):
+    customer_type: str
+    settings: Dict[str, Any]
+    version: int
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
+class RealmTemplateRolloutReport(BaseModel):
+    """Outcome of applying a template change to the existing realms of its tier."""
+
+    customer_type: str
+    template_version: int
+    checked: int = 0
+    updated: int = 0
+    # Realms whose value for every changed setting differs from the old
+    # template, i.e. was set per tenant.
+    overridden: int = 0
+    conflicts: List[str] = []
+    duration_ms: float = 0.0
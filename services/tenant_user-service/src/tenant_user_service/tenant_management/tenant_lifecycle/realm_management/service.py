@@ -1,135 +1,363 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import logging
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
 
-from keycloak import KeycloakAdmin
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from . import repository, schemas, models
+from ....events import EventPublisher, envelope
+from ...identity_access_secrets.audit_compliance_trails.trail import AuditTrail
+from . import mapping, outbox, pagination, repository, schemas, models, templates
+from .cache import Page, RealmCache
+from .templates import RenderedTemplate, TemplateCache
 
+logger = logging.getLogger(__name__)
 
-class RealmService:
+
+def _page(rows: List[models.Realm], limit: int) -> Page:
+    # Repositories are asked for limit + 1 rows; the extra row only signals
+    # that another page exists.
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1].id)
+    return [schemas.RealmRead.from_orm(row) for row in rows], next_cursor
+
+
+class _RealmServiceBase:
+    """State and side effects shared by :class:`RealmService` and :class:`AsyncRealmService`."""
+
+    def __init__(
+        self,
+        cache: Optional[RealmCache] = None,
+        events: Optional[EventPublisher] = None,
+        templates: Optional[TemplateCache] = None,
+        audit: Optional[AuditTrail] = None,
+        actor: Optional[str] = None,
+    ):
+        self.cache = cache
+        self.events = events
+        # Every committed mutation is recorded, attributed to ``actor``.
+        self.audit = audit
+        self.actor = actor
+        # Realm templates are applied on create only when a cache is given.
+        self.templates = templates
+        # Outbox rows enqueued by this instance (one service per request).
+        self.operations: List[models.RealmOutbox] = []
+
+    # Keycloak is never called inline: each mutation commits its realm row
+    # together with an outbox row, which OutboxDispatcher applies afterwards.
+    def _enqueue(self, operation: str, realm: str, payload: Optional[dict] = None) -> models.RealmOutbox:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Queueing Keycloak %s", operation, extra={"realm": realm, "payload": payload})
+        op = outbox.new_operation(operation, realm, payload)
+        self.operations.append(op)
+        return op
+
+    # Lifecycle events are published once the change is committed, keyed by
+    # realm so each realm's events stay in order.
+    def _publish(self, event: str, realm: str, data: Optional[Dict[str, Any]] = None) -> None:
+        if self.events is not None:
+            self.events.publish(realm, envelope(f"realm.{event}", realm, data))
+
+    def _audit(
+        self, action: str, realm: str, before: Optional[Dict[str, Any]] = None, after: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if self.audit is not None:
+            self.audit.record(realm, action, before, after, self.actor)
+
+
+class RealmService(_RealmServiceBase):
     """Business logic for realm management across Keycloak and Postgres."""
 
-    def __init__(self, db: Session, kc_admin: KeycloakAdmin):
+    def __init__(
+        self,
+        db: Session,
+        cache: Optional[RealmCache] = None,
+        events: Optional[EventPublisher] = None,
+        templates: Optional[TemplateCache] = None,
+        audit: Optional[AuditTrail] = None,
+        actor: Optional[str] = None,
+    ):
+        super().__init__(cache, events, templates, audit, actor)
         self.repo = repository.RealmRepository(db)
-        self.kc_admin = kc_admin
-
-    # Utility to transform pydantic model to Keycloak realm payload.
-    @staticmethod
-    def _to_keycloak_payload(data: schemas.RealmBase) -> dict:
-        # Start with a clean slate, only adding fields Keycloak understands.
-        # Field names here should match what python-keycloak client expects,
-        # which then translates to Keycloak server's RealmRepresentation.
-        # Common fields: realm, enabled, displayName, loginTheme, accountTheme, etc.
-        # The python-keycloak library often uses the same names as Keycloak's REST API (camelCase)
-        # or allows snake_case and converts them. For safety, let's check a few common ones.
-        # The `keycloak-python` library is generally good about accepting snake_case for known attributes.
-
-        kc_payload = {}
-
-        # Mandatory or core fields
-        kc_payload["realm"] = data.realm
-        if data.enabled is not None:
-            kc_payload["enabled"] = data.enabled
-        else:
-            kc_payload["enabled"] = True # Default if not provided
-
-        # Optional fields (add more as needed, ensuring names are Keycloak-compatible)
-        if data.display_name is not None:
-            kc_payload["displayName"] = data.display_name # Keycloak often uses camelCase
-        if data.display_name_html is not None:
-            kc_payload["displayNameHtml"] = data.display_name_html
-        if data.login_theme is not None:
-            kc_payload["loginTheme"] = data.login_theme
-        if data.account_theme is not None:
-            kc_payload["accountTheme"] = data.account_theme
-        
-        if data.ssl_required is not None:
-            kc_payload["sslRequired"] = data.ssl_required
-        if data.password_policy is not None:
-            # Password policy is a string, but complex ones can be set via API.
-            # This assumes it's a simple policy string name.
-            kc_payload["passwordPolicy"] = data.password_policy
-        if data.browser_security_headers is not None:
-            kc_payload["browserSecurityHeaders"] = data.browser_security_headers
-
-        if data.login_with_email_allowed is not None:
-            kc_payload["loginWithEmailAllowed"] = data.login_with_email_allowed
-        if data.registration_allowed is not None:
-            kc_payload["registrationAllowed"] = data.registration_allowed
-        if data.remember_me is not None:
-            kc_payload["rememberMe"] = data.remember_me
-        if data.reset_password_allowed is not None:
-            kc_payload["resetPasswordAllowed"] = data.reset_password_allowed
-        if data.verify_email is not None:
-            kc_payload["verifyEmail"] = data.verify_email
-        if data.duplicate_emails_allowed is not None:
-            kc_payload["duplicateEmailsAllowed"] = data.duplicate_emails_allowed
-
-        if data.internationalization_enabled is not None:
-            kc_payload["internationalizationEnabled"] = data.internationalization_enabled
-        if data.supported_locales is not None:
-            kc_payload["supportedLocales"] = data.supported_locales
-        if data.default_locale is not None:
-            kc_payload["defaultLocale"] = data.default_locale
-
-        if data.smtp_server is not None: # smtpServer is a complex object (dict)
-            kc_payload["smtpServer"] = data.smtp_server
-        
-        if data.access_token_lifespan is not None:
-            kc_payload["accessTokenLifespan"] = data.access_token_lifespan
-        # Add other lifespan properties similarly if needed:
-        # accessCodeLifespanUserAction, accessCodeLifespanLogin, ssoSessionIdleTimeout, ssoSessionMaxLifespan etc.
-        if data.access_code_lifespan_login is not None:
-            kc_payload["accessCodeLifespanLogin"] = data.access_code_lifespan_login
-        if data.sso_session_idle_timeout is not None:
-            kc_payload["ssoSessionIdleTimeout"] = data.sso_session_idle_timeout
-        if data.sso_session_max_lifespan is not None:
-            kc_payload["ssoSessionMaxLifespan"] = data.sso_session_max_lifespan
-            
-        if data.revoke_refresh_token is not None:
-            kc_payload["revokeRefreshToken"] = data.revoke_refresh_token
-        if data.refresh_token_max_reuse is not None: # This might not be a direct field, often part of token settings object
-             pass # Placeholder - check KC docs for refresh token max reuse setting path
-        
-        if data.events_enabled is not None:
-            kc_payload["eventsEnabled"] = data.events_enabled
-        if data.events_listeners is not None:
-            kc_payload["eventsListeners"] = data.events_listeners
-            
-        # Exclude any fields that are purely for your app's DB and not for Keycloak
-        # e.g., 'customer_type' is not sent.
-
-        print(f"Constructed Keycloak payload: {kc_payload}") # For debugging
-        return kc_payload
+
+    def get_operation(self, operation_id: int) -> Optional[models.RealmOutbox]:
+        return self.repo.get_operation(operation_id)
 
     # CRUD -------------------------------------------------------------
+
+    def _template(self, customer_type: str) -> RenderedTemplate:
+        rendered = self.templates.get(customer_type)
+        if rendered is None:
+            rendered = self.templates.set(customer_type, self.repo.get_template(customer_type))
+        return rendered
+
+    def _prepare(self, data: schemas.RealmCreate) -> Tuple[schemas.RealmCreate, Dict[str, Any]]:
+        """The realm to store (with template defaults) and its Keycloak payload."""
+        if self.templates is None:
+            return data, mapping.to_keycloak(data)
+        return templates.apply(self._template(data.customer_type), data)
+
     def create(self, data: schemas.RealmCreate) -> models.Realm:
-        # Call Keycloak first
-        self.kc_admin.create_realm(payload=self._to_keycloak_payload(data))
-        # Persist in DB
-        return self.repo.create(data)
+        data, payload = self._prepare(data)
+        op = self._enqueue("create", data.realm, payload)
+        realm = self.repo.create(data, outbox=op)
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.events is not None or self.audit is not None:
+            created = schemas.RealmRead.from_orm(realm).dict()
+            self._publish("created", realm.realm, created)
+            self._audit("created", realm.realm, after=created)
+        return realm
+
+    def bulk_create(self, items: List[schemas.RealmCreate]) -> schemas.RealmBulkResult:
+        """Create many realms, reporting success or failure per item.
+
+        All new rows and their outbox entries are written with one batched
+        INSERT and a single commit; the dispatcher then creates the realms in
+        Keycloak with bounded parallelism (see each item's ``operation_id``).
+        """
+        results: List[Optional[schemas.RealmBulkItemResult]] = [None] * len(items)
+
+        def fail(index: int, detail: str) -> None:
+            results[index] = schemas.RealmBulkItemResult(
+                realm=items[index].realm, status="failed", detail=detail
+            )
+
+        seen: Set[str] = set()
+        candidates: List[int] = []
+        for index, item in enumerate(items):
+            if item.realm in seen:
+                fail(index, "Duplicate realm in request")
+            else:
+                seen.add(item.realm)
+                candidates.append(index)
+
+        existing = self.repo.existing_names([items[i].realm for i in candidates])
+        accepted = []
+        for index in candidates:
+            if items[index].realm in existing:
+                fail(index, "Realm already exists")
+            else:
+                accepted.append(index)
+
+        prepared = {i: self._prepare(items[i]) for i in accepted}
+        ops = {
+            items[i].realm: self._enqueue("create", items[i].realm, prepared[i][1])
+            for i in accepted
+        }
+        try:
+            created = {
+                r.realm: r
+                for r in self.repo.bulk_create([prepared[i][0] for i in accepted], outbox=list(ops.values()))
+            }
+        except SQLAlchemyError as exc:
+            # e.g. a concurrent request created one of the realms first.
+            self.repo.db.rollback()
+            self.operations.clear()
+            for index in accepted:
+                fail(index, f"Database insert failed: {exc}")
+        else:
+            if accepted and self.cache is not None:
+                self.cache.invalidate()
+            for index in accepted:
+                name = items[index].realm
+                results[index] = schemas.RealmBulkItemResult(
+                    realm=name,
+                    status="created",
+                    operation_id=ops[name].id,
+                    item=schemas.RealmRead.from_orm(created[name]),
+                )
+                if self.events is not None or self.audit is not None:
+                    after = results[index].item.dict()
+                    self._publish("created", name, after)
+                    self._audit("created", name, after=after)
+
+        n_created = sum(1 for r in results if r.status == "created")
+        return schemas.RealmBulkResult(
+            created=n_created, failed=len(results) - n_created, results=results
+        )
 
     def list(
-        self, customer_type: Optional[str] = None, enabled: Optional[bool] = None
-    ) -> List[models.Realm]:
-        return self.repo.list(customer_type=customer_type, enabled=enabled)
+        self,
+        customer_type: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        name_prefix: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = pagination.DEFAULT_PAGE_SIZE,
+    ) -> Page:
+        """Return one page of realms and the cursor for the next page (or None)."""
+        params = (customer_type, enabled, name_prefix, cursor, limit)
+        if self.cache is not None:
+            page = self.cache.get_page(params)
+            if page is not None:
+                return page
+        rows = self.repo.list(
+            customer_type=customer_type,
+            enabled=enabled,
+            name_prefix=name_prefix,
+            after_id=pagination.decode_cursor(cursor),
+            limit=limit + 1,
+        )
+        page = _page(rows, limit)
+        if self.cache is not None:
+            self.cache.set_page(params, page)
+        return page
 
-    def get(self, realm_name: str) -> Optional[models.Realm]:
-        return self.repo.get(realm_name)
+    def stream(
+        self, customer_type: Optional[str] = None, enabled: Optional[bool] = None
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        return self.repo.stream(customer_type=customer_type, enabled=enabled)
 
-    def update(self, realm_name: str, data: schemas.RealmUpdate) -> models.Realm:
-        # Update Keycloak first
-        self.kc_admin.update_realm(realm_name=realm_name, payload=self._to_keycloak_payload(data))
+    def get(self, realm_name: str) -> Optional[schemas.RealmRead]:
+        if self.cache is not None:
+            cached = self.cache.get(realm_name)
+            if cached is not None:
+                return cached
         obj = self.repo.get(realm_name)
+        if obj is None:
+            return None
+        realm = schemas.RealmRead.from_orm(obj)
+        if self.cache is not None:
+            self.cache.set(realm)
+        return realm
+
+    def update(self, realm_name: str, data: schemas.RealmUpdate) -> schemas.RealmRead:
+        """Apply only the fields of ``data`` that differ from the stored realm.
+
+        A no-op update touches neither the database nor Keycloak; otherwise
+        only the changed attributes are written and queued for Keycloak.
+        Raises ``ValueError`` if the realm does not exist and
+        ``StaleDataError`` if it was modified concurrently.
+        """
+        obj = self.repo.get(realm_name, primary=True)
         if not obj:
             raise ValueError("Realm not found")
-        return self.repo.update(obj, data)
+        changes = mapping.diff(obj, data.dict(exclude_unset=True))
+        if not changes:
+            return schemas.RealmRead.from_orm(obj)
+        payload = mapping.changes_to_keycloak(changes)
+        op = self._enqueue("update", realm_name, payload) if payload else None
+        before = {attr: getattr(obj, attr) for attr in changes} if self.audit is not None else None
+        row = self.repo.update(obj, changes, outbox=op)
+        if self.cache is not None:
+            self.cache.invalidate(realm_name)
+        self._publish("updated", realm_name, {"changes": changes, "version": row.version})
+        self._audit("updated", realm_name, before, changes)
+        return schemas.RealmRead.from_orm(row)
 
     def delete(self, realm_name: str) -> None:
-        # Delete in Keycloak
-        self.kc_admin.delete_realm(realm_name=realm_name)
-        obj = self.repo.get(realm_name)
+        obj = self.repo.get(realm_name, primary=True)
+        before = schemas.RealmRead.from_orm(obj).dict() if obj and self.audit is not None else None
+        # Queued even without a row: the realm may exist in Keycloak only.
+        self.repo.delete(obj, outbox=self._enqueue("delete", realm_name))
+        if obj:
+            self._publish("deleted", realm_name)
+            self._audit("deleted", realm_name, before=before)
+        if self.cache is not None:
+            self.cache.invalidate(realm_name)
+
+
+class AsyncRealmService(_RealmServiceBase):
+    """Event-loop variant of :class:`RealmService` (asyncpg)."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: Optional[RealmCache] = None,
+        events: Optional[EventPublisher] = None,
+        templates: Optional[TemplateCache] = None,
+        audit: Optional[AuditTrail] = None,
+        actor: Optional[str] = None,
+    ):
+        super().__init__(cache, events, templates, audit, actor)
+        self.repo = repository.AsyncRealmRepository(db)
+
+    async def _prepare(self, data: schemas.RealmCreate) -> Tuple[schemas.RealmCreate, Dict[str, Any]]:
+        if self.templates is None:
+            return data, mapping.to_keycloak(data)
+        rendered = self.templates.get(data.customer_type)
+        if rendered is None:
+            rendered = self.templates.set(data.customer_type, await self.repo.get_template(data.customer_type))
+        return templates.apply(rendered, data)
+
+    async def create(self, data: schemas.RealmCreate) -> models.Realm:
+        data, payload = await self._prepare(data)
+        op = self._enqueue("create", data.realm, payload)
+        realm = await self.repo.create(data, outbox=op)
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.events is not None or self.audit is not None:
+            created = schemas.RealmRead.from_orm(realm).dict()
+            self._publish("created", realm.realm, created)
+            self._audit("created", realm.realm, after=created)
+        return realm
+
+    async def list(
+        self,
+        customer_type: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        name_prefix: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = pagination.DEFAULT_PAGE_SIZE,
+    ) -> Page:
+        params = (customer_type, enabled, name_prefix, cursor, limit)
+        if self.cache is not None:
+            page = self.cache.get_page(params)
+            if page is not None:
+                return page
+        rows = await self.repo.list(
+            customer_type=customer_type,
+            enabled=enabled,
+            name_prefix=name_prefix,
+            after_id=pagination.decode_cursor(cursor),
+            limit=limit + 1,
+        )
+        page = _page(rows, limit)
+        if self.cache is not None:
+            self.cache.set_page(params, page)
+        return page
+
+    async def get(self, realm_name: str) -> Optional[schemas.RealmRead]:
+        if self.cache is not None:
+            cached = self.cache.get(realm_name)
+            if cached is not None:
+                return cached
+        obj = await self.repo.get(realm_name)
+        if obj is None:
+            return None
+        realm = schemas.RealmRead.from_orm(obj)
+        if self.cache is not None:
+            self.cache.set(realm)
+        return realm
+
+    async def update(self, realm_name: str, data: schemas.RealmUpdate) -> schemas.RealmRead:
+        obj = await self.repo.get(realm_name, primary=True)
+        if not obj:
+            raise ValueError("Realm not found")
+        changes = mapping.diff(obj, data.dict(exclude_unset=True))
+        if not changes:
+            return schemas.RealmRead.from_orm(obj)
+        payload = mapping.changes_to_keycloak(changes)
+        op = self._enqueue("update", realm_name, payload) if payload else None
+        before = {attr: getattr(obj, attr) for attr in changes} if self.audit is not None else None
+        row = await self.repo.update(obj, changes, outbox=op)
+        if self.cache is not None:
+            self.cache.invalidate(realm_name)
+        self._publish("updated", realm_name, {"changes": changes, "version": row.version})
+        self._audit("updated", realm_name, before, changes)
+        return schemas.RealmRead.from_orm(row)
+
+    async def delete(self, realm_name: str) -> None:
+        obj = await self.repo.get(realm_name, primary=True)
+        before = schemas.RealmRead.from_orm(obj).dict() if obj and self.audit is not None else None
+        # Queued even without a row: the realm may exist in Keycloak only.
+        await self.repo.delete(obj, outbox=self._enqueue("delete", realm_name))
         if obj:
-            self.repo.delete(obj) 
\ No newline at end of file
+            self._publish("deleted", realm_name)
+            self._audit("deleted", realm_name, before=before)
+        if self.cache is not None:
+            self.cache.invalidate(realm_name)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ....cache import CacheStats, TTLCache
+from ....events import EventPublisher, envelope
+from ...identity_access_secrets.audit_compliance_trails.trail import AuditTrail
+from . import mapping, models, outbox, repository, schemas
+from .cache import RealmCache
+
+logger = logging.getLogger(__name__)
+
+
+class RenderedTemplate(NamedTuple):
+    customer_type: str
+    version: int
+    settings: Dict[str, Any]  # realm attributes
+    payload: Dict[str, Any]  # Keycloak representation of ``settings``
+
+
+# Stands in for tiers without a template: merging it changes nothing.
+NO_TEMPLATE = RenderedTemplate("", 0, {}, {})
+
+
+def render(template: Optional[models.RealmTemplate]) -> RenderedTemplate:
+    if template is None:
+        return NO_TEMPLATE
+    settings = dict(template.settings)
+    return RenderedTemplate(
+        template.customer_type, template.version, settings, mapping.changes_to_keycloak(settings)
+    )
+
+
+def apply(template: RenderedTemplate, data: schemas.RealmCreate) -> Tuple[schemas.RealmCreate, Dict[str, Any]]:
+    """``data`` with its unset attributes taken from ``template``, and its Keycloak payload.
+
+    Only the request's own attributes are mapped; the rest of the payload was
+    rendered when the template was loaded. Both were validated already, so
+    the merged model is built without validating again.
+    """
+    overrides = data.dict(exclude_unset=True)
+    values = {**template.settings, **overrides}
+    payload = {**template.payload, **mapping.changes_to_keycloak(overrides)}
+    payload = {key: value for key, value in payload.items() if value is not None}
+    payload.setdefault("enabled", True)
+    return schemas.RealmCreate.construct(set(values), **values), payload
+
+
+class TemplateCache:
+    """Rendered templates by customer tier, including tiers that have none.
+
+    Saving a template invalidates it in this process; other replicas pick up
+    the change within ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.stats = CacheStats()
+        self.local = TTLCache(maxsize=1000, ttl=ttl, stats=self.stats)
+
+    @classmethod
+    def from_env(cls) -> "TemplateCache":
+        return cls(ttl=float(os.getenv("REALM_TEMPLATE_CACHE_TTL", "60")))
+
+    def get(self, customer_type: str) -> Optional[RenderedTemplate]:
+        """The cached template (``NO_TEMPLATE`` if the tier has none), or ``None`` on a miss."""
+        rendered = self.local.get(customer_type)
+        if rendered is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return rendered
+
+    def set(self, customer_type: str, template: Optional[models.RealmTemplate]) -> RenderedTemplate:
+        rendered = render(template)
+        self.local.set(customer_type, rendered)
+        return rendered
+
+    def invalidate(self, customer_type: str) -> None:
+        self.stats.invalidations += 1
+        self.local.delete(customer_type)
+
+
+# Rollout ----------------------------------------------------------------
+
+class TemplateRollout:
+    """Applies a template change to the existing realms of its tier, in batches.
+
+    A realm takes a changed setting only while it still has the previous
+    template value (or no value at all); anything else was set per tenant
+    and is left alone. Each batch is one transaction: version-guarded
+    UPDATEs plus an outbox row per changed realm. Realms modified
+    concurrently are reported as conflicts and skipped.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 200,
+        cache: Optional[RealmCache] = None,
+        events: Optional[EventPublisher] = None,
+        on_enqueue: Optional[Callable[[], None]] = None,
+        audit: Optional[AuditTrail] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.cache = cache
+        self.events = events
+        self.on_enqueue = on_enqueue
+        self.audit = audit
+
+    def run(
+        self, template: RenderedTemplate, previous: Dict[str, Any]
+    ) -> schemas.RealmTemplateRolloutReport:
+        started = time.perf_counter()
+        report = schemas.RealmTemplateRolloutReport(
+            customer_type=template.customer_type, template_version=template.version
+        )
+        changed = {
+            attr: value for attr, value in template.settings.items() if previous.get(attr) != value
+        }
+        after_id = None
+        while changed:
+            with self.session_factory() as db:
+                rows = repository.RealmRepository(db).tier_rows(
+                    template.customer_type, list(changed), after_id, self.batch_size
+                )
+                if not rows:
+                    break
+                self._apply_batch(db, rows, changed, previous, report)
+                after_id = rows[-1].id
+        report.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        logger.info("Template rollout finished", extra={"report": report.dict()})
+        return report
+
+    def _apply_batch(
+        self,
+        db: Session,
+        rows: List[Any],
+        changed: Dict[str, Any],
+        previous: Dict[str, Any],
+        report: schemas.RealmTemplateRolloutReport,
+    ) -> None:
+        repo = repository.RealmRepository(db)
+        updated: List[Tuple[Any, Dict[str, Any], Dict[str, Any]]] = []
+        for row in rows:
+            report.checked += 1
+            outdated = {attr: value for attr, value in changed.items() if getattr(row, attr) != value}
+            if not outdated:
+                continue
+            changes = {
+                attr: value
+                for attr, value in outdated.items()
+                if getattr(row, attr) in (None, previous.get(attr))
+            }
+            if not changes:
+                report.overridden += 1
+                continue
+            new_row = repo.update_unless_stale(row, changes)
+            if new_row is None:
+                report.conflicts.append(row.realm)
+                continue
+            payload = mapping.changes_to_keycloak(changes)
+            if payload:
+                db.add(outbox.new_operation("update", row.realm, payload))
+            updated.append((new_row, {attr: getattr(row, attr) for attr in changes}, changes))
+        db.commit()
+
+        report.updated += len(updated)
+        if updated and self.on_enqueue is not None:
+            self.on_enqueue()
+        for new_row, before, changes in updated:
+            if self.cache is not None:
+                self.cache.invalidate(new_row.realm)
+            if self.events is not None:
+                self.events.publish(new_row.realm, envelope(
+                    "realm.updated", new_row.realm, {"changes": changes, "version": new_row.version}
+                ))
+            if self.audit is not None:
+                self.audit.record(new_row.realm, "updated", before, changes, actor=f"template:{report.customer_type}")
@@ -0,0 +1 @@
+"""Local stand-ins for external services and profiling helpers, used by tests and benchmarks."""
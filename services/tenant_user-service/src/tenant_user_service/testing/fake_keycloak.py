@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Mapping, Optional, Sequence
+
+_TOKEN_PATH = re.compile(r"^/realms/[^/]+/protocol/openid-connect/token$")
+_CERTS_PATH = re.compile(r"^/realms/[^/]+/protocol/openid-connect/certs$")
+_SIGNING_KID = "fake-signing-key"
+_REALMS_PATH = re.compile(r"^/admin/realms/?$")
+_REALM_PATH = re.compile(r"^/admin/realms/(?P<realm>[^/]+)$")
+_PARTIAL_IMPORT_PATH = re.compile(r"^/admin/realms/(?P<realm>[^/]+)/partialImport$")
+_COMPONENTS_PATH = re.compile(r"^/admin/realms/(?P<realm>[^/]+)/components(?:/(?P<id>[^/]+))?$")
+_CLIENTS_PATH = re.compile(r"^/admin/realms/(?P<realm>[^/]+)/clients$")
+_CLIENT_SECRET_PATH = re.compile(
+    r"^/admin/realms/(?P<realm>[^/]+)/clients/(?P<id>[^/]+)/client-secret(?P<rotated>/rotated)?$"
+)
+
+
+class FakeKeycloak:
+    """In-process Keycloak admin API covering the realm endpoints we use.
+
+    Every request sleeps ``latency`` seconds before answering, so callers see
+    realistic round-trip times without a real Keycloak. Realms are kept in
+    memory in ``realms``, users imported through ``partialImport`` in
+    ``users`` (realm -> username -> user), key providers in ``components``
+    (realm -> id -> component) and clients in ``clients`` (realm -> list).
+    Regenerating a client secret keeps the previous one as
+    ``rotatedSecret``, like Keycloak's secret rotation policy. Use as a
+    context manager or call ``start``/``stop``.
+
+    ``issue_token`` signs access tokens that verify against the realm's
+    ``/protocol/openid-connect/certs`` endpoint.
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.realms: Dict[str, dict] = {"master": {"realm": "master", "enabled": True}}
+        self.users: Dict[str, Dict[str, dict]] = {}
+        self.components: Dict[str, Dict[str, dict]] = {}
+        self.clients: Dict[str, List[dict]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._signing_key: Optional[str] = None
+        self._jwk: Optional[dict] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FakeKeycloak":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeKeycloak":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def issuer(self, realm: str = "master") -> str:
+        return f"{self.url}realms/{realm}"
+
+    def issue_token(
+        self,
+        subject: str,
+        roles: Sequence[str] = (),
+        realm: str = "master",
+        lifetime: int = 300,
+        client_roles: Optional[Mapping[str, Sequence[str]]] = None,
+        **claims,
+    ) -> str:
+        """A signed access token shaped like Keycloak's, with ``claims`` added.
+
+        ``roles`` are realm roles; ``client_roles`` maps clientIds to their roles.
+        """
+        from jose import jwt
+
+        now = int(time.time())
+        body = {
+            "iss": self.issuer(realm),
+            "sub": subject,
+            "iat": now,
+            "exp": now + lifetime,
+            "realm_access": {"roles": list(roles)},
+            "resource_access": {client: {"roles": list(names)} for client, names in (client_roles or {}).items()},
+            **claims,
+        }
+        return jwt.encode(body, self._key()[0], algorithm="RS256", headers={"kid": _SIGNING_KID})
+
+    def _key(self):
+        with self._lock:
+            if self._signing_key is None:
+                import rsa
+                from jose import jwk
+
+                # Small and generated once per instance: these tokens only
+                # need to verify, not to be secure.
+                _, private = rsa.newkeys(1024)
+                self._signing_key = private.save_pkcs1().decode()
+                public = jwk.construct(self._signing_key, "RS256").public_key().to_dict()
+                self._jwk = {**public, "kid": _SIGNING_KID, "use": "sig"}
+            return self._signing_key, self._jwk
+
+    # Request handling ------------------------------------------------------
+
+    def _handle(self, method: str, path: str, body: Optional[dict]):
+        """Return ``(status, json_body)`` for one admin API call."""
+        with self._lock:
+            self.requests += 1
+            if method == "POST" and _TOKEN_PATH.match(path):
+                return 200, {
+                    "access_token": "fake-access-token",
+                    "refresh_token": "fake-refresh-token",
+                    "expires_in": 300,
+                    "refresh_expires_in": 1800,
+                    "token_type": "Bearer",
+                }
+            if method == "GET" and _CERTS_PATH.match(path):
+                return 200, {"keys": [self._jwk] if self._jwk else []}
+            if _REALMS_PATH.match(path):
+                if method == "GET":
+                    return 200, list(self.realms.values())
+                if method == "POST":
+                    name = body["realm"]
+                    if name in self.realms:
+                        return 409, {"errorMessage": "Conflict detected. See logs for details"}
+                    self.realms[name] = dict(body)
+                    return 201, None
+            match = _PARTIAL_IMPORT_PATH.match(path)
+            if match and method == "POST":
+                return self._partial_import(match["realm"], body or {})
+            match = _COMPONENTS_PATH.match(path)
+            if match:
+                return self._component(method, match["realm"], match["id"], body)
+            match = _CLIENTS_PATH.match(path)
+            if match and method == "GET":
+                return 200, self.clients.get(match["realm"], [])
+            match = _CLIENT_SECRET_PATH.match(path)
+            if match:
+                return self._client_secret(method, match["realm"], match["id"], bool(match["rotated"]))
+            match = _REALM_PATH.match(path)
+            if match:
+                name = match["realm"]
+                if name not in self.realms:
+                    return 404, {"error": "Realm not found."}
+                if method == "GET":
+                    return 200, self.realms[name]
+                if method == "PUT":
+                    self.realms[name].update(body or {})
+                    return 204, None
+                if method == "DELETE":
+                    del self.realms[name]
+                    return 204, None
+            return 404, {"error": "Not found"}
+
+    def _partial_import(self, realm: str, body: dict):
+        if realm not in self.realms:
+            return 404, {"error": "Realm not found."}
+        if body.get("ifResourceExists") != "SKIP":
+            return 400, {"errorMessage": "Only ifResourceExists=SKIP is supported"}
+        users = self.users.setdefault(realm, {})
+        emails = {user.get("email"): name for name, user in users.items() if user.get("email")}
+        added, results = {}, []
+        for user in body.get("users", []):
+            name = user.get("username")
+            if not name:
+                return 400, {"errorMessage": "User without username"}
+            if name in users or name in added:
+                results.append({"action": "SKIPPED", "resourceType": "USER", "resourceName": name})
+                continue
+            email = user.get("email")
+            if email and emails.get(email, name) != name:
+                # Keycloak rejects the whole import, like its single transaction.
+                return 409, {"errorMessage": "User exists with same email"}
+            if email:
+                emails[email] = name
+            added[name] = dict(user)
+            results.append({"action": "ADDED", "resourceType": "USER", "resourceName": name})
+        users.update(added)
+        return 200, {
+            "added": len(added),
+            "skipped": len(results) - len(added),
+            "overwritten": 0,
+            "results": results,
+        }
+
+    def _component(self, method: str, realm: str, component_id: Optional[str], body: Optional[dict]):
+        if realm not in self.realms:
+            return 404, {"error": "Realm not found."}
+        components = self.components.setdefault(realm, {})
+        if component_id is None:
+            if method == "GET":
+                return 200, list(components.values())
+            if method == "POST":
+                created = {**(body or {}), "id": str(uuid.uuid4())}
+                components[created["id"]] = created
+                return 201, None
+        elif method == "DELETE":
+            if components.pop(component_id, None) is None:
+                return 404, {"error": "Could not find component"}
+            return 204, None
+        return 404, {"error": "Not found"}
+
+    def _client_secret(self, method: str, realm: str, client_id: str, rotated: bool):
+        client = next((c for c in self.clients.get(realm, []) if c.get("id") == client_id), None)
+        if client is None:
+            return 404, {"error": "Could not find client"}
+        if rotated and method == "DELETE":
+            client.pop("rotatedSecret", None)
+            return 204, None
+        if not rotated and method == "POST":
+            if client.get("secret"):
+                client["rotatedSecret"] = client["secret"]
+            client["secret"] = uuid.uuid4().hex
+            return 200, {"type": "secret", "value": client["secret"]}
+        return 404, {"error": "Not found"}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = None
+                if raw and self.headers.get("Content-Type", "").startswith("application/json"):
+                    body = json.loads(raw)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status, payload = fake._handle(self.command, self.path.split("?")[0], body)
+                data = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+_KV_PATH = re.compile(r"^/v1/secret/data/(?P<path>.+)$")
+_CREDS_PATH = re.compile(r"^/v1/database/creds/(?P<role>[^/]+)$")
+_RENEW_PATH = "/v1/sys/leases/renew"
+
+
+class FakeVault:
+    """In-process Vault covering KV v2 reads, database credentials and lease renewal.
+
+    KV secrets live in ``kv`` (path -> versions) and are written with
+    ``put``. Reading ``database/creds/<role>`` issues a fresh credential on
+    a lease of ``lease_duration`` seconds that renewals can extend up to
+    ``max_ttl`` seconds after issue. Requests need the ``X-Vault-Token``
+    header to equal ``token``. ``reads`` counts reads per path.
+    """
+
+    def __init__(
+        self,
+        token: str = "root",
+        lease_duration: float = 60,
+        max_ttl: float = 300,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.token = token
+        self.lease_duration = lease_duration
+        self.max_ttl = max_ttl
+        self.latency = latency
+        self.kv: Dict[str, List[Dict[str, Any]]] = {}
+        self.leases: Dict[str, Dict[str, Any]] = {}
+        self.reads: Dict[str, int] = {}
+        self.renewals = 0
+        self._issued = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeVault":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeVault":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def put(self, path: str, data: Dict[str, Any]) -> int:
+        """Store a new version of the KV secret at ``secret/data/<path>``."""
+        with self._lock:
+            versions = self.kv.setdefault(path, [])
+            versions.append(dict(data))
+            return len(versions)
+
+    # Request handling ------------------------------------------------------
+
+    def _handle(self, method: str, path: str, token: Optional[str], body: Optional[dict]):
+        """Return ``(status, json_body)`` for one API call."""
+        if token != self.token:
+            return 403, {"errors": ["permission denied"]}
+        with self._lock:
+            now = time.monotonic()
+            name = path[len("/v1/"):]
+            match = _KV_PATH.match(path)
+            if method == "GET" and match:
+                self.reads[name] = self.reads.get(name, 0) + 1
+                versions = self.kv.get(match["path"])
+                if not versions:
+                    return 404, {"errors": []}
+                return 200, {
+                    "lease_id": "",
+                    "renewable": False,
+                    "lease_duration": 0,
+                    "data": {"data": versions[-1], "metadata": {"version": len(versions)}},
+                }
+            match = _CREDS_PATH.match(path)
+            if method == "GET" and match:
+                self.reads[name] = self.reads.get(name, 0) + 1
+                self._issued += 1
+                lease_id = f"database/creds/{match['role']}/{secrets.token_hex(8)}"
+                self.leases[lease_id] = {
+                    "expires_at": now + self.lease_duration,
+                    "max_expires_at": now + self.max_ttl,
+                }
+                return 200, {
+                    "lease_id": lease_id,
+                    "renewable": True,
+                    "lease_duration": self.lease_duration,
+                    "data": {"username": f"v-{match['role']}-{self._issued}", "password": secrets.token_urlsafe(16)},
+                }
+            if method in ("PUT", "POST") and path == _RENEW_PATH:
+                lease = self.leases.get((body or {}).get("lease_id"))
+                if lease is None or lease["expires_at"] <= now:
+                    return 400, {"errors": ["lease not found or lease is not renewable"]}
+                self.renewals += 1
+                increment = (body or {}).get("increment") or self.lease_duration
+                lease["expires_at"] = min(now + increment, lease["max_expires_at"])
+                return 200, {
+                    "lease_id": body["lease_id"],
+                    "renewable": True,
+                    "lease_duration": max(lease["expires_at"] - now, 0),
+                }
+            return 404, {"errors": []}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else None
+                if fake.latency:
+                    time.sleep(fake.latency)
+                path = self.path.split("?")[0]
+                status, payload = fake._handle(self.command, path, self.headers.get("X-Vault-Token"), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = _dispatch
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+# Heavy client libraries the app must only import on first use.
+DEFERRED_MODULES = ("keycloak", "jose", "httpx", "requests", "psycopg2", "asyncpg", "hvac", "yaml", "redis")
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_ms: float
+    cumulative_ms: float
+
+
+def _importtime(code: str, env: Optional[Dict[str, str]]) -> List[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True, env={**os.environ, **(env or {})},
+    )
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append(ImportRecord(name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return records
+
+
+def profile_imports(module: str, env: Optional[Dict[str, str]] = None) -> List[ImportRecord]:
+    """Modules imported by ``import module`` in a fresh interpreter.
+
+    Runs ``python -X importtime``; modules the bare interpreter imports at
+    startup are left out.
+    """
+    startup = {record.module for record in _importtime("pass", env)}
+    return [record for record in _importtime(f"import {module}", env) if record.module not in startup]
+
+
+def total_ms(records: List[ImportRecord]) -> float:
+    return sum(record.self_ms for record in records)
+
+
+def deferred_imports(records: List[ImportRecord]) -> List[str]:
+    """Modules from ``DEFERRED_MODULES`` that were imported anyway."""
+    imported = {record.module.split(".")[0] for record in records}
+    return [name for name in DEFERRED_MODULES if name in imported]
+
+
+def report(records: List[ImportRecord], top: int = 15) -> str:
+    """Total import time and the ``top`` most expensive top-level packages."""
+    packages: Dict[str, float] = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + record.self_ms
+    lines = [f"total {total_ms(records):8.1f} ms  ({len(records)} modules)"]
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"      {ms:8.1f} ms  {package}")
+    return "\n".join(lines)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List
+
+# Keycloak UserRepresentation fields we accept as-is; any other field is
+# stored as a user attribute.
+USER_FIELDS = ("username", "email", "firstName", "lastName", "enabled", "emailVerified")
+_BOOLEAN_FIELDS = ("enabled", "emailVerified")
+# Never imported, even when a directory export contains them.
+_DROPPED_FIELDS = frozenset({"id", "password", "userpassword", "credentials", "objectclass"})
+
+_USERNAME = re.compile(r"^[^\s\x00-\x1f]{1,255}$")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_TRUE = {"true", "1", "yes", "y", "on"}
+_FALSE = {"false", "0", "no", "n", "off"}
+
+
+class UserValidationError(ValueError):
+    """A user record cannot be imported as given."""
+
+
+def _boolean(field: str, value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise UserValidationError(f"{field}: expected a boolean, got {value!r}")
+
+
+def _attribute_values(field: str, value: Any) -> List[str]:
+    values = value if isinstance(value, list) else [value]
+    if any(isinstance(v, (dict, list)) for v in values):
+        raise UserValidationError(f"{field}: attributes must be strings or lists of strings")
+    return [str(v) for v in values if v is not None and v != ""]
+
+
+def to_representation(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate one directory record and build the Keycloak ``UserRepresentation``.
+
+    Usernames and emails are lower-cased the way Keycloak stores them, so
+    they can be compared for duplicates as returned.
+    """
+    username = str(fields.get("username") or "").strip().lower()
+    if not username:
+        raise UserValidationError("username is required")
+    if not _USERNAME.match(username):
+        raise UserValidationError(f"username {username!r} has whitespace or control characters")
+    user: Dict[str, Any] = {"username": username, "enabled": True}
+
+    email = str(fields.get("email") or "").strip().lower()
+    if email:
+        if not _EMAIL.match(email):
+            raise UserValidationError(f"email {email!r} is not a valid address")
+        user["email"] = email
+    for field in ("firstName", "lastName"):
+        value = fields.get(field)
+        if value not in (None, ""):
+            user[field] = str(value).strip()
+    for field in _BOOLEAN_FIELDS:
+        if fields.get(field) not in (None, ""):
+            user[field] = _boolean(field, fields[field])
+
+    attributes: Dict[str, List[str]] = {}
+    for field, value in fields.items():
+        if field in USER_FIELDS or field.lower() in _DROPPED_FIELDS:
+            continue
+        if field == "attributes" and isinstance(value, dict):
+            for name, nested in value.items():
+                attributes[name] = _attribute_values(name, nested)
+            continue
+        values = _attribute_values(field, value)
+        if values:
+            attributes[field] = values
+    if attributes:
+        user["attributes"] = attributes
+    return user
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from . import dependencies
+
+logger = logging.getLogger(__name__)
+
+
+# Hooks ----------------------------------------------------------------
+# Everything here is otherwise done lazily by the first request that needs
+# it; warming up moves that cost before the pod reports ready.
+
+def _imports() -> None:
+    import keycloak  # noqa: F401
+
+
+def _database() -> None:
+    with dependencies.SessionLocal() as db:
+        db.execute(text("SELECT 1"))
+
+
+def _keycloak() -> None:
+    dependencies.get_keycloak_manager().admin  # logs in
+
+
+WARMUP_HOOKS: Dict[str, Callable[[], None]] = {
+    "imports": _imports,
+    "database": _database,
+    "keycloak": _keycloak,
+}
+
+
+class Readiness:
+    """Runs the STARTUP_WARMUP hooks in the background and tracks readiness.
+
+    The service reports ready once every hook has run (failures are logged,
+    the work is then simply done on first use) or, at the latest, after
+    ``budget`` seconds so a slow dependency cannot hold a pod back forever.
+    """
+
+    def __init__(self, hooks: List[str], budget: float):
+        unknown = [name for name in hooks if name not in WARMUP_HOOKS]
+        if unknown:
+            raise ValueError(f"Unknown STARTUP_WARMUP hooks: {', '.join(unknown)}")
+        self.hooks = hooks
+        self.budget = budget
+        self.timings: Dict[str, float] = {}
+        self._done = threading.Event()
+        self._started: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "Readiness":
+        hooks = [name.strip() for name in os.getenv("STARTUP_WARMUP", "").split(",") if name.strip()]
+        return cls(hooks, budget=float(os.getenv("READINESS_BUDGET", "10")))
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        if not self.hooks:
+            self._done.set()
+            return
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+
+    def is_ready(self) -> bool:
+        if self._done.is_set():
+            return True
+        return self._started is not None and time.monotonic() - self._started >= self.budget
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        for name in self.hooks:
+            started = time.monotonic()
+            try:
+                WARMUP_HOOKS[name]()
+            except Exception:
+                logger.warning("Warm-up hook %s failed", name, exc_info=True)
+            self.timings[name] = round(time.monotonic() - started, 4)
+        self._done.set()
+        logger.info("Warm-up finished", extra={"timings": self.timings})
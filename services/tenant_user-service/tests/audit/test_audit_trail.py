@@ -0,0 +1,166 @@
+import json
+import threading
+
+import pytest
+from sqlalchemy import select, update
+
+from tenant_user_service.dependencies import get_audit_trail
+from tenant_user_service.tenant_management.identity_access_secrets.audit_compliance_trails import queries
+from tenant_user_service.tenant_management.identity_access_secrets.audit_compliance_trails.models import (
+    AuditRecord,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.audit_compliance_trails.trail import (
+    AuditTrail, RingBuffer,
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import schemas, service
+
+
+def test_ring_buffer_wraps_and_refuses_when_full():
+    buffer = RingBuffer(3)
+    assert all(buffer.put(i) for i in range(3))
+    assert not buffer.put(3)
+    assert buffer.take(2) == [0, 1]
+    assert buffer.put(3) and buffer.put(4)
+    assert buffer.take(10) == [2, 3, 4]
+    assert len(buffer) == 0
+
+
+def test_service_mutations_are_recorded_and_chained(sqlite_session):
+    trail = AuditTrail(lambda: sqlite_session)
+    svc = service.RealmService(sqlite_session, audit=trail, actor="alice")
+
+    svc.create(schemas.RealmCreate(realm="acme", customer_type="Large", display_name="Acme"))
+    svc.update("acme", schemas.RealmUpdate(display_name="Acme Corp", enabled=True))  # enabled unchanged
+    svc.delete("acme")
+    assert trail.pending() == 3
+    trail.flush()
+
+    records = sqlite_session.scalars(select(AuditRecord).order_by(AuditRecord.seq)).all()
+    assert [(r.seq, r.action, r.actor) for r in records] == [(1, "created", "alice"), (2, "updated", "alice"), (3, "deleted", "alice")]
+    assert records[0].before is None and records[0].after["display_name"] == "Acme"
+    assert (records[1].before, records[1].after) == ({"display_name": "Acme"}, {"display_name": "Acme Corp"})
+    assert records[2].before["display_name"] == "Acme Corp" and records[2].after is None
+    assert records[1].prev_hash == records[0].hash
+    assert queries.verify(sqlite_session).dict() == {
+        "after_seq": 0, "checked": 3, "last_seq": 3, "valid": True, "broken_at": None, "detail": None,
+    }
+
+
+def _chain(sqlite_session, n):
+    trail = AuditTrail(lambda: sqlite_session, batch_size=2)
+    for i in range(n):
+        trail.record(f"r{i}", "created", after={"i": i})
+    trail.flush()
+
+
+def test_verify_detects_edits_and_gaps(sqlite_session):
+    _chain(sqlite_session, 5)
+    sqlite_session.execute(update(AuditRecord).where(AuditRecord.seq == 3).values(after={"i": 99}))
+    report = queries.verify(sqlite_session, after_seq=1)
+    assert (report.valid, report.checked, report.broken_at) == (False, 1, 3)
+
+    sqlite_session.query(AuditRecord).filter(AuditRecord.seq == 3).delete()
+    report = queries.verify(sqlite_session)
+    assert (report.broken_at, report.detail) == (3, "records 3..3 missing")
+
+
+def test_background_flush_and_shutdown_write_everything(sqlite_session):
+    trail = AuditTrail(lambda: sqlite_session, capacity=8, batch_size=4, interval=0.01)
+    trail.start()
+    for i in range(50):  # more than the buffer holds: record waits for the flusher
+        trail.record("acme", "updated", {"i": i}, {"i": i + 1})
+    trail.stop()
+
+    assert sqlite_session.query(AuditRecord).count() == 50
+    assert queries.verify(sqlite_session).valid
+
+
+def test_unwritable_records_are_spilled_and_replayed(sqlite_session, tmp_path):
+    spill = tmp_path / "audit-spill.jsonl"
+
+    def broken():
+        raise RuntimeError("database down")
+
+    failing = AuditTrail(broken, retries=0, spill_path=str(spill))
+    failing.record("acme", "created", after={"realm": "acme"}, actor="alice")
+    failing.record("acme", "deleted", before={"realm": "acme"})
+    failing.flush()
+    assert [json.loads(line)["action"] for line in spill.read_text().splitlines()] == ["created", "deleted"]
+
+    trail = AuditTrail(lambda: sqlite_session, spill_path=str(spill))
+    trail.start()
+    trail.stop()
+
+    assert not spill.exists()
+    assert [r.actor for r in sqlite_session.scalars(select(AuditRecord).order_by(AuditRecord.seq))] == ["alice", None]
+    assert queries.verify(sqlite_session).valid
+
+
+def _database_down():
+    raise RuntimeError("database down")
+
+
+def test_flusher_survives_an_unwritable_spill_file(tmp_path):
+    unwritable = tmp_path / "missing" / "audit-spill.jsonl"
+    trail = AuditTrail(_database_down, capacity=2, batch_size=1, interval=0.01, retries=0, spill_path=str(unwritable))
+    trail.start()
+    recorder = threading.Thread(target=lambda: [trail.record("acme", "updated") for _ in range(10)], daemon=True)
+    recorder.start()
+    recorder.join(5)
+
+    assert not recorder.is_alive()  # record() did not wait on a dead flusher
+    assert trail.flush()
+    assert trail._thread.is_alive()
+    trail.stop()
+
+
+def test_replay_skips_corrupt_lines_and_keeps_what_was_not_written(sqlite_session, tmp_path):
+    spill = tmp_path / "audit-spill.jsonl"
+    failing = AuditTrail(_database_down, retries=0, spill_path=str(spill))
+    for actor in ("alice", "bob"):
+        failing.record("acme", "updated", actor=actor)
+    failing.flush()
+    with spill.open("a") as f:
+        f.write('{"realm": "acme", "act')  # an append cut short by a crash
+
+    sessions = iter([sqlite_session])
+    flaky = AuditTrail(lambda: next(sessions), batch_size=1, spill_path=str(spill))
+    flaky.start()
+    flaky.stop()
+    assert [json.loads(line)["actor"] for line in spill.read_text().splitlines()] == ["bob"]
+
+    trail = AuditTrail(lambda: sqlite_session, spill_path=str(spill))
+    trail.start()
+    trail.stop()
+    assert not spill.exists()
+    assert [r.actor for r in sqlite_session.scalars(select(AuditRecord).order_by(AuditRecord.seq))] == ["alice", "bob"]
+
+
+@pytest.fixture()
+def client(sqlite_session, api_client):
+    trail = AuditTrail(lambda: sqlite_session)
+    return api_client({get_audit_trail: lambda: trail}), trail
+
+
+def test_audit_api_pages_newest_first(client):
+    client, trail = client
+    client.post("/realms/", json={"realm": "acme", "customer_type": "Large"})
+    client.post("/realms/", json={"realm": "beta", "customer_type": "Large"})
+    for theme in ("a", "b"):
+        client.patch("/realms/acme", json={"login_theme": theme})
+    trail.flush()
+
+    first = client.get("/realms/acme/audit", params={"limit": 2})
+    assert [(r["seq"], r["action"]) for r in first.json()] == [(4, "updated"), (3, "updated")]
+    rest = client.get("/realms/acme/audit", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert [r["seq"] for r in rest.json()] == [1]
+    assert "X-Next-Cursor" not in rest.headers
+
+    assert [r["realm"] for r in client.get("/realms/:audit", params={"action": "created"}).json()] == ["beta", "acme"]
+    assert client.get("/realms/:audit", params={"cursor": "bogus"}).status_code == 400
+    trail.record("acme", "credentials_rotated", actor="key-rotation")
+    trail.flush()
+    rotated = client.get("/realms/acme/audit", params={"action": "credentials_rotated"}).json()
+    assert [(r["action"], r["actor"]) for r in rotated] == [("credentials_rotated", "key-rotation")]
+    assert client.get("/realms/:audit", params={"action": "renamed"}).status_code == 422
+    assert client.get("/realms/:audit/verify").json()["last_seq"] == 5
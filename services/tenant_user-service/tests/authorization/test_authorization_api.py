@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+
+from tenant_user_service.dependencies import get_authorizer
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.engine import (
+    AuthorizationEngine,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.policies import (
+    DEFAULT_POLICY, CompiledPolicy,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.tokens import (
+    JWKSCache, TokenVerifier, jwks_url,
+)
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+
+@pytest.fixture(scope="module")
+def keycloak():
+    with FakeKeycloak() as keycloak:
+        yield keycloak
+
+
+@pytest.fixture()
+def client(api_client, keycloak):
+    issuer = keycloak.issuer()
+    engine = AuthorizationEngine(
+        TokenVerifier({issuer: JWKSCache(jwks_url(issuer))}),
+        CompiledPolicy.from_document(DEFAULT_POLICY),
+    )
+    return api_client({get_authorizer: lambda: engine})
+
+
+def bearer(keycloak, *roles, tenant=None, client_roles=None):
+    token = keycloak.issue_token("alice", roles=roles, tenant=tenant, client_roles=client_roles)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_realm_routes_require_a_valid_token(client):
+    response = client.get("/realms/")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    assert client.get("/realms/", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_realm_routes_enforce_the_policy(client, keycloak):
+    admin = bearer(keycloak, client_roles={"realm-management": ["realm-admin"], "account": ["view-profile"]})
+    tenant_admin = bearer(keycloak, "tenant-admin", tenant="acme")
+
+    for name in ("acme", "other"):
+        assert client.post("/realms/", json={"realm": name, "customer_type": "Large"}, headers=admin).status_code == 201
+
+    assert client.get("/realms/acme", headers=tenant_admin).status_code == 200
+    assert client.patch("/realms/acme", json={"display_name": "Acme"}, headers=tenant_admin).status_code == 200
+    assert client.get("/realms/other", headers=tenant_admin).status_code == 403
+    assert client.delete("/realms/acme", headers=tenant_admin).status_code == 403
+    assert client.get("/realms/", headers=tenant_admin).status_code == 403
+    assert client.put("/realm-templates/Large", json={"settings": {}}, headers=tenant_admin).status_code == 403
+
+
+def test_authorization_is_on_unless_explicitly_disabled(monkeypatch, caplog):
+    monkeypatch.delenv("AUTHZ_ENABLED", raising=False)
+    assert AuthorizationEngine.from_env() is not None
+
+    monkeypatch.setenv("AUTHZ_ENABLED", "false")
+    with caplog.at_level(logging.WARNING):
+        assert AuthorizationEngine.from_env() is None
+    assert "unauthenticated requests" in caplog.text
@@ -0,0 +1,75 @@
+import pytest
+
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.engine import (
+    AuthorizationEngine,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.policies import (
+    DEFAULT_POLICY, CompiledPolicy, PolicyError,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.tokens import (
+    Principal,
+)
+
+
+def principal(*roles, tenant="acme", **attributes):
+    return Principal("alice", tenant, frozenset(roles), tuple(sorted(attributes.items())))
+
+
+@pytest.mark.parametrize(
+    "roles, action, realm, allowed",
+    [
+        (["admin"], "realm:delete", "other", True),
+        (["realm-management:realm-admin"], "realm:list", None, True),
+        (["realm-admin"], "realm:list", None, False),  # only a client role in Keycloak
+        (["tenant-admin"], "realm:update", "acme", True),
+        (["tenant-admin"], "realm:update", "other", False),
+        (["tenant-admin"], "realm:delete", "acme", False),
+        (["tenant-admin"], "realm:list", None, False),
+        (["tenant-viewer", "offline_access"], "realm:read", "acme", True),
+        (["tenant-viewer"], "realm:update", "acme", False),
+        ([], "realm:read", "acme", False),
+    ],
+)
+def test_default_policy(roles, action, realm, allowed):
+    policy = CompiledPolicy.from_document(DEFAULT_POLICY)
+    assert policy.evaluate(principal(*roles), action, realm).allowed is allowed
+
+
+def test_deny_wins_and_conditions_and_prefixes():
+    policy = CompiledPolicy([
+        {"id": "support", "roles": ["support"], "actions": ["realm:read"], "realms": ["trial-*"]},
+        {"id": "large", "roles": ["*"], "actions": ["realm:read"], "realms": ["own"],
+         "when": {"customer_type": ["Large", "Enterprise"]}},
+        {"id": "frozen", "effect": "deny", "roles": ["*"], "actions": ["*"], "realms": ["trial-frozen"]},
+    ])
+
+    assert policy.evaluate(principal("support"), "realm:read", "trial-1").rule == "support"
+    assert not policy.evaluate(principal("support"), "realm:read", "acme").allowed
+    assert policy.evaluate(principal(customer_type="Large"), "realm:read", "acme").rule == "large"
+    assert not policy.evaluate(principal(customer_type="Small"), "realm:read", "acme").allowed
+    assert policy.evaluate(principal("support"), "realm:read", "trial-frozen") == (False, "frozen")
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        {"roles": ["a"], "actions": ["realm:fly"]},
+        {"roles": [], "actions": ["realm:read"]},
+        {"roles": ["a"], "actions": ["realm:read"], "effect": "maybe"},
+    ],
+)
+def test_invalid_rules_are_rejected_at_compile_time(rule):
+    with pytest.raises(PolicyError):
+        CompiledPolicy([rule])
+
+
+def test_engine_memoizes_decisions_until_reload():
+    engine = AuthorizationEngine(verifier=None, policy=CompiledPolicy.from_document(DEFAULT_POLICY))
+    viewer = principal("tenant-viewer")
+
+    assert engine.decide(viewer, "realm:read", "acme").allowed
+    assert engine.decide(viewer, "realm:read", "acme").allowed
+    assert (engine.stats.hits, engine.stats.misses) == (1, 1)
+
+    engine.reload(CompiledPolicy([]))
+    assert not engine.decide(viewer, "realm:read", "acme").allowed
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.tokens import (
+    JWKSCache, Principal, TokenError, TokenVerifier, jwks_url,
+)
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+
+@pytest.fixture(scope="module")
+def keycloak():
+    with FakeKeycloak() as keycloak:
+        keycloak.issue_token("warm-up")  # generates the signing key
+        yield keycloak
+
+
+@pytest.fixture()
+def verifier(keycloak):
+    issuer = keycloak.issuer()
+    return TokenVerifier({issuer: JWKSCache(jwks_url(issuer))}, attribute_claims=["customer_type"])
+
+
+def test_verify_builds_principal_and_caches_keys_and_tokens(keycloak, verifier, monkeypatch):
+    token = keycloak.issue_token("alice", roles=["tenant-admin"], tenant="acme", customer_type="Large")
+    before = keycloak.requests
+
+    principal = verifier.verify(token)
+    assert principal == Principal("alice", "acme", frozenset({"tenant-admin"}), (("customer_type", "Large"),))
+
+    monkeypatch.setattr(verifier, "_decode", pytest.fail)  # cached tokens are not verified again
+    assert verifier.verify(token) is principal
+    assert keycloak.requests == before + 1  # one JWKS fetch
+
+
+@pytest.mark.parametrize("tamper", ["expired", "issuer", "signature", "garbage"])
+def test_verify_rejects_invalid_tokens(keycloak, verifier, tamper):
+    if tamper == "expired":
+        token = keycloak.issue_token("alice", lifetime=-60)
+    elif tamper == "issuer":
+        token = keycloak.issue_token("alice", iss="https://evil.example/realms/master")
+    elif tamper == "signature":
+        header, body, signature = keycloak.issue_token("alice").split(".")
+        token = ".".join([header, keycloak.issue_token("mallory").split(".")[1], signature])
+    else:
+        token = "not-a-jwt"
+    with pytest.raises(TokenError):
+        verifier.verify(token)
+
+
+def test_revoke_rejects_earlier_tokens(keycloak, verifier):
+    token = keycloak.issue_token("alice", iat=int(time.time()) - 10)
+    verifier.verify(token)
+
+    verifier.revoke("alice")
+
+    with pytest.raises(TokenError, match="revoked"):
+        verifier.verify(token)
+    assert verifier.verify(keycloak.issue_token("alice")).subject == "alice"
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(keycloak):
+    calls = []
+
+    def fetch(url, timeout):
+        calls.append(url)
+        return {"keys": []}
+
+    keys = JWKSCache("http://idp/certs", min_refresh_interval=60, fetch=fetch)
+    for _ in range(3):
+        with pytest.raises(TokenError, match="Unknown signing key"):
+            keys.key("rotated")
+    assert len(calls) == 1
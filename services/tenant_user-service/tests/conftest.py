@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from tenant_user_service.dependencies import (
+    get_audit_trail, get_authorizer, get_db, get_realm_cache, get_template_cache,
+)
+from tenant_user_service.main import app
+from tenant_user_service.tenant_management.identity_access_secrets.audit_compliance_trails import (  # noqa: F401
+    models as audit_models,  # registers the audit table on Base
+)
+from tenant_user_service.tenant_management.identity_access_secrets.credential_rotation_key_lifecycle import (  # noqa: F401
+    models as rotation_models,  # registers the rotation state table on Base
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.directory_federation import (  # noqa: F401
+    models as import_models,  # registers the user import jobs table on Base
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import (
+    SCHEMA_NAME,
+    Base,
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.templates import TemplateCache
+
+
+@pytest.fixture()
+def sqlite_session():
+    """Session on an in-memory SQLite database with the service schema created.
+
+    The ``tenant`` schema is mapped away since SQLite has no schemas.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {SCHEMA_NAME: None}},
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture()
+def api_client(sqlite_session):
+    """Makes a ``TestClient`` for the app, backed by ``sqlite_session``.
+
+    Authorization, the realm cache and the audit trail are off unless
+    ``overrides`` (dependency -> replacement, as in
+    ``app.dependency_overrides``) say otherwise. All overrides are removed
+    after the test.
+    """
+
+    def make(overrides=None):
+        app.dependency_overrides.update({
+            get_db: lambda: sqlite_session,
+            get_realm_cache: lambda: None,
+            get_template_cache: TemplateCache,
+            get_audit_trail: lambda: None,
+            get_authorizer: lambda: None,
+            **(overrides or {}),
+        })
+        return TestClient(app)
+
+    try:
+        yield make
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,162 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from tenant_user_service.keycloak_admin import KeycloakAdminManager
+from tenant_user_service.tenant_management.identity_access_secrets.credential_rotation_key_lifecycle.models import (
+    RealmRotationState,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.credential_rotation_key_lifecycle.scheduler import (
+    KEY_PROVIDER_TYPE, RateBudget, RotationScheduler,
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import Realm
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+DAY = 86400.0
+
+
+@pytest.fixture()
+def keycloak():
+    with FakeKeycloak() as keycloak:
+        keycloak.realms["acme"] = {"realm": "acme", "id": "acme-id", "enabled": True}
+        keycloak.components["acme"] = {"old": {
+            "id": "old", "name": "rsa-generated", "providerId": "rsa-generated", "providerType": KEY_PROVIDER_TYPE,
+            "parentId": "acme-id", "config": {"priority": ["100"], "keySize": ["2048"], "privateKey": ["**********"]},
+        }}
+        keycloak.clients["acme"] = [
+            {"id": "c1", "clientId": "portal", "secret": "first"},
+            {"id": "c2", "clientId": "spa", "publicClient": True},
+        ]
+        yield keycloak
+
+
+def _scheduler(session, kc_admin_factory, **kwargs):
+    kwargs.setdefault("period", 90 * DAY)
+    return RotationScheduler(sessionmaker(bind=session.get_bind()), kc_admin_factory, **kwargs)
+
+
+def _add_realms(session, *names):
+    for name in names:
+        session.add(Realm(realm=name, customer_type="Small"))
+    session.commit()
+
+
+def _make_due(session, realm, column="next_rotation_at"):
+    state = session.get(RealmRotationState, realm)
+    session.refresh(state)
+    setattr(state, column, datetime.now(timezone.utc) - timedelta(seconds=1))
+    session.commit()
+
+
+def test_new_realms_are_spread_over_the_first_period(sqlite_session):
+    _add_realms(sqlite_session, *(f"realm{i}" for i in range(200)))
+    scheduler = _scheduler(sqlite_session, MagicMock())
+
+    report = scheduler.run_once()
+
+    assert report.scheduled == 200 and report.outcomes["rotated"] == 0
+    now = datetime.now(timezone.utc)
+    offsets = sorted(
+        (state.next_rotation_at.replace(tzinfo=timezone.utc) - now).total_seconds() / DAY
+        for state in sqlite_session.query(RealmRotationState)
+    )
+    assert 0 <= offsets[0] < 5 and 85 < offsets[-1] <= 90
+    # Roughly uniform: each third of the period gets about a third of the realms.
+    assert all(40 < sum(lo <= o < lo + 30 for o in offsets) < 95 for lo in (0, 30, 60))
+
+    sqlite_session.query(Realm).filter(Realm.realm == "realm0").delete()
+    sqlite_session.commit()
+    assert scheduler.run_once().scheduled == 0
+    assert sqlite_session.query(RealmRotationState).count() == 199
+
+
+def test_rotation_overlaps_old_and_new_credentials_until_the_grace_period_ends(sqlite_session, keycloak):
+    _add_realms(sqlite_session, "acme")
+    manager = KeycloakAdminManager(keycloak.url, "admin", "admin")
+    audit = MagicMock()
+    scheduler = _scheduler(sqlite_session, manager.client, clients=["portal", "spa"], audit=audit)
+    scheduler.run_once()
+    _make_due(sqlite_session, "acme")
+
+    assert scheduler.run_once().outcomes["rotated"] == 1
+
+    keys = keycloak.components["acme"]
+    new = next(c for c in keys.values() if c["id"] != "old")
+    assert "old" in keys  # still verifies tokens it signed
+    assert new["config"] == {"keySize": ["2048"], "priority": ["101"], "enabled": ["true"], "active": ["true"]}
+    assert new["parentId"] == "acme-id" and new["name"] == "rsa-generated-1"
+    portal, spa = keycloak.clients["acme"]
+    assert portal["secret"] != "first" and portal["rotatedSecret"] == "first" and "secret" not in spa
+    state = sqlite_session.get(RealmRotationState, "acme")
+    sqlite_session.refresh(state)
+    assert state.generation == 1 and state.retiring == {"keys": ["old"], "clients": ["c1"]}
+    assert timedelta(days=80) < state.next_rotation_at - state.last_rotated_at < timedelta(days=100)
+    assert scheduler.run_once().outcomes["retired"] == 0  # grace period not over
+
+    _make_due(sqlite_session, "acme", "retire_at")
+    assert scheduler.run_once().outcomes["retired"] == 1
+
+    assert list(keycloak.components["acme"]) == [new["id"]]
+    assert "rotatedSecret" not in portal
+    sqlite_session.refresh(state)
+    assert state.retire_at is None and state.retiring is None
+    assert [c.args[1] for c in audit.record.call_args_list] == ["credentials_rotated", "credentials_retired"]
+
+
+def test_failed_rotation_backs_off_and_is_retried(sqlite_session):
+    _add_realms(sqlite_session, "acme")
+    kc_admin = MagicMock()
+    kc_admin.realm_call.side_effect = RuntimeError("Keycloak is down")
+    scheduler = _scheduler(sqlite_session, lambda: kc_admin)
+    scheduler.run_once()
+    _make_due(sqlite_session, "acme")
+
+    assert scheduler.run_once().outcomes["failed"] == 1
+
+    state = sqlite_session.get(RealmRotationState, "acme")
+    sqlite_session.refresh(state)
+    assert (state.attempts, state.generation, state.last_error) == (1, 0, "Keycloak is down")
+    retry_in = state.next_rotation_at.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)
+    assert timedelta(seconds=25) < retry_in <= timedelta(seconds=60)
+
+
+def test_rate_budget_limits_bursts():
+    now = [0.0]
+    budget = RateBudget(rate=2, burst=3, clock=lambda: now[0])
+
+    assert [budget.delay() for _ in range(4)] == [0, 0, 0, pytest.approx(0.5)]
+    now[0] += 1.0
+    assert [budget.delay() for _ in range(3)] == [0, 0, pytest.approx(0.5)]
+    assert RateBudget(rate=0).delay() == 0
+
+
+def test_due_realms_run_within_the_concurrency_and_rate_limits(sqlite_session):
+    _add_realms(sqlite_session, *(f"realm{i}" for i in range(12)))
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def slow_call(operation, method, realm, path, *args, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return []
+
+    kc_admin = MagicMock()
+    kc_admin.realm_call.side_effect = slow_call
+    kc_admin.get_realm.return_value = {}
+    scheduler = _scheduler(sqlite_session, lambda: kc_admin, max_parallel=3, rate=40, burst=1)
+    scheduler.run_once()
+    for i in range(12):
+        _make_due(sqlite_session, f"realm{i}")
+
+    started = time.monotonic()
+    assert scheduler.run_once().outcomes["rotated"] == 12
+    assert peak[0] <= 3
+    assert time.monotonic() - started >= 11 / 40
@@ -0,0 +1,183 @@
+import base64
+import io
+import json
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from tenant_user_service.dependencies import get_user_importer
+from tenant_user_service.keycloak_admin import KeycloakAdminManager
+from tenant_user_service.tenant_management.tenant_lifecycle.directory_federation import sources
+from tenant_user_service.tenant_management.tenant_lifecycle.directory_federation.importer import (
+    UserImporter, batches,
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.directory_federation.models import UserImportJob
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.models import Realm
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+from tenant_user_service.user_management.users import UserValidationError, to_representation
+
+
+@pytest.fixture()
+def keycloak():
+    with FakeKeycloak() as keycloak:
+        keycloak.realms["acme"] = {"realm": "acme", "enabled": True}
+        yield keycloak
+
+
+@pytest.fixture()
+def importer(sqlite_session, keycloak, tmp_path):
+    manager = KeycloakAdminManager(keycloak.url, "admin", "admin")
+    importer = UserImporter(
+        sessionmaker(bind=sqlite_session.get_bind()), manager.client,
+        batch_size=10, max_parallel=3, spool_dir=str(tmp_path),
+    )
+    yield importer
+    importer.stop()
+
+
+def _ndjson(users):
+    return "".join(json.dumps(user) + "\n" for user in users)
+
+
+def _start(importer, db, text, format="ndjson", realm="acme"):
+    job = UserImportJob(
+        id=f"job{len(text)}", realm=realm, format=format, source_path=importer.spool_path(f"job{len(text)}")
+    )
+    with open(job.source_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_readers_stream_each_format():
+    csv_records = list(sources.read_csv(io.StringIO("username,email,department\nAda,ada@x.io,R&D\nbob,,\nx,y,z,extra\n")))
+    assert csv_records[:2] == [
+        sources.SourceRecord({"username": "Ada", "email": "ada@x.io", "department": "R&D"}),
+        sources.SourceRecord({"username": "bob"}),
+    ]
+    assert csv_records[2].error
+
+    ndjson = list(sources.read_ndjson(["{\"username\": \"ada\"}\n", "\n", "not json\n", "[1]\n"]))
+    assert ndjson[0].fields == {"username": "ada"} and [r.error is not None for r in ndjson] == [False, True, True]
+
+    encoded = base64.b64encode("Zoë".encode()).decode()
+    ldif = (
+        "version: 1\n"
+        "# people\n"
+        "dn: uid=ada,ou=people,dc=x\nuid: ada\nmail: ada@x.io\ngivenName:: " + encoded + "\n"
+        "sn: Love\n lace\nobjectClass: inetOrgPerson\nuserPassword: secret\n\n"
+        "dn: uid=bob,ou=people,dc=x\nchangetype: delete\n"
+    )
+    entries = list(sources.read_ldif(io.StringIO(ldif)))
+    assert entries[0].fields == {
+        "LDAP_ENTRY_DN": "uid=ada,ou=people,dc=x", "username": "ada", "email": "ada@x.io",
+        "firstName": "Zoë", "lastName": "Lovelace",
+    }
+    assert "change records" in entries[1].error
+
+
+def test_users_are_validated_and_normalized():
+    user = to_representation({"username": " Ada ", "email": "ADA@X.IO", "enabled": "false", "dept": "R&D",
+                              "password": "secret"})
+    assert user == {"username": "ada", "email": "ada@x.io", "enabled": False, "attributes": {"dept": ["R&D"]}}
+    for fields in ({}, {"username": "a b"}, {"username": "a", "email": "nope"}, {"username": "a", "enabled": "maybe"}):
+        with pytest.raises(UserValidationError):
+            to_representation(fields)
+
+
+def test_batches_dedupe_and_account_for_every_record():
+    records = [sources.SourceRecord({"username": f"u{i % 7}", "email": f"u{i}@x.io"}) for i in range(10)]
+    records.append(sources.SourceRecord(None, "bad line"))
+    result = list(batches(records, checkpoint=0, batch_size=3))
+
+    assert [len(b.users) for b in result] == [3, 3, 1]
+    assert sum(b.counts["duplicates"] for b in result) == 3 and result[-1].counts["invalid"] == 1
+    assert (result[0].start, result[-1].end) == (0, 11)
+    # Resuming after record 8: u1 (record 9) still counts as a duplicate of record 2.
+    resumed = list(batches(records, checkpoint=8, batch_size=3))
+    assert resumed[0].start == 8 and resumed[0].users == [] and resumed[0].counts["duplicates"] == 2
+
+
+def test_import_writes_batches_to_keycloak(importer, sqlite_session, keycloak):
+    users = [{"username": f"user{i}", "email": f"user{i}@acme.io"} for i in range(95)]
+    users += [{"username": "user3"}, {"username": ""}]
+    job_id = _start(importer, sqlite_session, _ndjson(users))
+
+    importer.run(job_id)
+
+    job = sqlite_session.get(UserImportJob, job_id)
+    sqlite_session.refresh(job)
+    assert job.status == "completed"
+    assert (job.checkpoint, job.imported, job.duplicates, job.invalid, job.failed) == (97, 95, 1, 1, 0)
+    assert [e["record"] for e in job.errors] == [96, 97]
+    assert len(keycloak.users["acme"]) == 95
+    assert job.records_per_second > 0
+
+
+def test_a_rejected_user_is_isolated_from_its_batch(importer, sqlite_session, keycloak):
+    keycloak.users["acme"] = {"existing": {"username": "existing", "email": "taken@acme.io"}}
+    users = [{"username": f"user{i}", "email": f"user{i}@acme.io"} for i in range(20)]
+    users[13]["email"] = "taken@acme.io"
+    users.append({"username": "existing"})
+    job_id = _start(importer, sqlite_session, _ndjson(users))
+
+    importer.run(job_id)
+
+    job = sqlite_session.get(UserImportJob, job_id)
+    assert (job.imported, job.skipped, job.failed) == (19, 1, 1)
+    assert job.errors == [{"record": 14, "error": "User exists with same email"}]
+
+
+def test_interrupted_import_resumes_after_its_checkpoint(importer, sqlite_session, keycloak):
+    job_id = _start(importer, sqlite_session, _ndjson({"username": f"user{i}"} for i in range(100)))
+    calls = []
+    client = importer.kc_admin_factory
+
+    def stop_after_two_batches():
+        kc_admin = client()
+
+        class Counting:
+            def partial_import(self, realm, payload):
+                calls.append(len(payload["users"]))
+                if len(calls) == 2:
+                    importer._stopping.set()
+                return kc_admin.partial_import(realm, payload)
+
+        return Counting()
+
+    importer.kc_admin_factory = stop_after_two_batches
+    importer.run(job_id)
+    job = sqlite_session.get(UserImportJob, job_id)
+    sqlite_session.refresh(job)
+    assert job.status == "interrupted" and 20 <= job.checkpoint < 100
+
+    importer._stopping.clear()
+    importer.kc_admin_factory = client
+    importer.submit = importer.run  # run in this thread
+    assert importer.resume(sqlite_session, job_id)
+    sqlite_session.refresh(job)
+    assert job.status == "completed"
+    assert (job.checkpoint, job.imported, job.skipped) == (100, 100, 0)
+    assert len(keycloak.users["acme"]) == 100
+
+
+def test_import_api_streams_the_upload_and_reports_progress(sqlite_session, api_client, importer, keycloak):
+    sqlite_session.add(Realm(realm="acme", customer_type="Large"))
+    sqlite_session.commit()
+    client = api_client({get_user_importer: lambda: importer})
+    body = "username,email\n" + "".join(f"user{i},user{i}@acme.io\n" for i in range(50))
+    response = client.post("/realms/acme/users/:import?format=csv", content=body.encode())
+    assert response.status_code == 202
+    location = response.headers["Location"]
+
+    deadline = time.monotonic() + 5
+    while (job := client.get(location).json())["status"] != "completed":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert (job["imported"], job["checkpoint"]) == (50, 50)
+
+    assert client.post(location + "/:resume").status_code == 409
+    assert client.post("/realms/missing/users/:import", content=b"{}").status_code == 404
+    assert client.get("/realms/other/users/:import/" + job["id"]).status_code == 404
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+import pytest
+
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import models
+
+
+@pytest.fixture()
+def client(sqlite_session, api_client):
+    for i in range(5):
+        sqlite_session.add(models.Realm(
+            realm=f"realm-{i}", customer_type="Large", supported_locales=["en", "de"],
+        ))
+    sqlite_session.commit()
+    return api_client()
+
+
+def test_list_sets_next_cursor(client):
+    first = client.get("/realms/", params={"limit": 3})
+    assert [r["realm"] for r in first.json()] == ["realm-0", "realm-1", "realm-2"]
+
+    second = client.get("/realms/", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert [r["realm"] for r in second.json()] == ["realm-3", "realm-4"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_export_ndjson(client):
+    response = client.get("/realms/:export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["realm"] for r in rows] == [f"realm-{i}" for i in range(5)]
+    assert rows[0]["supported_locales"] == ["en", "de"]
+
+
+def test_export_csv(client):
+    response = client.get("/realms/:export", params={"format": "csv", "customer_type": "Small"})
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0][:3] == ["id", "realm", "customer_type"]
+    assert len(rows) == 1
+
+
+def test_get_realm_conditional(client, sqlite_session):
+    first = client.get("/realms/realm-1")
+    etag = first.headers["ETag"]
+    assert first.json()["version"] == 1
+
+    again = client.get("/realms/realm-1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    realm = sqlite_session.query(models.Realm).filter_by(realm="realm-1").one()
+    realm.display_name = "Renamed"
+    sqlite_session.commit()
+    assert realm.version == 2
+
+    changed = client.get("/realms/realm-1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_list_conditional(client):
+    etag = client.get("/realms/").headers["ETag"]
+    assert client.get("/realms/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/realms/", params={"limit": 2}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_create_returns_operation_status(client):
+    response = client.post("/realms/", json={"realm": "new", "customer_type": "Small"})
+    assert response.status_code == 201
+
+    operation = client.get(response.headers["Operation-Location"]).json()
+    assert (operation["realm"], operation["operation"], operation["status"]) == ("new", "create", "pending")
+    assert client.get("/realms/:operations/999").status_code == 404
+
+
+def test_patch_writes_only_changes_and_skips_no_ops(client, sqlite_session):
+    changed = client.patch("/realms/realm-1", json={"display_name": "One", "enabled": True})
+    assert changed.status_code == 200
+    assert (changed.json()["display_name"], changed.json()["version"]) == ("One", 2)
+    [op] = sqlite_session.query(models.RealmOutbox).all()
+    assert op.payload == {"displayName": "One"}
+
+    unchanged = client.patch("/realms/realm-1", json={"display_name": "One"})
+    assert unchanged.json()["version"] == 2
+    assert "Operation-Location" not in unchanged.headers
+    assert sqlite_session.query(models.RealmOutbox).count() == 1
+    assert client.patch("/realms/missing", json={"enabled": False}).status_code == 404
+
+
+def test_delete_reaches_keycloak_even_without_a_row(client, sqlite_session):
+    for name in ("realm-1", "keycloak-only"):
+        response = client.delete(f"/realms/{name}")
+        assert response.status_code == 204
+        operation = client.get(response.headers["Operation-Location"]).json()
+        assert (operation["realm"], operation["operation"]) == (name, "delete")
+    assert sqlite_session.query(models.Realm).filter_by(realm="realm-1").count() == 0
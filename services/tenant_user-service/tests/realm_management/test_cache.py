@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from tenant_user_service.cache import InMemorySharedBackend
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    models, service,
+)
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.cache import (
+    RealmCache,
+)
+
+
+@pytest.fixture()
+def seeded_session(sqlite_session):
+    sqlite_session.add(models.Realm(realm="acme", customer_type="Large"))
+    sqlite_session.commit()
+    return sqlite_session
+
+
+def test_get_is_served_from_cache(seeded_session):
+    cache = RealmCache()
+    svc = service.RealmService(seeded_session, cache=cache)
+    assert svc.get("acme").realm == "acme"
+
+    svc.repo.get = MagicMock(side_effect=AssertionError("database touched"))
+    assert svc.get("acme").realm == "acme"
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+
+
+def test_delete_invalidates_realm_and_pages(seeded_session):
+    cache = RealmCache()
+    svc = service.RealmService(seeded_session, cache)
+    svc.get("acme")
+    assert [r.realm for r in svc.list()[0]] == ["acme"]
+
+    svc.delete("acme")
+
+    assert svc.get("acme") is None
+    assert svc.list()[0] == []
+
+
+def test_shared_backend_serves_other_replicas(seeded_session):
+    shared = InMemorySharedBackend()
+    service.RealmService(seeded_session, cache=RealmCache(shared=shared)).get("acme")
+    service.RealmService(seeded_session, cache=RealmCache(shared=shared)).list()
+
+    replica = service.RealmService(seeded_session, cache=RealmCache(shared=shared))
+    replica.repo.get = replica.repo.list = MagicMock(side_effect=AssertionError("database touched"))
+    assert replica.get("acme").realm == "acme"
+    assert [r.realm for r in replica.list()[0]] == ["acme"]
+
+    RealmCache(shared=shared).invalidate("acme")
+    assert replica.cache.get_page((None, None, None, None, 100)) is None
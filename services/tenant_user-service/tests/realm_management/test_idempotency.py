@@ -0,0 +1,146 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from tenant_user_service.in_flight import InFlight
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    idempotency, models, schemas,
+)
+
+
+@pytest.fixture()
+def client(api_client):
+    return api_client()
+
+
+def test_retry_with_same_key_replays_response(client, sqlite_session):
+    body = {"realm": "acme", "customer_type": "Small"}
+    headers = {"Idempotency-Key": "order-1"}
+
+    first = client.post("/realms/", json=body, headers=headers)
+    retry = client.post("/realms/", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Operation-Location"] == first.headers["Operation-Location"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert sqlite_session.query(models.RealmOutbox).count() == 1
+
+    reused = client.post("/realms/", json={**body, "realm": "other"}, headers=headers)
+    assert reused.status_code == 422
+
+
+def test_duplicate_realm_without_key_still_fails(client):
+    body = {"realm": "acme", "customer_type": "Small"}
+    assert client.post("/realms/", json=body).status_code == 201
+    assert client.post("/realms/", json=body).status_code == 400
+
+
+def test_claims_purge_expired_keys_in_batches(sqlite_session):
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    sqlite_session.add_all(
+        models.IdempotencyKey(key=f"old-{i}", request_hash="h", created_at=past, expires_at=past) for i in range(5)
+    )
+    sqlite_session.commit()
+    store = idempotency.IdempotencyStore(sqlite_session, purge_batch=3)
+
+    assert store.claim("new-1", "h") is None
+    assert sqlite_session.query(models.IdempotencyKey).count() == 3
+    assert store.claim("new-2", "h") is None
+    assert {k for (k,) in sqlite_session.query(models.IdempotencyKey.key)} == {"new-1", "new-2"}
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    # A file database, so each thread can have its own connection.
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/idempotency.db",
+        connect_args={"check_same_thread": False},
+        execution_options={"schema_translate_map": {models.SCHEMA_NAME: None}},
+    )
+    models.Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+def _concurrently(*calls):
+    results = [None] * len(calls)
+
+    def run(i):
+        results[i] = calls[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(calls))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_requests_with_different_keys_each_run_once(session_factory):
+    payload = schemas.RealmCreate(realm="acme", customer_type="Small")
+    both_running = threading.Barrier(2, timeout=5)  # broken if one waited on the other
+
+    def request(key, status):
+        def perform():
+            both_running.wait()
+            return idempotency.StoredResponse(status, {"key": key}, {})
+
+        with session_factory() as db:
+            return idempotency.run_once(db, key, payload, perform)
+
+    first, second = _concurrently(lambda: request("k1", 201), lambda: request("k2", 400))
+    assert (first.status_code, second.status_code) == (201, 400)
+    assert idempotency.REPLAYED_HEADER not in first.headers and idempotency.REPLAYED_HEADER not in second.headers
+
+    with session_factory() as db:
+        assert {(r.key, r.status) for r in db.query(models.IdempotencyKey)} == {("k1", "completed"), ("k2", "completed")}
+        retry = idempotency.run_once(db, "k2", payload, lambda: pytest.fail("k2 ran twice"))
+    assert (retry.status_code, retry.body) == (400, b'{"key":"k2"}')
+    assert retry.headers[idempotency.REPLAYED_HEADER] == "true"
+
+
+def test_concurrent_requests_without_a_key_share_one_run_per_realm(session_factory):
+    payload = schemas.RealmCreate(realm="acme", customer_type="Small")
+    calls = []
+
+    def request():
+        def perform():
+            calls.append(1)
+            time.sleep(0.1)
+            return idempotency.StoredResponse(201, {"realm": "acme"}, {})
+
+        with session_factory() as db:
+            return idempotency.run_once(db, None, payload, perform)
+
+    responses = _concurrently(request, request)
+    assert len(calls) == 1
+    assert [r.status_code for r in responses] == [201, 201]
+    assert all(idempotency.REPLAYED_HEADER not in r.headers for r in responses)
+
+
+def test_in_flight_calls_are_coalesced():
+    in_flight = InFlight()
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.1)
+        return "created", False
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(in_flight.run([("key", "k")], call)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("created", False), ("created", True), ("created", True)]
@@ -0,0 +1,53 @@
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    mapping, models, repository, schemas, service,
+)
+
+
+def test_to_keycloak_maps_every_set_field_including_refresh_token_reuse():
+    realm = schemas.RealmCreate(
+        customer_type="Large", realm="acme", display_name="Acme",
+        smtp_server={"host": "mail"}, refresh_token_max_reuse=2,
+    )
+    assert mapping.to_keycloak(realm) == {
+        "realm": "acme",
+        "enabled": True,
+        "displayName": "Acme",
+        "smtpServer": {"host": "mail"},
+        "refreshTokenMaxReuse": 2,
+    }
+    assert mapping.row_to_keycloak(realm.dict()) == mapping.to_keycloak(realm)
+
+
+def test_round_trip_through_keycloak_representation():
+    realm = models.Realm(realm="acme", customer_type="Small", enabled=False, supported_locales=["en"])
+    representation = {**mapping.to_keycloak(realm), "id": "kc-id", "notBefore": 0}
+
+    restored = mapping.to_model(representation, customer_type="Small")
+
+    assert mapping.from_keycloak(representation) == {"realm": "acme", "enabled": False, "supported_locales": ["en"]}
+    assert mapping.to_keycloak(restored) == mapping.to_keycloak(realm)
+
+
+def test_update_queues_only_changed_attributes(sqlite_session):
+    repository.RealmRepository(sqlite_session).create(
+        schemas.RealmCreate(customer_type="Small", realm="acme", display_name="Acme")
+    )
+    svc = service.RealmService(sqlite_session)
+
+    svc.update("acme", schemas.RealmUpdate(display_name="Acme", login_theme="dark"))
+    [op] = svc.operations
+    assert op.payload == {"loginTheme": "dark"}
+
+    svc.operations.clear()
+    svc.update("acme", schemas.RealmUpdate(display_name="Acme"))
+    assert svc.operations == []
+
+
+def test_every_mapped_attribute_but_the_name_can_be_updated(sqlite_session):
+    assert set(schemas.RealmUpdate.__fields__) == set(mapping.ATTRIBUTES) - {"realm"}
+
+    repository.RealmRepository(sqlite_session).create(schemas.RealmCreate(customer_type="Small", realm="acme"))
+    svc = service.RealmService(sqlite_session)
+    svc.update("acme", schemas.RealmUpdate(access_token_lifespan=300, smtp_server={"host": "mail"}))
+    [op] = svc.operations
+    assert op.payload == {"accessTokenLifespan": 300, "smtpServer": {"host": "mail"}}
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from keycloak.exceptions import KeycloakDeleteError
+from sqlalchemy.orm import sessionmaker
+
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    models, outbox,
+)
+
+
+def _dispatcher(session, kc_admin, **kwargs):
+    factory = sessionmaker(bind=session.get_bind())
+    return outbox.OutboxDispatcher(factory, lambda: kc_admin, **kwargs)
+
+
+def _status(session):
+    session.expire_all()
+    return [(op.realm, op.operation, op.status) for op in
+            session.query(models.RealmOutbox).order_by(models.RealmOutbox.id)]
+
+
+def test_coalesce_merges_updates_and_deletes():
+    ops = [
+        outbox.new_operation("create", "a", {"realm": "a", "enabled": True}),
+        outbox.new_operation("update", "a", {"displayName": "A"}),
+        outbox.new_operation("update", "a", {"enabled": False}),
+    ]
+    assert outbox.coalesce(ops) == [
+        ("create", {"realm": "a", "enabled": False, "displayName": "A"}),
+    ]
+    assert outbox.coalesce(ops + [outbox.new_operation("delete", "a")]) == [("delete", None)]
+
+
+def test_dispatch_applies_batch_and_marks_done(sqlite_session):
+    sqlite_session.add_all([
+        outbox.new_operation("create", "a", {"realm": "a"}),
+        outbox.new_operation("update", "a", {"displayName": "A"}),
+        outbox.new_operation("delete", "b"),
+    ])
+    sqlite_session.commit()
+    kc_admin = MagicMock()
+    kc_admin.create_realm.return_value = {}
+    kc_admin.delete_realm.side_effect = KeycloakDeleteError("gone", response_code=404)
+
+    assert _dispatcher(sqlite_session, kc_admin).dispatch_once() == 3
+
+    kc_admin.create_realm.assert_called_once_with(
+        payload={"realm": "a", "displayName": "A"}, skip_exists=True
+    )
+    assert [s for *_, s in _status(sqlite_session)] == ["done", "done", "done"]
+
+
+def test_failures_back_off_and_block_later_operations(sqlite_session):
+    sqlite_session.add_all([
+        outbox.new_operation("update", "a", {"displayName": "A"}),
+        outbox.new_operation("update", "b", {"displayName": "B"}),
+    ])
+    sqlite_session.commit()
+    kc_admin = MagicMock()
+    kc_admin.update_realm.side_effect = lambda realm_name, payload: (
+        (_ for _ in ()).throw(RuntimeError("keycloak down")) if realm_name == "a" else None
+    )
+    dispatcher = _dispatcher(sqlite_session, kc_admin, max_attempts=2)
+
+    dispatcher.dispatch_once()
+    failed = sqlite_session.query(models.RealmOutbox).filter_by(realm="a").one()
+    assert (failed.status, failed.attempts, failed.last_error) == ("pending", 1, "keycloak down")
+
+    # A later operation for "a" must wait for the one that is backing off.
+    sqlite_session.add(outbox.new_operation("delete", "a"))
+    failed.next_attempt_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    sqlite_session.commit()
+    dispatcher.dispatch_once()
+    kc_admin.delete_realm.assert_not_called()
+
+    failed.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    sqlite_session.commit()
+    kc_admin.delete_realm.side_effect = RuntimeError("still down")
+    dispatcher.dispatch_once()
+    assert _status(sqlite_session) == [
+        ("a", "update", "failed"), ("b", "update", "done"), ("a", "delete", "pending"),
+    ]
+
+
+def test_keycloak_is_called_on_leased_rows_outside_the_claim_transaction(sqlite_session):
+    sqlite_session.add(outbox.new_operation("update", "a", {"displayName": "A"}))
+    sqlite_session.commit()
+    rival = _dispatcher(sqlite_session, MagicMock())
+    kc_admin = MagicMock()
+
+    def update_realm(realm_name, payload):
+        assert rival.dispatch_once() == 0  # leased to the first dispatcher
+    kc_admin.update_realm.side_effect = update_realm
+
+    assert _dispatcher(sqlite_session, kc_admin).dispatch_once() == 1
+    assert _status(sqlite_session) == [("a", "update", "done")]
+
+    # Once the lease runs out another dispatcher takes the row over, and the
+    # first one's late outcome is dropped.
+    sqlite_session.add(outbox.new_operation("update", "b", {"displayName": "B"}))
+    sqlite_session.commit()
+
+    def slow_failure(realm_name, payload):
+        assert rival.dispatch_once() == 1
+        raise RuntimeError("timed out")
+    kc_admin.update_realm.side_effect = slow_failure
+
+    _dispatcher(sqlite_session, kc_admin, lease=0).dispatch_once()
+    b = sqlite_session.query(models.RealmOutbox).filter_by(realm="b").one()
+    assert (b.status, b.attempts) == ("done", 0)
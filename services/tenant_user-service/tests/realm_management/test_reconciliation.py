@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock
+
+from sqlalchemy.orm import sessionmaker
+
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    models, outbox, reconciliation, repository, schemas,
+)
+
+
+def _reconciler(session, kc_realms):
+    kc_admin = MagicMock()
+    kc_admin.get_realms.return_value = kc_realms
+    factory = sessionmaker(bind=session.get_bind())
+    return reconciliation.Reconciler(factory, lambda: kc_admin)
+
+
+def _seed(session):
+    repo = repository.RealmRepository(session)
+    for name in ("in-sync", "drifted", "missing"):
+        repo.create(schemas.RealmCreate(customer_type="Small", realm=name, display_name=name.title()))
+
+
+def test_project_ignores_unmanaged_keys_masked_secrets_and_list_order():
+    desired = {"smtpServer": {"host": "mail", "password": "s3cret"}, "supportedLocales": ["en", "de"]}
+    actual = {
+        "smtpServer": {"host": "mail", "password": reconciliation.MASKED_SECRET, "port": "25"},
+        "supportedLocales": ["de", "en"],
+        "id": "abc",
+    }
+    assert reconciliation.minimal_update(desired, reconciliation.project(desired, actual)) == {}
+
+
+def test_reconcile_reports_and_enqueues_minimal_repairs(sqlite_session):
+    _seed(sqlite_session)
+    kc_realms = [
+        {"realm": "in-sync", "enabled": True, "displayName": "In-Sync", "id": "1"},
+        {"realm": "drifted", "enabled": False, "displayName": "Drifted", "id": "2"},
+        {"realm": "orphan", "enabled": True},
+        {"realm": "master", "enabled": True},
+    ]
+    reconciler = _reconciler(sqlite_session, kc_realms)
+
+    report = reconciler.run(apply=True)
+
+    assert report.checked == 3
+    assert report.missing_in_keycloak == ["missing"]
+    assert report.drifted == {"drifted": {"enabled": True}}
+    assert report.orphaned_in_keycloak == ["orphan"]
+    assert report.enqueued == 2
+    ops = sqlite_session.query(models.RealmOutbox).order_by(models.RealmOutbox.id).all()
+    assert [(op.operation, op.realm) for op in ops] == [("update", "drifted"), ("create", "missing")]
+    assert ops[0].payload == {"enabled": True}
+
+
+def test_reconcile_skips_unchanged_and_in_flight_realms(sqlite_session):
+    _seed(sqlite_session)
+    kc_realms = [
+        {"realm": "in-sync", "enabled": True, "displayName": "In-Sync"},
+        {"realm": "drifted", "enabled": True, "displayName": "Drifted"},
+    ]
+    reconciler = _reconciler(sqlite_session, kc_realms)
+    assert reconciler.run().unchanged == 0
+
+    sqlite_session.add(outbox.new_operation("create", "missing", {"realm": "missing"}))
+    sqlite_session.commit()
+    report = reconciler.run()
+
+    # Both realms were in sync last pass and nothing changed since.
+    assert report.unchanged == 2
+    assert report.skipped_in_flight == ["missing"]
+    assert report.drifted == {} and report.missing_in_keycloak == []
+
+    kc_realms[0]["displayName"] = "Renamed in the console"
+    assert reconciler.run().drifted == {"in-sync": {"displayName": "In-Sync"}}
@@ -0,0 +1,83 @@
+import pytest
+
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    models, pagination, schemas, service,
+)
+
+
+@pytest.fixture()
+def seeded_session(sqlite_session):
+    for i in range(7):
+        sqlite_session.add(models.Realm(
+            realm=f"{'acme' if i % 2 else 'globex'}-{i}",
+            customer_type="Large" if i < 4 else "Small",
+            enabled=i != 3,
+        ))
+    sqlite_session.commit()
+    return sqlite_session
+
+
+def test_list_walks_pages_in_id_order(seeded_session):
+    svc = service.RealmService(seeded_session)
+    seen, cursor = [], None
+    while True:
+        page, cursor = svc.list(cursor=cursor, limit=3)
+        seen.extend(r.id for r in page)
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(seen) == 7
+
+
+def test_list_filters(seeded_session):
+    svc = service.RealmService(seeded_session)
+    page, cursor = svc.list(customer_type="Large", enabled=True, name_prefix="acme")
+    assert [r.realm for r in page] == ["acme-1"]
+    assert cursor is None
+
+
+def test_prefix_filter_escapes_wildcards(seeded_session):
+    page, _ = service.RealmService(seeded_session).list(name_prefix="%")
+    assert page == []
+
+
+def test_malformed_cursor_rejected():
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("not-a-cursor")
+
+
+def test_bulk_create_reports_per_item(seeded_session):
+    items = [
+        schemas.RealmCreate(customer_type="Small", realm="new-1"),
+        schemas.RealmCreate(customer_type="Small", realm="new-1"),
+        schemas.RealmCreate(customer_type="Small", realm="acme-1"),
+        schemas.RealmCreate(customer_type="Small", realm="new-2", display_name="Two"),
+    ]
+
+    result = service.RealmService(seeded_session).bulk_create(items)
+
+    assert [(r.realm, r.status) for r in result.results] == [
+        ("new-1", "created"),
+        ("new-1", "failed"),
+        ("acme-1", "failed"),
+        ("new-2", "created"),
+    ]
+    assert result.created == 2 and result.failed == 2
+    assert result.results[3].item.display_name == "Two"
+    assert seeded_session.query(models.Realm).count() == 9
+
+    ops = seeded_session.query(models.RealmOutbox).order_by(models.RealmOutbox.id).all()
+    assert [(op.realm, op.operation) for op in ops] == [("new-1", "create"), ("new-2", "create")]
+    assert result.results[0].operation_id == ops[0].id
+
+
+def test_update_returns_new_row_and_detects_concurrent_changes(seeded_session):
+    from sqlalchemy.orm.exc import StaleDataError
+
+    repo = service.RealmService(seeded_session).repo
+    realm = repo.get("acme-1")
+    row = repo.update(realm, {"display_name": "Acme"})
+    assert (row.display_name, row.version) == ("Acme", 2)
+
+    stale = models.Realm(id=realm.id, realm="acme-1", version=1)
+    with pytest.raises(StaleDataError):
+        repo.update(stale, {"display_name": "Lost update"})
@@ -1,9 +1,16 @@
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from tenant_user_service.events import EventPublisher, MemoryBackend
+from tenant_user_service.tenant_management.identity_access_secrets.audit_compliance_trails.models import (
+    AuditRecord,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.audit_compliance_trails.trail import AuditTrail
 from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
     schemas, service, models,
 )
@@ -16,14 +23,9 @@ def fake_db_session():
     return MagicMock(spec=Session)
 
 
-@pytest.fixture()
-def fake_kc_admin():
-    return MagicMock()
-
-
-def test_create_realm(fake_db_session, fake_kc_admin):
+def test_create_realm(fake_db_session):
     realm_in = schemas.RealmCreate(customer_type="Large", realm="acme")
-    svc = service.RealmService(fake_db_session, fake_kc_admin)
+    svc = service.RealmService(fake_db_session)
 
     # Mock repository create return
     fake_obj = models.Realm(realm="acme", customer_type="Large")  # type: ignore[arg-type]
@@ -31,6 +33,67 @@ def test_create_realm(fake_db_session, fake_kc_admin):
 
     result = svc.create(realm_in)
 
-    fake_kc_admin.create_realm.assert_called_once()
-    svc.repo.create.assert_called_once()
-    assert result.realm == "acme" 
\ No newline at end of file
+    # Keycloak is written from the outbox, in the same commit as the row.
+    [op] = svc.operations
+    assert (op.operation, op.realm, op.payload["realm"]) == ("create", "acme", "acme")
+    svc.repo.create.assert_called_once_with(realm_in, outbox=op)
+    assert result.realm == "acme"
+
+
+def test_async_create_realm():
+    realm_in = schemas.RealmCreate(customer_type="Large", realm="acme")
+    svc = service.AsyncRealmService(MagicMock(spec=AsyncSession))
+
+    fake_obj = models.Realm(realm="acme", customer_type="Large")  # type: ignore[arg-type]
+    svc.repo.create = AsyncMock(return_value=fake_obj)
+
+    result = asyncio.run(svc.create(realm_in))
+
+    [op] = svc.operations
+    svc.repo.create.assert_awaited_once_with(realm_in, outbox=op)
+    assert result.realm == "acme"
+
+
+def test_lifecycle_events_are_published(sqlite_session):
+    backend = MemoryBackend()
+    publisher = EventPublisher(backend, linger=0)
+    publisher.start()
+    svc = service.RealmService(sqlite_session, events=publisher)
+
+    svc.create(schemas.RealmCreate(customer_type="Large", realm="acme"))
+    svc.update("acme", schemas.RealmUpdate(display_name="Acme"))
+    svc.update("acme", schemas.RealmUpdate(display_name="Acme"))  # no-op: no event
+    svc.delete("acme")
+    svc.delete("acme")  # already gone: no event
+    assert publisher.flush()
+    publisher.stop()
+
+    events = [event.value for event in backend.events]
+    assert [e["type"] for e in events] == ["realm.created", "realm.updated", "realm.deleted"]
+    assert {event.key for event in backend.events} == {"acme"}
+    assert events[0]["data"]["customer_type"] == "Large"
+    assert events[1]["data"] == {"changes": {"display_name": "Acme"}, "version": 2}
+
+
+def test_bulk_create_publishes_and_audits_each_realm(sqlite_session):
+    backend = MemoryBackend()
+    publisher = EventPublisher(backend, linger=0)
+    publisher.start()
+    trail = AuditTrail(lambda: sqlite_session)
+    svc = service.RealmService(sqlite_session, events=publisher, audit=trail)
+
+    result = svc.bulk_create([
+        schemas.RealmCreate(realm="acme", customer_type="Large"),
+        schemas.RealmCreate(realm="beta", customer_type="Small"),
+        schemas.RealmCreate(realm="acme", customer_type="Small"),
+    ])
+    assert publisher.flush()
+    publisher.stop()
+
+    assert (result.created, result.failed) == (2, 1)
+    assert [(e.key, e.value["type"]) for e in backend.events] == [("acme", "realm.created"), ("beta", "realm.created")]
+    assert trail.pending() == 2
+    trail.flush()
+    assert [(r.realm, r.action) for r in sqlite_session.query(AuditRecord).order_by(AuditRecord.seq)] == [
+        ("acme", "created"), ("beta", "created"),
+    ]
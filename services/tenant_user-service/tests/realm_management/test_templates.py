@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from tenant_user_service.dependencies import get_template_cache, get_template_rollout
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import (
+    models, schemas, service, templates,
+)
+
+LARGE = {"login_theme": "corp", "access_token_lifespan": 300, "supported_locales": ["en", "de"]}
+
+
+def _save(session, customer_type="Large", settings=LARGE):
+    return service.RealmService(session).repo.save_template(customer_type, settings)[1]
+
+
+def test_apply_merges_overrides_over_rendered_template(sqlite_session):
+    rendered = templates.render(_save(sqlite_session))
+    data = schemas.RealmCreate(realm="acme", customer_type="Large", login_theme="acme", display_name=None)
+
+    merged, payload = templates.apply(rendered, data)
+
+    assert merged.login_theme == "acme"
+    assert merged.access_token_lifespan == 300
+    assert merged.display_name is None
+    assert payload == {
+        "realm": "acme", "enabled": True, "loginTheme": "acme",
+        "accessTokenLifespan": 300, "supportedLocales": ["en", "de"],
+    }
+
+
+def test_create_uses_template_and_caches_it(sqlite_session):
+    _save(sqlite_session)
+    cache = templates.TemplateCache()
+    svc = service.RealmService(sqlite_session, templates=cache)
+    svc.repo.get_template = MagicMock(wraps=svc.repo.get_template)
+
+    for name in ("acme", "beta"):
+        svc.create(schemas.RealmCreate(realm=name, customer_type="Large"))
+    svc.create(schemas.RealmCreate(realm="tiny", customer_type="Small"))  # no template
+    svc.create(schemas.RealmCreate(realm="tiny-2", customer_type="Small"))
+
+    realm = svc.repo.get("beta")
+    assert (realm.login_theme, realm.supported_locales) == ("corp", ["en", "de"])
+    assert svc.operations[1].payload["accessTokenLifespan"] == 300
+    assert svc.repo.get("tiny").login_theme is None
+    assert svc.repo.get_template.call_count == 2  # once per tier, misses included
+
+
+def test_rollout_skips_tenant_overrides(sqlite_session):
+    _save(sqlite_session)
+    svc = service.RealmService(sqlite_session, templates=templates.TemplateCache())
+    svc.create(schemas.RealmCreate(realm="default", customer_type="Large"))
+    svc.create(schemas.RealmCreate(realm="custom", customer_type="Large", login_theme="custom"))
+    svc.create(schemas.RealmCreate(realm="other-tier", customer_type="Small", login_theme="corp"))
+
+    previous, template = service.RealmService(sqlite_session).repo.save_template(
+        "Large", {**LARGE, "login_theme": "corp-v2"}
+    )
+    events, audit = MagicMock(), MagicMock()
+    report = templates.TemplateRollout(lambda: sqlite_session, batch_size=1, events=events, audit=audit).run(
+        templates.render(template), previous
+    )
+
+    assert (report.checked, report.updated, report.overridden, report.conflicts) == (2, 1, 1, [])
+    repo = service.RealmService(sqlite_session).repo
+    assert [repo.get(n).login_theme for n in ("default", "custom", "other-tier")] == ["corp-v2", "custom", "corp"]
+    [op] = sqlite_session.query(models.RealmOutbox).filter_by(realm="default", operation="update").all()
+    assert op.payload == {"loginTheme": "corp-v2"}
+    events.publish.assert_called_once()
+    audit.record.assert_called_once_with(
+        "default", "updated", {"login_theme": "corp"}, {"login_theme": "corp-v2"}, actor="template:Large"
+    )
+
+
+@pytest.fixture()
+def client(sqlite_session, api_client):
+    cache = templates.TemplateCache()
+    return api_client({
+        get_template_cache: lambda: cache,
+        get_template_rollout: lambda: templates.TemplateRollout(lambda: sqlite_session),
+    })
+
+
+def test_template_api_round_trip(client):
+    assert client.put("/realm-templates/Large", json={"settings": {"realm": "x"}}).status_code == 422
+    assert client.put("/realm-templates/Large", json={"settings": {"verify_email": "maybe"}}).status_code == 422
+
+    saved = client.put("/realm-templates/Large", json={"settings": {"login_theme": "corp"}})
+    assert saved.status_code == 200 and saved.json()["version"] == 1
+    created = client.post("/realms/", json={"realm": "acme", "customer_type": "Large"})
+    assert created.json()["login_theme"] == "corp"
+
+    # The rollout runs as a background task, after the response.
+    updated = client.put("/realm-templates/Large", params={"rollout": True}, json={"settings": {"login_theme": "v2"}})
+    assert updated.json()["version"] == 2
+    assert client.get("/realms/acme").json()["login_theme"] == "v2"
+    assert [t["customer_type"] for t in client.get("/realm-templates/").json()] == ["Large"]
+    assert client.get("/realm-templates/Small").status_code == 404
@@ -0,0 +1,160 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from tenant_user_service.keycloak_admin import KeycloakAdminManager
+from tenant_user_service.tenant_management.identity_access_secrets.secrets_vault.bindings import (
+    use_database_credentials, use_keycloak_password,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.secrets_vault.client import (
+    SecretError, VaultSecrets,
+)
+from tenant_user_service.testing.fake_vault import FakeVault
+
+CREDS = "database/creds/app"
+KEYCLOAK = "secret/data/keycloak"
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def vault():
+    with FakeVault() as server:
+        server.put("keycloak", {"password": "first"})
+        yield server
+
+
+def _secrets(vault, token="root", **kwargs):
+    return VaultSecrets.connect(vault.url, token, **kwargs)
+
+
+def test_reads_are_served_from_memory(vault):
+    secrets = _secrets(vault)
+
+    assert secrets.get(KEYCLOAK) == {"password": "first"}
+    assert secrets.get(KEYCLOAK) == {"password": "first"}
+    creds = secrets.get(CREDS)
+    assert secrets.get(CREDS) == creds
+
+    assert vault.reads == {KEYCLOAK: 1, CREDS: 1}
+    assert (secrets.stats.hits, secrets.stats.misses) == (2, 2)
+
+
+def test_concurrent_first_reads_share_one_request(vault):
+    vault.latency = 0.2
+    secrets = _secrets(vault)
+    secrets.client  # build the hvac client up front
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(secrets.get(CREDS))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert vault.reads == {CREDS: 1}
+    assert len(results) == 8 and all(result == results[0] for result in results)
+
+
+def test_errors_surface_as_secret_errors(vault):
+    with pytest.raises(SecretError):
+        _secrets(vault, token="wrong").get(KEYCLOAK)
+    with pytest.raises(SecretError, match="No secret"):
+        _secrets(vault).get("secret/data/missing")
+
+
+def test_leases_are_renewed_in_the_background(vault):
+    vault.lease_duration = 1
+    secrets = _secrets(vault)
+    creds = secrets.get(CREDS)
+    secrets.start()
+    try:
+        _wait_for(lambda: vault.renewals >= 2)
+    finally:
+        secrets.stop()
+
+    assert vault.reads == {CREDS: 1}
+    assert secrets.get(CREDS) == creds
+
+
+def test_credential_is_rotated_before_its_max_ttl(vault):
+    vault.lease_duration, vault.max_ttl = 1, 1.5
+    secrets = _secrets(vault)
+    rotated = []
+    secrets.subscribe(CREDS, rotated.append)
+    first = secrets.get(CREDS)
+    secrets.start()
+    try:
+        _wait_for(lambda: rotated)
+    finally:
+        secrets.stop()
+
+    assert vault.renewals >= 1
+    assert rotated[0] != first and rotated[0] == secrets.get(CREDS)
+
+
+def test_kv_secrets_are_reread_and_listeners_only_hear_changes(vault):
+    secrets = _secrets(vault, refresh_interval=0.1)
+    seen = []
+    secrets.subscribe(KEYCLOAK, seen.append)
+    secrets.get(KEYCLOAK)
+    secrets.start()
+    try:
+        _wait_for(lambda: vault.reads[KEYCLOAK] >= 3)
+        assert seen == []
+        vault.put("keycloak", {"password": "second"})
+        _wait_for(lambda: seen)
+    finally:
+        secrets.stop()
+
+    assert seen == [{"password": "second"}]
+    assert secrets.get(KEYCLOAK) == {"password": "second"}
+
+
+def test_rotation_replaces_database_connections(vault):
+    secrets = _secrets(vault)
+    engine = create_engine("sqlite://")
+    use_database_credentials(engine, secrets, CREDS)
+    connected_as = []
+
+    @event.listens_for(engine, "do_connect")
+    def capture(dialect, record, cargs, cparams):
+        connected_as.append(cparams.pop("user"))
+        cparams.pop("password")  # sqlite takes neither
+
+    engine.connect().close()
+    pool = engine.pool
+    secrets._fetch(CREDS)  # what the renewal thread does once a lease runs out
+    assert engine.pool is not pool
+    engine.connect().close()
+
+    assert connected_as == ["v-app-1", "v-app-2"]
+
+
+def test_rotation_makes_keycloak_log_in_again(vault):
+    logins = []
+
+    def factory(password, **_):
+        logins.append(password)
+        admin = MagicMock()
+        admin.connection.token = {"expires_in": 300}
+        admin.connection._s = None
+        return admin
+
+    manager = KeycloakAdminManager("http://kc/", "admin", "unused", admin_factory=factory)
+    secrets = _secrets(vault)
+    use_keycloak_password(manager, secrets, KEYCLOAK)
+    manager.admin
+
+    vault.put("keycloak", {"password": "second"})
+    secrets._fetch(KEYCLOAK)
+    manager.admin
+
+    assert logins == ["first", "second"]
@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tenant_user_service.admission import (
+    AdmissionControl, AdmissionMiddleware, ConcurrencyLimiter, Limit, MemoryBucketStore, tenant_key,
+)
+from tenant_user_service.tenant_management.identity_access_secrets.fine_grained_authorization.tokens import (
+    JWKSCache, TokenVerifier, jwks_url,
+)
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+
+@pytest.fixture(scope="module")
+def keycloak():
+    with FakeKeycloak() as keycloak:
+        yield keycloak
+
+
+@pytest.fixture()
+def verifier(keycloak):
+    issuer = keycloak.issuer()
+    return TokenVerifier({issuer: JWKSCache(jwks_url(issuer))})
+
+
+@pytest.fixture()
+def headers(keycloak, verifier):
+    """Bearer headers for a tenant, with the token already verified (as authorization would)."""
+
+    def headers(tenant):
+        token = keycloak.issue_token(f"{tenant}-user", tenant=tenant)
+        verifier.verify(token)
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
+
+
+def _key(verifier):
+    return lambda scope: tenant_key(scope, verifier)
+
+
+def _app(control):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/realms/{name}")
+    async def get_realm(name: str):
+        if name == "slow":
+            await release.wait()
+        return {"realm": name}
+
+    @app.post("/realms/")
+    async def create_realm():
+        return {}
+
+    @app.get("/healthz")
+    async def healthz():
+        return {}
+
+    app.state.release = release
+    return AdmissionMiddleware(app, control=control), app
+
+
+def test_buckets_allow_bursts_then_refill_at_the_rate():
+    now = [0.0]
+    store = MemoryBucketStore(maxsize=2, clock=lambda: now[0])
+    limit = Limit(rate=2, burst=3)
+
+    async def take(key="a"):
+        return await store.take(key, limit)
+
+    assert [asyncio.run(take()) for _ in range(4)] == [0, 0, 0, pytest.approx(0.5)]
+    now[0] += 0.5
+    assert asyncio.run(take()) == 0
+    for key in ("b", "c"):
+        asyncio.run(take(key))
+    assert asyncio.run(take()) == 0  # least recently used, evicted: full again
+
+
+def test_requests_are_charged_to_a_verified_tenant_else_the_address(keycloak, verifier):
+    def scope(token=None):
+        headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+        return {"headers": headers, "client": ("10.0.0.7", 5000)}
+
+    acme, portal = keycloak.issue_token("alice", tenant="acme"), keycloak.issue_token("service-account-portal")
+    assert tenant_key(scope(acme), verifier) == "ip:10.0.0.7"  # not verified yet
+    verifier.verify(acme)
+    verifier.verify(portal)
+    assert tenant_key(scope(acme), verifier) == "tenant:acme"
+    assert tenant_key(scope(portal), verifier) == "user:service-account-portal"
+    assert tenant_key(scope(acme)) == "ip:10.0.0.7"  # no verifier: claims are not trusted
+
+    # A token naming acme with someone else's signature is charged to its sender.
+    header, _, signature = keycloak.issue_token("mallory").split(".")
+    forged = ".".join([header, acme.split(".")[1], signature])
+    assert tenant_key(scope(forged), verifier) == tenant_key(scope("not-a-jwt"), verifier) == "ip:10.0.0.7"
+    assert tenant_key({"headers": []}, verifier) == "anonymous"
+
+
+def test_concurrency_limiter_queues_then_rejects():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1, timeout=0.5)
+        assert await limiter.acquire("acme") == 0
+        queued = asyncio.create_task(limiter.acquire("acme"))
+        await asyncio.sleep(0)
+        assert await limiter.acquire("acme") is None  # queue full
+        assert await limiter.acquire("other") == 0
+        limiter.release("acme")
+        assert await queued > 0
+        assert limiter.in_flight("acme") == 1
+
+        limiter.timeout = 0.01
+        assert await limiter.acquire("acme") is None  # waited too long
+        limiter.release("acme")
+        limiter.release("other")
+        assert limiter._keys == {}
+
+    asyncio.run(scenario())
+
+
+def test_rate_limits_apply_per_tenant_and_route_class(verifier, headers):
+    control = AdmissionControl({"read": Limit(0.5, 2), "mutation": Limit(0.5, 1)}, key=_key(verifier))
+    asgi, _ = _app(control)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi), base_url="http://test") as client:
+            acme, other = headers("acme"), headers("other")
+            assert (await client.post("/realms/", headers=acme)).status_code == 200
+            limited = await client.post("/realms/", headers=acme)
+            assert limited.status_code == 429 and limited.headers["Retry-After"] == "2"
+            assert limited.json() == {"detail": "Rate limit for mutation requests exceeded"}
+            # Reads have their own bucket, and other tenants their own budget.
+            assert [(await client.get("/realms/x", headers=acme)).status_code for _ in range(3)] == [200, 200, 429]
+            assert (await client.post("/realms/", headers=other)).status_code == 200
+            assert [(await client.get("/healthz", headers=acme)).status_code for _ in range(5)] == [200] * 5
+
+    asyncio.run(scenario())
+
+
+def test_a_tenant_over_its_concurrency_cap_is_rejected_without_blocking_others(verifier, headers):
+    control = AdmissionControl({}, max_concurrency=2, queue_size=1, queue_timeout=5, key=_key(verifier))
+    asgi, app = _app(control)
+    noisy_headers, calm_headers = headers("noisy"), headers("calm")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi), base_url="http://test") as client:
+            noisy = [asyncio.create_task(client.get("/realms/slow", headers=noisy_headers)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            rejected = await client.get("/realms/slow", headers=noisy_headers)
+            assert rejected.status_code == 429 and rejected.headers["Retry-After"] == "5"
+            assert (await client.get("/realms/x", headers=calm_headers)).status_code == 200
+            assert control.slots.in_flight("tenant:noisy") == 2
+            app.state.release.set()
+            assert [(await task).status_code for task in noisy] == [200, 200, 200]
+        assert control.slots._keys == {}
+
+    asyncio.run(scenario())
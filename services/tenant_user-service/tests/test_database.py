@@ -0,0 +1,83 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from tenant_user_service.database import REPLICA_BIND, EngineSettings, create_db_engine
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management import models
+from tenant_user_service.tenant_management.tenant_lifecycle.realm_management.repository import (
+    RealmRepository,
+)
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    settings = EngineSettings.from_env()
+
+    kwargs = settings.engine_kwargs("postgresql://u:p@db/app", "primary", is_async=False)
+    assert (kwargs["pool_size"], kwargs["max_overflow"]) == (20, 0)
+    assert kwargs["connect_args"]["options"] == "-c statement_timeout=5000"
+    async_kwargs = settings.engine_kwargs("postgresql+asyncpg://u:p@db/app", "primary", is_async=True)
+    assert async_kwargs["connect_args"]["server_settings"] == {"statement_timeout": "5000"}
+    assert "connect_args" not in settings.engine_kwargs("sqlite:///x.db", "primary", is_async=False)
+
+
+def test_only_idle_connections_are_pinged(tmp_path, monkeypatch):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/db.sqlite", EngineSettings(pool_size=1, ping_idle_after=60))
+    pings = []
+    monkeypatch.setattr(engine.dialect, "do_ping", lambda conn: pings.append(conn))
+
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert pings == []
+
+    engine.pool._pool.queue[0].info["last_used"] = 0.0  # idle since forever
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert len(pings) == 1
+    engine.dispose()
+
+
+def test_dead_idle_connection_is_replaced(tmp_path, monkeypatch):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/db.sqlite", EngineSettings(pool_size=1, ping_idle_after=0))
+    with engine.connect() as conn:
+        first = conn.connection.dbapi_connection
+
+    def fail_once(conn):
+        monkeypatch.undo()
+        raise RuntimeError("server closed the connection")
+
+    monkeypatch.setattr(engine.dialect, "do_ping", fail_once)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert conn.connection.dbapi_connection is not first
+    engine.dispose()
+
+
+def _realm_db(path, display_name):
+    engine = create_db_engine(f"sqlite:///{path}", EngineSettings()).execution_options(
+        schema_translate_map={models.SCHEMA_NAME: None}
+    )
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.Realm.__table__.insert().values(
+            realm="acme", customer_type="Small", display_name=display_name
+        ))
+    return engine
+
+
+def test_reads_go_to_replica_unless_primary_requested(tmp_path):
+    primary = _realm_db(tmp_path / "primary.db", "primary")
+    replica = _realm_db(tmp_path / "replica.db", "replica")
+    session = sessionmaker(bind=primary, autoflush=False, info={REPLICA_BIND: replica})()
+    repo = RealmRepository(session)
+
+    assert repo.get("acme").display_name == "replica"
+    assert [r.display_name for r in repo.list()] == ["replica"]
+    session.expunge_all()
+    assert repo.get("acme", primary=True).display_name == "primary"
+
+    session.close()
+    primary.dispose()
+    replica.dispose()
@@ -0,0 +1,96 @@
+import gzip
+import json
+import threading
+
+from tenant_user_service.events import EventPublisher, FileBackend, MemoryBackend, envelope
+
+
+class RecordingBackend(MemoryBackend):
+    def __init__(self, failures=0):
+        super().__init__()
+        self.batches = []
+        self.failures = failures
+
+    def send_batch(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker unavailable")
+        self.batches.append(len(batch))
+        super().send_batch(batch)
+
+
+def test_events_are_batched_up_to_batch_size():
+    backend = RecordingBackend()
+    publisher = EventPublisher(backend, linger=0.5, batch_size=10)
+    for i in range(25):
+        publisher.publish("acme", envelope("realm.updated", "acme", {"i": i}))
+    publisher.start()
+    assert publisher.flush()
+    publisher.stop()
+
+    assert backend.batches == [10, 10, 5]
+    assert [event.value["data"]["i"] for event in backend.events] == list(range(25))
+
+
+def test_publish_never_blocks_when_queue_is_full():
+    publisher = EventPublisher(MemoryBackend(), queue_size=2)
+    for _ in range(5):
+        publisher.publish("acme", {})  # not started: nothing drains the queue
+    assert publisher._queue.qsize() == 2
+
+
+def test_failed_batches_are_retried(monkeypatch):
+    monkeypatch.setattr("tenant_user_service.events.time.sleep", lambda s: None)
+    backend = RecordingBackend(failures=2)
+    publisher = EventPublisher(backend, linger=0, retries=3)
+    publisher.start()
+    publisher.publish("acme", {})
+    assert publisher.flush()
+    publisher.stop()
+    assert len(backend.events) == 1
+
+
+def test_batches_the_backend_keeps_refusing_go_to_the_fallback(monkeypatch):
+    monkeypatch.setattr("tenant_user_service.events.time.sleep", lambda s: None)
+    fallback = MemoryBackend()
+    publisher = EventPublisher(RecordingBackend(failures=4), linger=0, retries=3, fallback=fallback)
+    publisher.start()
+    publisher.publish("acme", envelope("realm.created", "acme"))
+    assert publisher.flush()
+    publisher.stop()
+    assert [event.key for event in fallback.events] == ["acme"]
+
+
+def test_stop_sends_queued_events():
+    backend = MemoryBackend()
+    publisher = EventPublisher(backend, linger=0)
+    publisher.start()
+    for _ in range(100):
+        publisher.publish("acme", {})
+    publisher.stop()
+    assert len(backend.events) == 100
+    assert not any(t.name == "event-publisher" for t in threading.enumerate())
+
+
+def test_file_backend_writes_gzipped_json_lines(tmp_path):
+    path = tmp_path / "events.jsonl.gz"
+    backend = FileBackend(str(path), compression="gzip")
+    publisher = EventPublisher(backend, linger=0)
+    publisher.start()
+    publisher.publish("acme", envelope("realm.created", "acme"))
+    publisher.publish("beta", envelope("realm.created", "beta"))
+    publisher.stop()
+
+    lines = gzip.decompress(path.read_bytes()).decode().splitlines()
+    assert [json.loads(line)["subject"] for line in lines] == ["acme", "beta"]
+
+
+def test_from_env_falls_back_to_file_without_a_broker(monkeypatch, tmp_path):
+    monkeypatch.setenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:1")
+    monkeypatch.setenv("EVENTS_FILE", str(tmp_path / "events.jsonl"))
+    publisher = EventPublisher.from_env()
+    assert isinstance(publisher.backend, FileBackend)
+
+    monkeypatch.delenv("KAFKA_BOOTSTRAP_SERVERS")
+    monkeypatch.delenv("EVENTS_FILE")
+    assert isinstance(EventPublisher.from_env().backend, MemoryBackend)
@@ -0,0 +1,15 @@
+from tenant_user_service.keycloak_admin import KeycloakAdminManager
+from tenant_user_service.testing.fake_keycloak import FakeKeycloak
+
+
+def test_fake_keycloak_serves_realm_admin_api():
+    with FakeKeycloak() as keycloak:
+        client = KeycloakAdminManager(keycloak.url, "admin", "admin").client()
+
+        client.create_realm(payload={"realm": "acme", "enabled": True})
+        assert client.create_realm(payload={"realm": "acme"}, skip_exists=True) == {"msg": "Already exists"}
+        client.update_realm(realm_name="acme", payload={"displayName": "Acme"})
+        assert client.get_realm("acme")["displayName"] == "Acme"
+        client.delete_realm(realm_name="acme")
+
+        assert [r["realm"] for r in client.get_realms()] == ["master"]
@@ -0,0 +1,21 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import tenant_user_service
+from tenant_user_service.testing import importtime
+
+SRC = str(Path(tenant_user_service.__file__).resolve().parents[1])
+# Generous enough for a loaded CI runner; the import takes ~0.5s locally.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_app_import_defers_clients_and_fits_budget(mode):
+    records = importtime.profile_imports(
+        "tenant_user_service.main", env={"PYTHONPATH": SRC, "REALM_API_MODE": mode}
+    )
+    summary = importtime.report(records)
+    assert importtime.deferred_imports(records) == [], summary
+    assert importtime.total_ms(records) < IMPORT_BUDGET_MS, summary
@@ -0,0 +1,89 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from tenant_user_service.keycloak_admin import KeycloakAdminManager
+
+
+def _make_manager(expires_in=300, **kwargs):
+    admins = []
+
+    def factory(**_):
+        admin = MagicMock()
+        admin.connection.token = {"expires_in": expires_in}
+        admin.connection._s = None
+        admins.append(admin)
+        return admin
+
+    manager = KeycloakAdminManager(
+        server_url="http://kc/", username="admin", password="admin",
+        admin_factory=factory, **kwargs,
+    )
+    return manager, admins
+
+
+def test_clients_share_one_login():
+    manager, admins = _make_manager()
+
+    manager.client().create_realm(payload={"realm": "a"})
+    manager.client().delete_realm(realm_name="a")
+
+    assert len(admins) == 1
+    admins[0].create_realm.assert_called_once_with(payload={"realm": "a"})
+    admins[0].delete_realm.assert_called_once_with(realm_name="a")
+
+
+def test_creating_a_client_does_not_log_in():
+    manager, admins = _make_manager()
+    client = manager.client()
+    assert client.server_url == "http://kc/"
+    assert admins == []
+
+
+def test_token_refreshed_before_expiry():
+    manager, admins = _make_manager(expires_in=10, refresh_margin=30)
+    manager.client().get_realms()
+    admins[0].connection.refresh_token.assert_not_called()
+
+    manager._refresh_at = time.monotonic() - 1
+    manager.client().get_realms()
+    admins[0].connection.refresh_token.assert_called_once()
+
+
+def test_concurrency_is_capped():
+    manager, admins = _make_manager(max_concurrency=2)
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_call(**_):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+
+    manager.admin.get_realms.side_effect = slow_call
+    threads = [threading.Thread(target=manager.client().get_realms) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak == 2
+
+
+def test_http_pool_matches_the_concurrency_cap():
+    from keycloak.connection import ConnectionManager
+
+    manager, _ = _make_manager(max_concurrency=32)
+    admin = MagicMock()
+    admin.connection = ConnectionManager(base_url="http://kc/")
+    manager._size_http_pool(admin)
+
+    for prefix in ("http://", "https://"):
+        adapter = admin.connection._s.adapters[prefix]
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 32
+        assert "POST" in adapter.max_retries.allowed_methods
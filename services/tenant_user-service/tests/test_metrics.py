@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from tenant_user_service import metrics
+from tenant_user_service.cache import CacheStats
+from tenant_user_service.main import app
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_pool_checkout_wait_and_saturation():
+    engine = create_engine(
+        "sqlite://", poolclass=metrics.InstrumentedQueuePool, pool_size=2, max_overflow=2,
+        pool_logging_name="test-pool",
+    )
+    before = _sample("db_pool_checkout_wait_seconds_count", pool="test-pool")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert _sample("db_pool_checked_out", pool="test-pool") == 1
+        assert _sample("db_pool_saturation", pool="test-pool") == 0.25
+    assert _sample("db_pool_checkout_wait_seconds_count", pool="test-pool") == before + 1
+
+    engine.dispose()  # recreates the pool with the same settings
+    with engine.connect():
+        assert _sample("db_pool_saturation", pool="test-pool") == 0.25
+
+
+def test_observe_keycloak_counts_errors_by_type():
+    with pytest.raises(KeyError):
+        with metrics.observe_keycloak("test_op"):
+            raise KeyError("boom")
+    assert _sample("keycloak_request_errors_total", operation="test_op", error="KeyError") == 1
+    assert _sample("keycloak_request_duration_seconds_count", operation="test_op", outcome="error") == 1
+
+
+def test_routes_and_caches_are_exported():
+    stats = CacheStats()
+    stats.hits = 3
+    metrics.track_cache("test-cache", stats)
+    client = TestClient(app)
+
+    client.get("/healthz")
+    body = client.get("/metrics").text
+
+    assert 'cache_hits_total{cache="test-cache"} 3.0' in body
+    assert _sample(
+        "http_request_duration_seconds_count", method="GET", route="/healthz", status="200"
+    ) >= 1
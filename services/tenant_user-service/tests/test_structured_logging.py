@@ -0,0 +1,45 @@
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+from tenant_user_service import structured_logging
+from tenant_user_service.main import app
+
+
+def _record(name="tenant_user_service.test", level=logging.INFO, msg="hello", **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_redacts_secrets_at_any_depth():
+    record = _record(payload={"realm": "acme", "smtpServer": {"host": "mail"}}, smtp_server={"password": "x"})
+    entry = json.loads(structured_logging.JsonFormatter().format(record))
+
+    assert entry["message"] == "hello"
+    assert entry["payload"] == {"realm": "acme", "smtpServer": structured_logging.REDACTED}
+    assert entry["smtp_server"] == structured_logging.REDACTED
+
+
+def test_sampling_only_applies_to_debug_of_configured_loggers():
+    sampler = structured_logging.SamplingFilter({"tenant_user_service": 0.0})
+    assert not sampler.filter(_record(level=logging.DEBUG))
+    assert sampler.filter(_record(level=logging.WARNING))
+    assert sampler.filter(_record(name="other", level=logging.DEBUG))
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = structured_logging.NonBlockingQueueHandler(queue.Queue(1))
+    before = handler.dropped
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == before + 1
+
+
+def test_request_id_is_echoed_or_generated():
+    client = TestClient(app)
+    assert client.get("/healthz", headers={"X-Request-ID": "abc"}).headers["X-Request-ID"] == "abc"
+    assert len(client.get("/healthz").headers["X-Request-ID"]) == 32
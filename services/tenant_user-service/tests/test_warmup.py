@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tenant_user_service import warmup
+from tenant_user_service.main import app
+
+
+def test_ready_after_hooks_ran(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setitem(warmup.WARMUP_HOOKS, "database", release.wait)
+    monkeypatch.setitem(warmup.WARMUP_HOOKS, "keycloak", lambda: 1 / 0)  # failures do not block
+    readiness = warmup.Readiness(["database", "keycloak"], budget=60)
+    monkeypatch.setattr(app.state, "readiness", readiness, raising=False)
+    client = TestClient(app)
+
+    assert client.get("/readyz").status_code == 503
+    readiness.start()
+    assert client.get("/readyz").status_code == 503
+    release.set()
+    assert readiness.wait(5)
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert set(response.json()["warmup"]) == {"database", "keycloak"}
+
+
+def test_ready_once_budget_is_spent(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setitem(warmup.WARMUP_HOOKS, "database", release.wait)
+    readiness = warmup.Readiness(["database"], budget=0)
+    readiness.start()
+    assert readiness.is_ready()
+    release.set()
+
+
+def test_unknown_hooks_are_rejected(monkeypatch):
+    monkeypatch.setenv("STARTUP_WARMUP", "imports,bogus")
+    with pytest.raises(ValueError, match="bogus"):
+        warmup.Readiness.from_env()